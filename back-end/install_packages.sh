@@ -18,3 +18,6 @@ pip install --upgrade psycopg2-binary==2.8.6
 
 # JSON Web Token
 pip install --upgrade pyjwt==2.1.0
+
+# Offline batch jobs (see util/recompute_done_locations.py)
+pip install --upgrade numpy==1.24.4
@@ -2,6 +2,10 @@ from flask import Flask
 from flask_cors import CORS
 from models.model import db
 from models.schema import ma
+from models.model_operations.location_pool import init_location_pool
+from models.model_operations.done_bitmap import init_done_bitmap
+from models.model_operations.answer_journal import init_answer_journal
+from models.model_operations.consensus_policy import init_consensus_policy
 
 
 # Initialize the Web Server Gateway Interface
@@ -19,3 +23,21 @@ db.init_app(app)
 
 # Initialize app with schema
 ma.init_app(app)
+
+# Initialize the per-process pool of candidate locations
+if app.config["LOCATION_POOL_ENABLED"]:
+    init_location_pool(app, pool_size=app.config["LOCATION_POOL_SIZE"],
+            low_water_mark=app.config["LOCATION_POOL_LOW_WATER_MARK"])
+
+# Initialize the memory-mapped file of the done locations
+if app.config["DONE_BITMAP_PATH"] is not None:
+    init_done_bitmap(app.config["DONE_BITMAP_PATH"])
+
+# Select the policy for deciding when a location is done
+init_consensus_policy(app.config["CONSENSUS_POLICY"], match_count=app.config["CONSENSUS_MATCH_COUNT"],
+        min_ratio=app.config["CONSENSUS_MIN_RATIO"])
+
+# Initialize the write-behind journal of the answers
+if app.config["ANSWER_JOURNAL_DIR"] is not None:
+    init_answer_journal(app, app.config["ANSWER_JOURNAL_DIR"], flush_seconds=app.config["ANSWER_JOURNAL_FLUSH_SECONDS"],
+            batch_size=app.config["ANSWER_JOURNAL_BATCH_SIZE"])
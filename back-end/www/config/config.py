@@ -28,6 +28,50 @@ class Config(object):
     JWT_PRIVATE_KEY = private_key_path.read_text().strip()
     # Database URI will be set by subclasses
     SQLALCHEMY_DATABASE_URI = None
+    # The number of seconds that a location is leased to a user after it is assigned
+    LOCATION_LEASE_SECONDS = 600
+    # The number of seconds that the next batch reserved for prefetching is leased to a user
+    # (covers the lease of the current batch and then the time to answer the next batch)
+    LOCATION_RESERVE_LEASE_SECONDS = 1200
+    # Keep a pool of candidate locations in each worker process (see location_pool.py)
+    # (off by default, since the lease is still written to the database on each request)
+    LOCATION_POOL_ENABLED = False
+    LOCATION_POOL_SIZE = 500
+    LOCATION_POOL_LOW_WATER_MARK = 100
+    # The way to select locations that are not labeled yet ("uniform", "consensus", or "deficit")
+    LOCATION_SCHEDULER = "uniform"
+    # Decide the number of gold standards by the gold test record of the user
+    # instead of the gold_standard_size requested by the front-end (see user_operations.py),
+    # and fail the gold standard test if any of them is answered wrongly (see answer_operations.grade_answers)
+    ADAPTIVE_GOLD_STANDARD_ENABLED = False
+    # The number of seconds before the manifest returned with the locations expires (see manifest_operations.py)
+    ANSWER_MANIFEST_SECONDS = 3600
+    # Reject the answers that are not submitted with a manifest
+    ANSWER_MANIFEST_REQUIRED = False
+    # Path to the memory-mapped file of the done locations shared by the worker processes (see done_bitmap.py)
+    # None means disabled, and the file should be rebuilt by util/rebuild_done_bitmap.py when enabling it
+    DONE_BITMAP_PATH = None
+    # The number of seconds that the locations sampled for a cursor are leased to the user (see location_cursor_operations.py)
+    LOCATION_CURSOR_SECONDS = 3600
+    # The maximum number of locations (that are not labeled yet) sampled for a cursor
+    LOCATION_CURSOR_MAX_SIZE = 1000
+    # Path to the directory of the write-behind journal of the answers (see answer_journal.py)
+    # None means the answers are written into the database before responding
+    ANSWER_JOURNAL_DIR = None
+    # The number of seconds between the writes of the journal into the database (the maximum lag)
+    ANSWER_JOURNAL_FLUSH_SECONDS = 1
+    # The maximum number of submissions written into the database in each transaction
+    ANSWER_JOURNAL_BATCH_SIZE = 100
+    # The number of seconds that the idempotency keys of the submissions are kept (see answer_submission_operations.py)
+    # A retried submission with the same key in this period returns the original result without writing the answers
+    ANSWER_IDEMPOTENCY_KEY_SECONDS = 86400
+    # The policy for deciding when a location is done ("k_matching", "majority", or "trust_weighted")
+    # (see consensus_policy.py, and run util/recompute_done_locations.py after changing the policy or thresholds)
+    CONSENSUS_POLICY = "k_matching"
+    # The number of existing good answers that a new good answer needs to match
+    CONSENSUS_MATCH_COUNT = 3
+    # The minimum share of the leading good answer of a location (only for "majority" and "trust_weighted")
+    CONSENSUS_MIN_RATIO = 0.75
 
 
 def get_staging_config():
@@ -8,6 +8,8 @@ from util.util import handle_invalid_usage
 from util.util import decode_user_token
 from config.config import config
 from models.model_operations.answer_operations import batch_process_answers
+from models.model_operations.answer_journal import is_answer_journal_enabled
+from models.model_operations.answer_journal import journal_answers
 
 bp = Blueprint("answer_controller", __name__)
 
@@ -33,6 +35,14 @@ def answer():
     user_token : str
         The encoded user JWT, issued by the back-end.
         (required)
+    manifest : str
+        The manifest returned together with the locations by the back-end.
+        (required if ANSWER_MANIFEST_REQUIRED is set in the config)
+    idempotency_key : str
+        A unique key (at most 64 characters) generated by the front-end for each submission,
+        which is kept when retrying the submission, so that the answers are not written twice.
+        It can also be provided by the Idempotency-Key header.
+        (optional)
     data : list of dict
         The answers, in the format [{"FIELD1:"VALUE1","FIELDS2":"VALUE2", ...}].
         (required)
@@ -105,9 +115,26 @@ def answer():
             e = InvalidUsage("Please provide data.", status_code=400)
             return handle_invalid_usage(e) 
 
+        manifest = rj.get("manifest")
+        if manifest is None and config.ANSWER_MANIFEST_REQUIRED:
+            e = InvalidUsage("Please provide manifest.", status_code=400)
+            return handle_invalid_usage(e)
+
+        idempotency_key = rj.get("idempotency_key", request.headers.get("Idempotency-Key"))
+
         # Check all the answers from frontend to decide the next step.
+        # (the answers are written into the database later if the journal is enabled)
         try:
-            pass_status = batch_process_answers(user_id, rj["data"])
+            if is_answer_journal_enabled():
+                pass_status = journal_answers(user_id, rj["data"], manifest=manifest,
+                        private_key=config.JWT_PRIVATE_KEY, idempotency_key=idempotency_key,
+                        idempotency_seconds=config.ANSWER_IDEMPOTENCY_KEY_SECONDS,
+                        all_gold_required=config.ADAPTIVE_GOLD_STANDARD_ENABLED)
+            else:
+                pass_status = batch_process_answers(user_id, rj["data"], manifest=manifest,
+                        private_key=config.JWT_PRIVATE_KEY, idempotency_key=idempotency_key,
+                        idempotency_seconds=config.ANSWER_IDEMPOTENCY_KEY_SECONDS,
+                        all_gold_required=config.ADAPTIVE_GOLD_STANDARD_ENABLED)
         except Exception as errmsg:
             e = InvalidUsage(repr(errmsg), status_code=400)
             return handle_invalid_usage(e)
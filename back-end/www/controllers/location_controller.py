@@ -3,14 +3,20 @@
 from flask import Blueprint
 from flask import request
 from flask import jsonify
-import jwt
+from flask import make_response
 from util.util import decode_jwt
 from config.config import config
 from util.util import InvalidUsage
 from util.util import handle_invalid_usage
 from util.util import try_wrap_response
 from config.config import config
-from models.model_operations.location_operations import get_locations
+from models.model_operations.location_operations import get_location_batches
+from models.model_operations.user_operations import get_user_by_id
+from models.model_operations.user_operations import get_adaptive_gold_standard_size
+from models.model_operations.manifest_operations import create_location_manifest
+from models.model_operations.location_cursor_operations import create_location_cursor
+from models.model_operations.location_cursor_operations import get_location_cursor_page
+from models.model_operations.location_cursor_operations import close_location_cursor
 from models.schema import locations_schema
 
 bp = Blueprint("location_controller", __name__)
@@ -23,6 +29,7 @@ def location():
     Sample command to test:
     $ curl -H "Content-Type: application/json" -X GET http://localhost:5000/location?size=5\&gold_standard_size=1\&user_token=xxxx
     $ https://localhost:5000/location?&size=5&gold_standard_size=1?user_token=xxxxx
+    $ https://localhost:5000/location?&size=5&gold_standard_size=1&prefetch=true?user_token=xxxxx
     
     Parameters
     ----------
@@ -36,6 +43,10 @@ def location():
         The number of locations that should include gold standard answers.
         There should be ("size" - "gold_standard_size") locations that are not labeled yet.
         (required)
+        (adjusted by the gold test record of the user if ADAPTIVE_GOLD_STANDARD_ENABLED is set in the config)
+    prefetch : str
+        "true" to also return the next batch, which is reserved for the user, so that it can be shown instantly.
+        (optional)
 
     Returns
     -------
@@ -44,10 +55,14 @@ def location():
             ID of the location.
         factory_id : string
             The uuid imported from disfactory factory table.
+        And the manifest of the locations, which should be sent back with the answers.
+        If prefetch is true, the "next" field has the data and the manifest of the next batch
+        (missing if there are not enough locations for the next batch).
     """    
     size = request.args.get("size")
     gold_standard_size = request.args.get("gold_standard_size")
     user_token = request.args.get("user_token")
+    prefetch = request.args.get("prefetch", "false").lower() in ["true", "1"]
     if size is None:
         e = InvalidUsage("Please provide size, the number of locations you want to get.")
         return handle_invalid_usage(e)
@@ -77,31 +92,176 @@ def location():
         e = InvalidUsage("gold_standard_size must be an integer.")       
         return handle_invalid_usage(e)
 
+    user_id = decode_user_id(user_token)
+    if not isinstance(user_id, int):
+        # The error response
+        return user_id
+
+    return try_get_locations(user_id, int(size), int(gold_standard_size), prefetch)
+
+@try_wrap_response
+def try_get_locations(user_id, size, gold_standard_size, prefetch=False):
+    try:
+        if config.ADAPTIVE_GOLD_STANDARD_ENABLED:
+            user = get_user_by_id(user_id)
+            if user is None:
+                raise Exception("Cannot find the user.")
+            gold_standard_size = get_adaptive_gold_standard_size(user, size, gold_standard_size)
+        batch_count = 2 if prefetch else 1
+        location_batches = get_location_batches(user_id, size, gold_standard_size, batch_count,
+                lease_seconds=config.LOCATION_LEASE_SECONDS, reserve_lease_seconds=config.LOCATION_RESERVE_LEASE_SECONDS,
+                use_pool=config.LOCATION_POOL_ENABLED, scheduler=config.LOCATION_SCHEDULER)
+    except Exception as errmsg:
+        e = InvalidUsage(repr(errmsg), status_code=400)
+        return handle_invalid_usage(e)
+
+    batches = []
+    for data in location_batches:
+        manifest = create_location_manifest(user_id, data, config.JWT_PRIVATE_KEY, config.ANSWER_MANIFEST_SECONDS)
+        batches.append({"data": locations_schema.dump(data), "manifest": manifest})
+    result = batches[0]
+    if len(batches) > 1:
+        result["next"] = batches[1]
+    return jsonify(result)
+
+@bp.route("/cursor", methods=["GET"])
+def location_cursor():
+    """
+    The function for the front-end to sample many locations at once and get the first page of them.
+
+    The sampled locations are leased to the user for LOCATION_CURSOR_SECONDS in the config,
+    and the next pages are retrieved by the cursor id, without sampling again.
+
+    Sample command to test:
+    $ curl -H "Content-Type: application/json" -X GET http://localhost:5000/location/cursor?size=200\&page_size=20\&gold_standard_size=2\&user_token=xxxx
+
+    Parameters
+    ----------
+    user_token : str
+        The encoded user JWT, issued by the back-end.
+        (required)
+    size : int
+        The maximum number of locations that are not labeled yet to sample (at most LOCATION_CURSOR_MAX_SIZE).
+        (required)
+    page_size : int
+        Total number of locations in each page.
+        (required)
+    gold_standard_size : int
+        The number of locations that should include gold standard answers in each page.
+        (required)
+
+    Returns
+    -------
+        The same as GET /location for the first page, with these fields:
+        cursor : int
+            ID of the cursor for GET /location/cursor/<cursor>.
+        remaining : int
+            The number of sampled locations that are not returned yet.
+    """
+    user_token = request.args.get("user_token")
+    int_args = {}
+    for name in ["size", "page_size", "gold_standard_size"]:
+        value = request.args.get(name)
+        if value is None:
+            e = InvalidUsage("Please provide {}.".format(name))
+            return handle_invalid_usage(e)
+        try:
+            int_args[name] = int(value)
+        except Exception as ex:
+            e = InvalidUsage("{} must be an integer.".format(name))
+            return handle_invalid_usage(e)
+
+    if int_args["page_size"] < 2:
+        e = InvalidUsage("The page_size must be greater or equal to 2.")
+        return handle_invalid_usage(e)
+
+    if int_args["size"] > config.LOCATION_CURSOR_MAX_SIZE:
+        e = InvalidUsage("The size must be smaller or equal to {}.".format(config.LOCATION_CURSOR_MAX_SIZE))
+        return handle_invalid_usage(e)
+
+    user_id = decode_user_id(user_token)
+    if not isinstance(user_id, int):
+        # The error response
+        return user_id
+
+    return try_create_location_cursor(user_id, int_args["size"], int_args["page_size"], int_args["gold_standard_size"])
+
+@bp.route("/cursor/<int:cursor_id>", methods=["GET", "DELETE"])
+def location_cursor_page(cursor_id):
+    """
+    The function for the front-end to get the next page of a cursor (GET), or to close the cursor (DELETE).
+
+    Closing the cursor releases the leases of the locations that are not returned yet.
+
+    Sample command to test:
+    $ curl -H "Content-Type: application/json" -X GET http://localhost:5000/location/cursor/1?user_token=xxxx
+    $ curl -H "Content-Type: application/json" -X DELETE http://localhost:5000/location/cursor/1?user_token=xxxx
+
+    Parameters
+    ----------
+    user_token : str
+        The encoded user JWT, issued by the back-end.
+        (required)
+
+    Returns
+    -------
+        For GET, the same as GET /location/cursor (the cursor is removed when remaining is 0).
+        For DELETE, "cursor closed".
+    """
+    user_id = decode_user_id(request.args.get("user_token"))
+    if not isinstance(user_id, int):
+        # The error response
+        return user_id
+
+    if request.method == "DELETE":
+        return try_close_location_cursor(cursor_id, user_id)
+    return try_get_location_cursor_page(cursor_id, user_id)
+
+def decode_user_id(user_token):
+    """Get the user_id from the user token, or the error response."""
     if user_token is None:
         e = InvalidUsage("Please provide user_token.")
         return handle_invalid_usage(e)
 
     try:
         user_json = decode_jwt(user_token, config.JWT_PRIVATE_KEY)
-    except jwt.InvalidSignatureError as ex:
-        e = InvalidUsage(ex.args[0], status_code=401)
-        return (handle_invalid_usage(e), None)
     except Exception as ex:
         e = InvalidUsage(ex.args[0], status_code=401)
-        return (handle_invalid_usage(e), None)
+        return handle_invalid_usage(e)
 
     user_id = user_json["user_id"]
     if user_id is None:
         e = InvalidUsage("Cannot find user_id")
         return handle_invalid_usage(e)
+    return user_id
+
+@try_wrap_response
+def try_create_location_cursor(user_id, size, page_size, gold_standard_size):
+    try:
+        cursor = create_location_cursor(user_id, size, page_size, gold_standard_size,
+                cursor_seconds=config.LOCATION_CURSOR_SECONDS, scheduler=config.LOCATION_SCHEDULER)
+    except Exception as errmsg:
+        e = InvalidUsage(repr(errmsg), status_code=400)
+        return handle_invalid_usage(e)
+    return try_get_location_cursor_page(cursor.id, user_id)
+
+@try_wrap_response
+def try_get_location_cursor_page(cursor_id, user_id):
+    try:
+        data, remaining = get_location_cursor_page(cursor_id, user_id)
+    except Exception as errmsg:
+        e = InvalidUsage(repr(errmsg), status_code=400)
+        return handle_invalid_usage(e)
 
-    return try_get_locations(user_id, int(size), int(gold_standard_size))
+    manifest = create_location_manifest(user_id, data, config.JWT_PRIVATE_KEY, config.ANSWER_MANIFEST_SECONDS)
+    return jsonify({"data": locations_schema.dump(data), "manifest": manifest,
+        "cursor": cursor_id, "remaining": remaining})
 
 @try_wrap_response
-def try_get_locations(user_id, size, gold_standard_size):
+def try_close_location_cursor(cursor_id, user_id):
     try:
-        data = get_locations(user_id, size, gold_standard_size)
+        close_location_cursor(cursor_id, user_id)
     except Exception as errmsg:
         e = InvalidUsage(repr(errmsg), status_code=400)
         return handle_invalid_usage(e)
-    return jsonify({"data": locations_schema.dump(data)})
+    return make_response("cursor closed", 200)
@@ -8,6 +8,7 @@ from flask import jsonify
 from util.util import InvalidUsage
 from util.util import handle_invalid_usage
 from util.util import encode_jwt
+from util.util import USER_TOKEN_TYPE
 from config.config import config
 from models.model_operations.user_operations import get_user_by_client_id
 from models.model_operations.user_operations import create_user
@@ -87,6 +88,7 @@ def encode_user_jwt(**kwargs):
     payload = {}
     payload["iat"] = t
     payload["jti"] = uuid.uuid4().hex
+    payload["typ"] = USER_TOKEN_TYPE
     payload["iss"] = "[CHANGE_THIS_TO_YOUR_ROOT_URL]"
     payload["exp"] = t + 3600 # the token will expire after one hour
     for k in kwargs:
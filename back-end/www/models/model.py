@@ -32,6 +32,10 @@ class User(db.Model):
         A unique identifier provided by the front-end client.
     client_type : int
         The user type (0 is the admin, 1 is the normal user, -1 is the banned user).
+    gold_test_count : int
+        The number of answer sets (with gold standards) that the user has submitted.
+    gold_pass_count : int
+        The number of answer sets in which the user passed the gold standard test.
     answers : relationship
         List of answers related to the user.
     """
@@ -41,6 +45,10 @@ class User(db.Model):
     client_id = db.Column(db.String(255), unique=True, nullable=False)
     client_type = db.Column(db.Integer, nullable=False, default=1)
 
+    # Gold standard test results for deciding how many gold standards to give the user
+    gold_test_count = db.Column(db.Integer, nullable=False, server_default="0")
+    gold_pass_count = db.Column(db.Integer, nullable=False, server_default="0")
+
     # Build 1 to N relationship to the user table
     answers = db.relationship("Answer", backref=db.backref("user", lazy=True), lazy=True)
 
@@ -61,6 +69,15 @@ class Location(db.Model):
         The uuid imported from disfactory factory table.
     done_at : datetime
         The time when the location is marked done.
+    random_key : float
+        A random number in [0, 1) for sampling locations by seeking the index.
+        (re-rolled periodically by util/reroll_location_random_keys.py)
+    consensus_count : int
+        The largest number of matching good answers (from users who passed the gold standard test)
+        among all possible answers, which shows how close the location is to the consensus.
+        (updated together with the location tallies, see location_tally_operations.py)
+    answer_count : int
+        The number of answers submitted to the location.
     answers : relationship
         List of answers related to the location.
     """
@@ -70,10 +87,19 @@ class Location(db.Model):
 
     # Others
     done_at = db.Column(db.DateTime, default=None)
+    random_key = db.Column(db.Float, nullable=False, server_default=func.random(), index=True)
+    consensus_count = db.Column(db.Integer, nullable=False, server_default="0")
+    answer_count = db.Column(db.Integer, nullable=False, server_default="0")
 
     # Build 1 to N relationship to the answer table
     answers = db.relationship("Answer", backref=db.backref("location", lazy=True), lazy=True)
 
+    # Indexes for scheduling the locations that are not done by the consensus count or the answer count
+    __table_args__ = (db.Index("ix_location_consensus_count_random_key", consensus_count.desc(), random_key,
+        postgresql_where=done_at.is_(None)),
+        db.Index("ix_location_answer_count_random_key", answer_count, random_key,
+        postgresql_where=done_at.is_(None)))
+
     def __repr__(self):
         return "<id=%r factory_id=%r done_at=%r>" %(self.id, self.factory_id, self.done_at)
 
@@ -142,8 +168,12 @@ class Answer(db.Model):
     zoom_level = db.Column(db.Integer, default=0)
 
     # Build N to 1 relationship to location and user table
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    location_id = db.Column(db.Integer, db.ForeignKey("location.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    location_id = db.Column(db.Integer, db.ForeignKey("location.id"), nullable=False, index=True)
+
+    # Partial index for finding the gold standards without scanning the whole table
+    __table_args__ = (db.Index("ix_answer_gold_location_id", location_id,
+        postgresql_where=(gold_standard_status==0)),)
 
     def __repr__(self):
         return "<id=%r user_id=%r location_id=%r timestamp=%r year_old=%r year_new=%r \
@@ -154,3 +184,218 @@ class Answer(db.Model):
                 self.year_new, self.source_url_root, self.land_usage, self.expansion,
                 self.gold_standard_status, self.bbox_left_top_lat, self.bbox_left_top_lng,
                 self.bbox_bottom_right_lat, self.bbox_bottom_right_lng, self.zoom_level)
+
+
+class LocationLease(db.Model):
+    """
+    Class representing a lease of a location assigned to a user.
+
+    Only one lease can exist for a location, so that a location waiting to be labeled
+    is not assigned to many users at the same time.
+    An expired lease returns the location to the pool, and it is overwritten by the next claim.
+
+    Attributes
+    ----------
+    location_id : int
+        Foreign key to the location table (also the primary key).
+    user_id : int
+        Foreign key to the user table.
+    expires_at : datetime
+        The time when the lease expires.
+    reserved : bool
+        If the location is in a next batch that the front-end has prefetched,
+        which is not returned to the same user again (see location_operations.get_location_batches).
+    """
+    location_id = db.Column(db.Integer, db.ForeignKey("location.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    reserved = db.Column(db.Boolean, nullable=False, server_default="false")
+
+    def __repr__(self):
+        return "<location_id=%r user_id=%r expires_at=%r reserved=%r>" % (
+                self.location_id, self.user_id, self.expires_at, self.reserved)
+
+
+class UserLocation(db.Model):
+    """
+    Class representing a location that a user has answered.
+
+    The rows are maintained when answers are created or removed (see answer_operations.py),
+    so that the locations answered by a user can be excluded by looking up the primary key
+    instead of scanning the answers.
+
+    Attributes
+    ----------
+    user_id : int
+        Foreign key to the user table (part of the primary key).
+    location_id : int
+        Foreign key to the location table (part of the primary key).
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey("location.id", ondelete="CASCADE"), primary_key=True)
+
+    def __repr__(self):
+        return "<user_id=%r location_id=%r>" % (self.user_id, self.location_id)
+
+
+class CacheGeneration(db.Model):
+    """
+    Class representing the version of data cached by the processes.
+
+    The generation is increased whenever the data changes,
+    so that the processes reload their caches only when the generation is different.
+
+    Attributes
+    ----------
+    name : str
+        The name of the cached data (as the primary key), e.g., "gold_standard".
+    generation : int
+        The version of the data.
+    """
+    name = db.Column(db.String(255), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, server_default="0")
+
+    def __repr__(self):
+        return "<name=%r generation=%r>" % (self.name, self.generation)
+
+
+class LocationCursor(db.Model):
+    """
+    Class representing a frozen sample of locations that a user pages through (for labeling many tasks at once).
+
+    Attributes
+    ----------
+    id : int
+        Unique identifier as primary key.
+    user_id : int
+        Foreign key to the user table.
+    location_ids : list of int
+        IDs of the sampled locations waiting to be labeled, in the order of the pages.
+    position : int
+        The number of locations in location_ids that have been returned.
+    page_size : int
+        Total number of locations in each page.
+    gold_standard_size : int
+        The number of locations with gold standards in each page.
+    expires_at : datetime
+        The time when the cursor (and the leases of its locations) expires.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    location_ids = db.Column(db.ARRAY(db.Integer), nullable=False)
+    position = db.Column(db.Integer, nullable=False, server_default="0")
+    page_size = db.Column(db.Integer, nullable=False)
+    gold_standard_size = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return "<id=%r user_id=%r position=%r expires_at=%r>" % (self.id, self.user_id, self.position, self.expires_at)
+
+
+class LocationTally(db.Model):
+    """
+    Class representing the number of good answers (from users who passed the gold standard test)
+    of a location with the same land_usage and expansion.
+
+    The rows are maintained when answers are created, updated, or removed (see answer_operations.py),
+    so that the consensus of a location can be checked without counting the answers.
+    They can be recomputed from the answer table by util/rebuild_location_tally.py.
+
+    Attributes
+    ----------
+    location_id : int
+        Foreign key to the location table (part of the primary key).
+    land_usage : int
+        The land_usage of the answers (part of the primary key).
+    expansion : int
+        The expansion of the answers (part of the primary key).
+    good_answer_count : int
+        The number of answers with gold_standard_status 1.
+    """
+    location_id = db.Column(db.Integer, db.ForeignKey("location.id", ondelete="CASCADE"), primary_key=True)
+    land_usage = db.Column(db.Integer, primary_key=True)
+    expansion = db.Column(db.Integer, primary_key=True)
+    good_answer_count = db.Column(db.Integer, nullable=False, server_default="0")
+
+    def __repr__(self):
+        return "<location_id=%r land_usage=%r expansion=%r good_answer_count=%r>" % (self.location_id,
+                self.land_usage, self.expansion, self.good_answer_count)
+
+
+class AnswerJournalCheckpoint(db.Model):
+    """
+    Class representing how much of a segment of the answer journal has been written into the database.
+
+    The row is updated in the same transaction as the answers (see answer_journal.py),
+    so that replaying a segment after a restart skips the answers that are already written.
+
+    Attributes
+    ----------
+    segment : str
+        The file name of the segment (primary key).
+    flushed_offset : int
+        The number of bytes of the segment that have been written into the database.
+    """
+    segment = db.Column(db.String(255), primary_key=True)
+    flushed_offset = db.Column(db.BigInteger, nullable=False, server_default="0")
+
+    def __repr__(self):
+        return "<segment=%r flushed_offset=%r>" % (self.segment, self.flushed_offset)
+
+
+class AnswerSubmission(db.Model):
+    """
+    Class representing a submission of answers with an idempotency key provided by the front-end.
+
+    The row is written in the same transaction as the answers (see answer_operations.batch_process_answers),
+    so that a retried submission with the same key returns the original result without writing the answers again.
+    The rows expire after a period (see answer_submission_operations.py).
+
+    Attributes
+    ----------
+    user_id : int
+        Foreign key to the user table (part of the primary key).
+    idempotency_key : str
+        The key provided by the front-end for each submission (part of the primary key).
+    passed : bool
+        If the user passed the gold standard test in the submission.
+    created_at : datetime
+        The time when the submission is processed.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    idempotency_key = db.Column(db.String(64), primary_key=True)
+    passed = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return "<user_id=%r idempotency_key=%r passed=%r created_at=%r>" % (self.user_id,
+                self.idempotency_key, self.passed, self.created_at)
+
+
+class ManifestUse(db.Model):
+    """
+    Class representing a manifest that has been submitted with answers.
+
+    The row is written in the same transaction as the answers (see manifest_operations.claim_location_manifest),
+    so that each manifest can only be submitted once.
+    The rows can be removed after the manifests expire (see util/clear_expired_answer_submissions.py).
+
+    Attributes
+    ----------
+    jti : str
+        The unique ID of the manifest (primary key).
+    user_id : int
+        Foreign key to the user table.
+    idempotency_key : str
+        The key of the submission (see AnswerSubmission), so that a retry of the submission is not rejected.
+    expires_at : datetime
+        The time when the manifest expires.
+    """
+    jti = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    idempotency_key = db.Column(db.String(64))
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return "<jti=%r user_id=%r idempotency_key=%r expires_at=%r>" % (self.jti, self.user_id,
+                self.idempotency_key, self.expires_at)
@@ -0,0 +1,186 @@
+"""
+Offline aggregation of the answers with the expectation-maximization (EM) method of Dawid and Skene.
+
+Instead of only counting the exact matches among the good answers, every answer to a location
+(including the ones from the users who failed the gold standard test) is used,
+and each user is modeled by a confusion matrix, i.e., the probability of each answer given the true label.
+The EM iterations alternate between:
+    E-step : the posterior of the true label of each location, given the answers and the confusion matrices
+    M-step : the confusion matrix of each user and the prior of the labels, given the posteriors
+The land_usage and expansion are aggregated separately, and the gold standards are fixed to their labels,
+so that they anchor the confusion matrices.
+All the steps are vectorized over the sparse user x location answers (one element per answer) with bincount.
+NumPy is only required by the batch jobs (see util/aggregate_answers.py), not by the server.
+"""
+
+import numpy as np
+
+
+def aggregate_answer_field(answer_arrays, field, max_iterations=50, tolerance=1e-6, smoothing=1.0):
+    """
+    Estimate the true labels of a field of the answers (e.g., land_usage) with the Dawid-Skene EM method.
+
+    Parameters
+    ----------
+    answer_arrays : dict of str to numpy.ndarray
+        The result of answer_arrays.load_answer_arrays.
+    field : str
+        "land_usage" or "expansion".
+    max_iterations : int
+        The maximum number of EM iterations.
+    tolerance : float
+        Stop when no posterior changes more than this value in an iteration.
+    smoothing : float
+        The pseudo-count added to each cell of the confusion matrices (and an extra one to the diagonal),
+        so that the users with few answers are assumed to be better than random.
+
+    Returns
+    -------
+    dict
+        "location_ids" : IDs of the answered locations (excluding the gold standards)
+        "labels" : The most likely label of each location
+        "confidence" : The posterior probability of the label of each location
+        "answer_counts" : The number of answers to each location
+        "classes" : The values of the labels (the columns of the posteriors and the confusion matrices)
+        "user_ids" : IDs of the users
+        "confusion" : The confusion matrix of each user, where [u, k, l] is the probability of answering l given k
+        "iterations" : The number of EM iterations
+    """
+    status = answer_arrays["gold_standard_status"]
+    is_gold = status == 0
+    classes, answer_class = np.unique(answer_arrays[field], return_inverse=True)
+    answer_class = answer_class.reshape(-1)
+    class_count = len(classes)
+
+    # The answers of the users (good or not) are the observations, and the gold standards are the known labels
+    location_ids, answer_location = np.unique(answer_arrays["location_id"][~is_gold], return_inverse=True)
+    answer_location = answer_location.reshape(-1)
+    user_ids, answer_user = np.unique(answer_arrays["user_id"][~is_gold], return_inverse=True)
+    answer_user = answer_user.reshape(-1)
+    answer_class_observed = answer_class[~is_gold]
+    location_count = len(location_ids)
+    user_count = len(user_ids)
+    if location_count == 0:
+        return {"location_ids": location_ids, "labels": classes[0:0], "confidence": np.zeros(0),
+            "answer_counts": np.zeros(0, dtype=np.int64), "classes": classes, "user_ids": user_ids,
+            "confusion": np.zeros((0, class_count, class_count)), "iterations": 0}
+
+    # Fix the posteriors of the answered gold standards to their labels
+    gold_location_ids = answer_arrays["location_id"][is_gold]
+    gold_index = np.minimum(np.searchsorted(location_ids, gold_location_ids), location_count - 1)
+    is_known = location_ids[gold_index] == gold_location_ids
+    gold_location = gold_index[is_known]
+    gold_class = answer_class[is_gold][is_known]
+    is_gold_location = np.zeros(location_count, dtype=bool)
+    is_gold_location[gold_location] = True
+
+    # Initialize the posteriors with the share of each answer (majority voting)
+    cell = answer_location * class_count + answer_class_observed
+    posterior = np.bincount(cell, minlength=location_count * class_count).reshape(location_count, class_count)
+    posterior = posterior / posterior.sum(axis=1, keepdims=True)
+    posterior[gold_location] = np.eye(class_count)[gold_class]
+
+    prior_smoothing = smoothing + smoothing * np.eye(class_count)
+    for iterations in range(1, max_iterations + 1):
+        # M-step: the prior of the labels and the confusion matrices, weighted by the posteriors of the answered locations
+        prior = posterior.sum(axis=0) + 1.0
+        prior = prior / prior.sum()
+        confusion = np.empty((user_count, class_count, class_count))
+        for k in range(class_count):
+            counts = np.bincount(answer_user * class_count + answer_class_observed,
+                    weights=posterior[answer_location, k], minlength=user_count * class_count)
+            confusion[:, k, :] = counts.reshape(user_count, class_count) + prior_smoothing[k]
+        confusion /= confusion.sum(axis=2, keepdims=True)
+
+        # E-step: the posterior of each location is the prior times the likelihood of all its answers
+        log_confusion = np.log(confusion)
+        log_posterior = np.empty((location_count, class_count))
+        for k in range(class_count):
+            log_posterior[:, k] = np.log(prior[k]) + np.bincount(answer_location,
+                    weights=log_confusion[answer_user, k, answer_class_observed], minlength=location_count)
+        log_posterior -= log_posterior.max(axis=1, keepdims=True)
+        new_posterior = np.exp(log_posterior)
+        new_posterior /= new_posterior.sum(axis=1, keepdims=True)
+        new_posterior[gold_location] = np.eye(class_count)[gold_class]
+
+        change = np.abs(new_posterior - posterior).max()
+        posterior = new_posterior
+        if change < tolerance:
+            break
+
+    answer_counts = np.bincount(answer_location, minlength=location_count)
+    is_output = ~is_gold_location
+    return {
+        "location_ids": location_ids[is_output],
+        "labels": classes[posterior[is_output].argmax(axis=1)],
+        "confidence": posterior[is_output].max(axis=1),
+        "answer_counts": answer_counts[is_output],
+        "classes": classes,
+        "user_ids": user_ids,
+        "confusion": confusion,
+        "iterations": iterations
+    }
+
+
+def aggregate_answers(answer_arrays, max_iterations=50, tolerance=1e-6, smoothing=1.0):
+    """
+    Estimate the land_usage and expansion of the answered locations with the Dawid-Skene EM method.
+
+    The two fields are aggregated separately, and the confidence of a location is the product of the two.
+
+    Parameters
+    ----------
+    answer_arrays : dict of str to numpy.ndarray
+        The result of answer_arrays.load_answer_arrays.
+    max_iterations : int
+        The maximum number of EM iterations for each field.
+    tolerance : float
+        The tolerance of the EM iterations (see aggregate_answer_field).
+    smoothing : float
+        The pseudo-count of the confusion matrices (see aggregate_answer_field).
+
+    Returns
+    -------
+    dict
+        "location_ids" : IDs of the answered locations (excluding the gold standards)
+        "land_usage" and "expansion" : The most likely label of each location
+        "confidence" : The posterior probability of both labels of each location
+        "answer_counts" : The number of answers to each location
+        "fields" : The result of aggregate_answer_field for each field
+    """
+    fields = {}
+    for field in ["land_usage", "expansion"]:
+        fields[field] = aggregate_answer_field(answer_arrays, field, max_iterations=max_iterations,
+                tolerance=tolerance, smoothing=smoothing)
+
+    # Both fields are aggregated over the same answers, so the locations are in the same order
+    return {
+        "location_ids": fields["land_usage"]["location_ids"],
+        "land_usage": fields["land_usage"]["labels"],
+        "expansion": fields["expansion"]["labels"],
+        "confidence": fields["land_usage"]["confidence"] * fields["expansion"]["confidence"],
+        "answer_counts": fields["land_usage"]["answer_counts"],
+        "fields": fields
+    }
+
+
+def get_confident_location_ids(aggregation, min_confidence=0.95, min_answer_count=2):
+    """
+    Get the locations whose aggregated labels are confident enough to mark them done.
+
+    Parameters
+    ----------
+    aggregation : dict
+        The result of aggregate_answers.
+    min_confidence : float
+        The minimum posterior probability of both labels.
+    min_answer_count : int
+        The minimum number of answers, so that a location is never decided by one user.
+
+    Returns
+    -------
+    numpy.ndarray
+        IDs of the confident locations.
+    """
+    is_confident = (aggregation["confidence"] >= min_confidence) & (aggregation["answer_counts"] >= min_answer_count)
+    return aggregation["location_ids"][is_confident]
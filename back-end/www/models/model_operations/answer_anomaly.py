@@ -0,0 +1,194 @@
+"""
+Offline detection of the users who submit low-effort or scripted answers.
+
+The features of all the users are computed in one pass over the answer arrays (see answer_arrays.py)
+with grouped vectorized operations, instead of queries per user:
+    entropy : The entropy (in bits) of the (land_usage, expansion) answers of the user,
+        which is close to 0 if the user gives the same answer to every location
+    median_seconds_per_answer and fast_fraction : The time between two submissions of the user divided by the
+        number of answers in the later one (answers of a submission share the same timestamp),
+        ignoring the breaks longer than a session
+    agreement : The share of the answers that match the leading good answer of the other users to the location,
+        among the locations where the other users have enough good answers
+    gold_pass_rate : The share of the submissions in which the user passed the gold standard test
+Each feature that crosses its threshold is a signal, and a normal user with enough signals is flagged.
+NumPy is only required by the batch jobs (see util/detect_anomalous_users.py), not by the server.
+"""
+
+import numpy as np
+
+
+# The names of the signals
+ANOMALY_SIGNALS = ["uniform", "fast", "disagree", "gold_fail"]
+
+
+def group_median(group_index, values, group_count):
+    """
+    Get the median of the values in each group with one sort.
+
+    Parameters
+    ----------
+    group_index : numpy.ndarray
+        The group of each value.
+    values : numpy.ndarray
+        The values.
+    group_count : int
+        The number of groups.
+
+    Returns
+    -------
+    numpy.ndarray
+        The (lower) median of each group, or NaN if the group is empty.
+    """
+    order = np.lexsort((values, group_index))
+    counts = np.bincount(group_index, minlength=group_count)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(group_count, np.nan)
+    has_values = counts > 0
+    medians[has_values] = values[order][starts[has_values] + (counts[has_values] - 1) // 2]
+    return medians
+
+
+def compute_user_features(answer_arrays, user_arrays, session_seconds=1800, fast_seconds_per_answer=2,
+        min_consensus_count=2):
+    """
+    Compute the features of all the users.
+
+    Parameters
+    ----------
+    answer_arrays : dict of str to numpy.ndarray
+        The result of answer_arrays.load_answer_arrays with the timestamps.
+    user_arrays : dict of str to numpy.ndarray
+        The result of answer_arrays.load_user_arrays.
+    session_seconds : float
+        Ignore the time between two submissions if it is longer than this (the user took a break).
+    fast_seconds_per_answer : float
+        The submissions that take less than this time per answer are too fast.
+    min_consensus_count : int
+        The minimum number of good answers from the other users to compare an answer with.
+
+    Returns
+    -------
+    dict of str to numpy.ndarray
+        The "user_ids" (sorted) and their "client_type", "answer_count", "entropy", "gap_count",
+        "median_seconds_per_answer", "fast_fraction", "comparable_count", "agreement", "gold_test_count", and "gold_pass_rate".
+        The features without data are NaN.
+    """
+    user_order = np.argsort(user_arrays["id"])
+    user_ids = user_arrays["id"][user_order]
+    user_count = len(user_ids)
+    features = {"user_ids": user_ids, "client_type": user_arrays["client_type"][user_order]}
+
+    # Only the answers of the users are analyzed (not the gold standards)
+    is_user_answer = (answer_arrays["gold_standard_status"] != 0) & np.isin(answer_arrays["user_id"], user_ids)
+    answer_user = np.searchsorted(user_ids, answer_arrays["user_id"][is_user_answer])
+    answer_location = answer_arrays["location_id"][is_user_answer]
+    is_good = answer_arrays["gold_standard_status"][is_user_answer] == 1
+    pair = np.stack([answer_arrays["land_usage"][is_user_answer], answer_arrays["expansion"][is_user_answer]], axis=1)
+    classes, answer_class = np.unique(pair, axis=0, return_inverse=True)
+    answer_class = answer_class.reshape(-1)
+    class_count = max(len(classes), 1)
+    answer_count = np.bincount(answer_user, minlength=user_count)
+    features["answer_count"] = answer_count
+
+    # Entropy of the answers of each user
+    class_counts = np.bincount(answer_user * class_count + answer_class,
+            minlength=user_count * class_count).reshape(user_count, class_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = class_counts / answer_count[:, None]
+        features["entropy"] = -np.where(class_counts > 0, p * np.log2(np.where(p > 0, p, 1)), 0).sum(axis=1)
+    features["entropy"][answer_count == 0] = np.nan
+
+    # Time per answer between the consecutive submissions of each user
+    timestamp = answer_arrays["timestamp"][is_user_answer]
+    time_order = np.lexsort((timestamp, answer_user))
+    sorted_user = answer_user[time_order]
+    sorted_time = timestamp[time_order]
+    is_start = np.ones(len(time_order), dtype=bool)
+    is_start[1:] = (sorted_user[1:] != sorted_user[:-1]) | (sorted_time[1:] != sorted_time[:-1])
+    submission_user = sorted_user[is_start]
+    submission_time = sorted_time[is_start]
+    submission_size = np.diff(np.append(np.nonzero(is_start)[0], len(time_order)))
+    gap_seconds = (submission_time[1:] - submission_time[:-1]) / 1000.0
+    is_gap = (submission_user[1:] == submission_user[:-1]) & (submission_time[:-1] > 0)
+    is_gap &= gap_seconds <= session_seconds
+    gap_user = submission_user[1:][is_gap]
+    seconds_per_answer = gap_seconds[is_gap] / submission_size[1:][is_gap]
+    gap_count = np.bincount(gap_user, minlength=user_count)
+    fast_count = np.bincount(gap_user, weights=seconds_per_answer < fast_seconds_per_answer, minlength=user_count)
+    features["gap_count"] = gap_count
+    features["median_seconds_per_answer"] = group_median(gap_user, seconds_per_answer, user_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features["fast_fraction"] = np.where(gap_count > 0, fast_count / gap_count, np.nan)
+
+    # Agreement with the leading good answer of the other users to the same location
+    location_ids, answer_location_index = np.unique(answer_location, return_inverse=True)
+    answer_location_index = answer_location_index.reshape(-1)
+    location_count = len(location_ids)
+    support = np.bincount(answer_location_index[is_good] * class_count + answer_class[is_good],
+            minlength=location_count * class_count).reshape(location_count, class_count)
+    sorted_support = np.sort(support, axis=1)
+    top_support = sorted_support[:, -1]
+    second_support = sorted_support[:, -2] if class_count > 1 else np.zeros(location_count, dtype=np.int64)
+    top_class = support.argmax(axis=1)
+    own_vote = is_good.astype(np.int64)
+    others_support = support[answer_location_index, answer_class] - own_vote
+    is_top = answer_class == top_class[answer_location_index]
+    others_top = np.where(is_top, np.maximum(top_support[answer_location_index] - own_vote,
+        second_support[answer_location_index]), top_support[answer_location_index])
+    is_comparable = others_top >= min_consensus_count
+    comparable_count = np.bincount(answer_user[is_comparable], minlength=user_count)
+    agree_count = np.bincount(answer_user[is_comparable],
+            weights=others_support[is_comparable] >= others_top[is_comparable], minlength=user_count)
+    features["comparable_count"] = comparable_count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features["agreement"] = np.where(comparable_count > 0, agree_count / comparable_count, np.nan)
+
+    # Gold standard pass rate
+    gold_test_count = user_arrays["gold_test_count"][user_order]
+    gold_pass_count = user_arrays["gold_pass_count"][user_order]
+    features["gold_test_count"] = gold_test_count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features["gold_pass_rate"] = np.where(gold_test_count > 0, gold_pass_count / gold_test_count, np.nan)
+
+    return features
+
+
+def flag_anomalous_users(features, min_signal_count=2, min_answer_count=20, max_entropy=0.1,
+        min_gap_count=5, max_fast_fraction=0.5, min_comparable_count=10, max_agreement=0.3,
+        min_gold_test_count=5, max_gold_pass_rate=0.2):
+    """
+    Flag the normal users (not the admins or the banned users) whose features cross enough thresholds.
+
+    Parameters
+    ----------
+    features : dict of str to numpy.ndarray
+        The result of compute_user_features.
+    min_signal_count : int
+        The minimum number of signals to flag a user.
+    min_answer_count, max_entropy : int, float
+        The "uniform" signal: at least min_answer_count answers with an entropy of at most max_entropy bits.
+    min_gap_count, max_fast_fraction : int, float
+        The "fast" signal: at least max_fast_fraction of at least min_gap_count submissions are too fast.
+    min_comparable_count, max_agreement : int, float
+        The "disagree" signal: at most max_agreement of at least min_comparable_count answers agree with the others.
+    min_gold_test_count, max_gold_pass_rate : int, float
+        The "gold_fail" signal: at most max_gold_pass_rate of at least min_gold_test_count gold standard tests passed.
+
+    Returns
+    -------
+    user_ids : numpy.ndarray
+        IDs of the flagged users.
+    signals : dict of str to numpy.ndarray
+        If each signal is raised for each user (in the order of features["user_ids"]).
+    """
+    signals = {
+        "uniform": (features["answer_count"] >= min_answer_count) & (features["entropy"] <= max_entropy),
+        "fast": (features["gap_count"] >= min_gap_count) & (features["fast_fraction"] >= max_fast_fraction),
+        "disagree": (features["comparable_count"] >= min_comparable_count) & (features["agreement"] <= max_agreement),
+        "gold_fail": (features["gold_test_count"] >= min_gold_test_count)
+            & (features["gold_pass_rate"] <= max_gold_pass_rate)
+    }
+    signal_count = np.sum([signals[name] for name in ANOMALY_SIGNALS], axis=0)
+    is_normal_user = features["client_type"] == 1
+    return features["user_ids"][(signal_count >= min_signal_count) & is_normal_user], signals
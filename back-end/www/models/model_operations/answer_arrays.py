@@ -0,0 +1,268 @@
+"""
+Columnar NumPy arrays of the answer table for the offline batch jobs.
+
+The answers are loaded in one query as arrays (one element per answer),
+so that the whole table can be processed with grouped vectorized operations instead of queries per location.
+NumPy is only required by the batch jobs (see util/recompute_done_locations.py), not by the server.
+"""
+
+import io
+import datetime
+import numpy as np
+from sqlalchemy import text
+from models.model import db
+from models.model_operations.consensus_policy import consensus_policy_state
+from models.model_operations.consensus_policy import get_min_leading_support
+
+
+# The number of location ids in each bulk update
+UPDATE_CHUNK_SIZE = 100000
+
+# The signature at the beginning of the binary COPY format of PostgreSQL
+COPY_BINARY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+
+def copy_query_to_array(sql, column_count, dtype=np.int64):
+    """
+    Run a query with integer columns and load the result as a 2D array with the binary COPY format.
+
+    The columns are cast to bigint, so every row has the same layout (a field count, then a length and a value
+    for each field), and the rows are read with np.frombuffer without creating Python objects for the values.
+
+    Parameters
+    ----------
+    sql : str
+        The query, whose columns are integers that are not null.
+    column_count : int
+        The number of columns.
+    dtype : numpy.dtype
+        The type of the array.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array with one row for each row of the result.
+
+    Raises
+    ------
+    exception : Exception
+        When the result is not in the expected format (e.g., a column is null).
+    """
+    column_names = ["c{}".format(i) for i in range(column_count)]
+    copy_sql = "COPY (SELECT {} FROM ({}) AS q({})) TO STDOUT (FORMAT binary)".format(
+            ", ".join(["{}::bigint".format(name) for name in column_names]), sql, ", ".join(column_names))
+    buffer = io.BytesIO()
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(copy_sql, buffer)
+    finally:
+        cursor.close()
+    data = buffer.getbuffer()
+
+    # The header is the signature, the flags, and the length of the header extension (then the extension)
+    # and the trailer is a field count of -1
+    if bytes(data[0:len(COPY_BINARY_SIGNATURE)]) != COPY_BINARY_SIGNATURE:
+        raise Exception("Unexpected COPY format.")
+    offset = len(COPY_BINARY_SIGNATURE) + 8 + int.from_bytes(data[len(COPY_BINARY_SIGNATURE) + 4:
+        len(COPY_BINARY_SIGNATURE) + 8], "big")
+    row_dtype = np.dtype([("field_count", ">i2")] + [field for name in column_names
+        for field in [(name + "_length", ">i4"), (name, ">i8")]])
+    row_count, remainder = divmod(len(data) - offset - 2, row_dtype.itemsize)
+    if remainder != 0:
+        raise Exception("Unexpected COPY format (is a column null?).")
+
+    rows = np.frombuffer(data, dtype=row_dtype, count=row_count, offset=offset)
+    if not np.all(rows["field_count"] == column_count):
+        raise Exception("Unexpected COPY format.")
+    values = np.empty((row_count, column_count), dtype=dtype)
+    for i, name in enumerate(column_names):
+        if not np.all(rows[name + "_length"] == 8):
+            raise Exception("Unexpected COPY format (is a column null?).")
+        values[:, i] = rows[name]
+    return values
+
+
+def load_answer_arrays(include_timestamp=False):
+    """
+    Load the answer table as columnar arrays.
+
+    Parameters
+    ----------
+    include_timestamp : bool
+        Also load the "timestamp" of the answers, in milliseconds since the epoch (0 if it is missing).
+
+    Returns
+    -------
+    dict of str to numpy.ndarray
+        The "location_id", "user_id", "land_usage", "expansion", and "gold_standard_status" of all the answers.
+    """
+    columns = ["location_id", "user_id", "land_usage", "expansion", "gold_standard_status"]
+    expressions = list(columns)
+    if include_timestamp:
+        expressions.append("coalesce((extract(epoch FROM timestamp) * 1000)::bigint, 0)")
+    values = copy_query_to_array("SELECT {} FROM answer".format(", ".join(expressions)), len(expressions))
+    answer_arrays = {column: values[:, i].astype(np.int32) for i, column in enumerate(columns)}
+    if include_timestamp:
+        answer_arrays["timestamp"] = values[:, len(columns)].copy()
+    return answer_arrays
+
+
+def load_user_arrays():
+    """
+    Load the user table as columnar arrays.
+
+    Returns
+    -------
+    dict of str to numpy.ndarray
+        The "id", "client_type", "gold_pass_count", and "gold_test_count" of all the users.
+    """
+    columns = ["id", "client_type", "gold_pass_count", "gold_test_count"]
+    values = copy_query_to_array('SELECT {} FROM "user"'.format(", ".join(columns)), len(columns))
+    return {column: values[:, i] for i, column in enumerate(columns)}
+
+
+def load_user_trust_weights():
+    """
+    Load the weights of the users for the "trust_weighted" policy (see consensus_policy.py).
+
+    Returns
+    -------
+    numpy.ndarray
+        The smoothed gold standard pass rate of each user, indexed by the user id.
+    """
+    user_arrays = load_user_arrays()
+    size = user_arrays["id"].max() + 1 if len(user_arrays["id"]) > 0 else 1
+    weights = np.zeros(size)
+    weights[user_arrays["id"]] = (user_arrays["gold_pass_count"] + 1.0) / (user_arrays["gold_test_count"] + 2)
+    return weights
+
+
+def load_location_done_flags():
+    """
+    Load which locations are done.
+
+    Returns
+    -------
+    location_ids : numpy.ndarray
+        IDs of all the locations.
+    is_done : numpy.ndarray
+        If each location is done (in the same order as location_ids).
+    """
+    values = copy_query_to_array("SELECT id, (done_at IS NOT NULL)::int FROM location", 2)
+    return values[:, 0], values[:, 1] == 1
+
+
+def get_consensus_flags(answer_arrays, location_count, user_weights=None):
+    """
+    Evaluate the current consensus policy (see consensus_policy.py) for all the locations at once.
+
+    The good answers are counted (or weighted) for each location and answer with one bincount,
+    and the leading answer of each location is compared with the thresholds of the policy.
+
+    Parameters
+    ----------
+    answer_arrays : dict of str to numpy.ndarray
+        The result of load_answer_arrays.
+    location_count : int
+        The number of flags to return (larger than the maximum location id).
+    user_weights : numpy.ndarray
+        The result of load_user_trust_weights (required by the "trust_weighted" policy).
+
+    Returns
+    -------
+    numpy.ndarray
+        If each location has reached consensus, indexed by the location id.
+    """
+    policy = consensus_policy_state["policy"]
+    min_ratio = consensus_policy_state["min_ratio"]
+
+    is_good = answer_arrays["gold_standard_status"] == 1
+    location_id = answer_arrays["location_id"][is_good].astype(np.int64)
+    land_usage = answer_arrays["land_usage"][is_good].astype(np.int64)
+    expansion = answer_arrays["expansion"][is_good].astype(np.int64)
+    if len(location_id) == 0:
+        return np.zeros(location_count, dtype=bool)
+
+    # Encode each (location, answer) as one integer, so that the answers can be counted with bincount
+    land_usage -= land_usage.min()
+    expansion -= expansion.min()
+    expansion_count = int(expansion.max()) + 1
+    class_count = (int(land_usage.max()) + 1) * expansion_count
+    answer_key = location_id * class_count + land_usage * expansion_count + expansion
+
+    if policy == "trust_weighted":
+        weights = user_weights[answer_arrays["user_id"][is_good]]
+    else:
+        weights = None
+    support = np.bincount(answer_key, weights=weights, minlength=location_count * class_count)
+    support = support[0:location_count * class_count].reshape(location_count, class_count)
+
+    leading_support = support.max(axis=1)
+    is_consensus = leading_support >= get_min_leading_support()
+    if policy != "k_matching":
+        is_consensus &= leading_support >= min_ratio * support.sum(axis=1)
+    return is_consensus
+
+
+def recompute_done_locations(clear_done=False, dry_run=False):
+    """
+    Recompute which locations are done by the current consensus policy from the whole answer table,
+    and apply the difference to done_at in bulk updates.
+
+    Parameters
+    ----------
+    clear_done : bool
+        Also clear done_at of the done locations that have not reached consensus
+        (e.g., after raising the thresholds or re-grading the gold standards).
+        Off by default, since it also undoes the locations marked done by earlier or other consensus rules.
+    dry_run : bool
+        Only compute the difference without updating the locations.
+
+    Returns
+    -------
+    set_location_ids : numpy.ndarray
+        IDs of the locations that are (or would be) newly marked done.
+    clear_location_ids : numpy.ndarray
+        IDs of the locations whose done_at is (or would be) cleared.
+    """
+    location_ids, is_done = load_location_done_flags()
+    if len(location_ids) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    answer_arrays = load_answer_arrays()
+    user_weights = load_user_trust_weights() if consensus_policy_state["policy"] == "trust_weighted" else None
+    is_consensus = get_consensus_flags(answer_arrays, int(location_ids.max()) + 1, user_weights=user_weights)[location_ids]
+
+    set_location_ids = location_ids[is_consensus & ~is_done]
+    if clear_done:
+        clear_location_ids = location_ids[is_done & ~is_consensus]
+    else:
+        clear_location_ids = np.array([], dtype=np.int64)
+
+    if not dry_run:
+        set_done_locations_in_bulk(set_location_ids, clear_location_ids)
+
+    return set_location_ids, clear_location_ids
+
+
+def set_done_locations_in_bulk(set_location_ids, clear_location_ids=()):
+    """
+    Mark locations done and clear done_at of other locations in chunked bulk updates, then commit.
+
+    The done bitmap is not updated (see util/rebuild_done_bitmap.py).
+
+    Parameters
+    ----------
+    set_location_ids : numpy.ndarray
+        IDs of the locations to mark done (the ones that are already done keep their done_at).
+    clear_location_ids : numpy.ndarray
+        IDs of the locations to clear done_at.
+    """
+    now = datetime.datetime.now()
+    for start in range(0, len(set_location_ids), UPDATE_CHUNK_SIZE):
+        db.session.execute(text("UPDATE location SET done_at = :now WHERE id = ANY(:ids) AND done_at IS NULL"),
+                {"now": now, "ids": [int(i) for i in set_location_ids[start:start + UPDATE_CHUNK_SIZE]]})
+    for start in range(0, len(clear_location_ids), UPDATE_CHUNK_SIZE):
+        db.session.execute(text("UPDATE location SET done_at = NULL WHERE id = ANY(:ids)"),
+                {"ids": [int(i) for i in clear_location_ids[start:start + UPDATE_CHUNK_SIZE]]})
+    db.session.commit()
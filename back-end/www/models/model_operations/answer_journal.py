@@ -0,0 +1,449 @@
+"""
+Write-behind journal of the submitted answers.
+
+When enabled, the answers are graded in memory (see answer_operations.grade_answers) and appended to a local
+append-only segment file, which is synced to the disk before the response is returned.
+A background thread in each worker process writes the segments into the database in batches
+every few seconds (see answer_operations.write_graded_answers), so the lag is bounded by the flush interval.
+
+Each process appends to its own segment and holds an exclusive file lock on it.
+The segments whose locks are free belong to stopped processes, and they are replayed by any other process.
+How much of a segment has been written is committed together with the answers in the answer_journal_checkpoint table,
+so a segment that is replayed again after a restart does not write the same answers twice.
+The submissions with idempotency keys are recorded when they are written, and the retries in the journal are skipped.
+The answers that cannot be written (e.g., the location has been removed) are moved to a ".failed" file next to the segment
+and logged as errors.
+The answered locations are recorded for the user (and their leases are released) when the answers are appended,
+so that the user does not get the same locations again before the answers are written.
+"""
+
+import os
+import json
+import time
+import fcntl
+import socket
+import logging
+import threading
+from sqlalchemy.dialects.postgresql import insert
+from models.model import db
+from models.model import AnswerJournalCheckpoint
+from models.model_operations.answer_operations import grade_answers
+from models.model_operations.answer_operations import write_graded_answers
+from models.model_operations.answer_operations import apply_written_answers
+from models.model_operations.answer_submission_operations import get_answer_submission_result
+from models.model_operations.answer_submission_operations import claim_answer_submission
+from models.model_operations.user_location_operations import add_user_locations
+from models.model_operations.location_lease_operations import release_location_leases
+from models.model_operations.location_pool import add_seen_locations
+from models.model_operations.manifest_operations import claim_location_manifest
+
+
+logger = logging.getLogger(__name__)
+
+
+# The file name extensions of the segments and the answers that cannot be written
+SEGMENT_SUFFIX = ".journal"
+FAILED_SUFFIX = ".failed"
+
+# The state of the journal in the current process
+# (reset after forking, since threads, locks, and file locks are not shared with the child processes)
+journal_state = {
+    "pid": None,
+    "app": None,
+    "settings": None,
+    "lock": None,
+    "flush_lock": None,
+    "flush_event": None,
+    "segment": None,
+    "pending_segments": None
+}
+
+
+def init_answer_journal(app, journal_dir, flush_seconds=1, batch_size=100, flush_in_background=True):
+    """
+    Enable the answer journal.
+
+    The background thread is started lazily by the first request of each process,
+    because uwsgi forks the workers after the application is loaded.
+
+    Parameters
+    ----------
+    app : flask.Flask
+        The application for creating the database context in the background thread.
+    journal_dir : str
+        Path to the directory of the segments (created if it does not exist).
+    flush_seconds : int
+        The number of seconds between the flushes.
+    batch_size : int
+        The maximum number of submissions written in each transaction.
+    flush_in_background : bool
+        Flush the journal by a background thread.
+        If False, the journal is only flushed by calling flush_answer_journal (e.g., for testing).
+    """
+    close_answer_journal()
+    os.makedirs(journal_dir, exist_ok=True)
+    journal_state["app"] = app
+    journal_state["settings"] = {
+        "journal_dir": journal_dir,
+        "flush_seconds": flush_seconds,
+        "batch_size": batch_size,
+        "flush_in_background": flush_in_background
+    }
+
+
+def is_answer_journal_enabled():
+    """
+    Check if the answer journal is enabled.
+
+    Returns
+    -------
+    bool
+        True if init_answer_journal has been called.
+    """
+    return journal_state["settings"] is not None
+
+
+def ensure_answer_journal_started():
+    """Open a new segment and start the flush thread if this is a new process."""
+    if journal_state["pid"] == os.getpid():
+        return
+
+    journal_state["lock"] = threading.Lock()
+    journal_state["flush_lock"] = threading.Lock()
+    journal_state["flush_event"] = threading.Event()
+    journal_state["segment"] = open_journal_segment()
+    journal_state["pending_segments"] = []
+    journal_state["pid"] = os.getpid()
+
+    if journal_state["settings"]["flush_in_background"]:
+        thread = threading.Thread(target=run_flush_loop, args=(journal_state["pid"],), daemon=True)
+        thread.start()
+        # Replay the segments of the stopped processes right away
+        journal_state["flush_event"].set()
+
+
+def open_journal_segment():
+    """
+    Create and lock a new segment for the current process.
+
+    Returns
+    -------
+    dict
+        The name, path, file descriptor, and size of the segment.
+    """
+    journal_dir = journal_state["settings"]["journal_dir"]
+    name = "answers-{}-{}-{}{}".format(socket.gethostname(), os.getpid(), time.time_ns(), SEGMENT_SUFFIX)
+    path = os.path.join(journal_dir, name)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    # Sync the directory, so that the new file survives a crash
+    dir_fd = os.open(journal_dir, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+    return {"name": name, "path": path, "fd": fd, "size": 0}
+
+
+def journal_answers(user_id, answers, manifest=None, private_key=None,
+        idempotency_key=None, idempotency_seconds=86400, all_gold_required=False):
+    """
+    Grade the answers and append them to the journal, instead of writing them into the database.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    answers : list
+        A list of answers provided by the front-end user (see answer_operations.batch_process_answers).
+    manifest : str
+        The manifest returned together with the locations.
+    private_key : str
+        The private key to decode the manifest.
+    idempotency_key : str
+        The key provided by the front-end for the submission (see answer_operations.batch_process_answers).
+        A retry that arrives before the submission is written is appended again, and skipped when replaying
+        (unless it has a manifest, which records the key, so the retry is not appended).
+    idempotency_seconds : int
+        The number of seconds that the key is kept (see answer_submission_operations.py).
+    all_gold_required : bool
+        Fail the gold standard test if any gold standard is answered wrongly (see answer_operations.batch_process_answers).
+
+    Raises
+    ------
+    exception : Exception
+        The same as answer_operations.batch_process_answers.
+
+    Returns
+    ------
+    bool
+        True if passing the gold standard test.
+    """
+    if idempotency_key is not None:
+        passed = get_answer_submission_result(user_id, idempotency_key, expire_seconds=idempotency_seconds)
+        if passed is not None:
+            return passed
+
+    gold_test_pass_status, non_gold_answer_id_list = grade_answers(user_id, answers, manifest, private_key,
+            all_gold_required=all_gold_required)
+
+    # Record the answered locations and release their leases before the answers are written,
+    # so that the next requests of the user do not return the same locations again
+    # (committed after the answers are appended, so a failure to append leaves no records)
+    answered_location_id_list = [answer["location_id"] for answer in answers]
+    try:
+        # The manifest is claimed with the records, so it cannot be submitted again
+        # (a retry with the same idempotency key is not appended again)
+        if manifest is not None and not claim_location_manifest(manifest, user_id, private_key,
+                idempotency_key=idempotency_key):
+            db.session.rollback()
+            return gold_test_pass_status == 1
+        add_user_locations(user_id, answered_location_id_list)
+        release_location_leases(user_id, answered_location_id_list, commit=False)
+        append_answer_journal(user_id, answers, gold_test_pass_status, non_gold_answer_id_list,
+                idempotency_key=idempotency_key, idempotency_seconds=idempotency_seconds)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    add_seen_locations(user_id, answered_location_id_list)
+
+    return gold_test_pass_status == 1
+
+
+def append_answer_journal(user_id, answers, gold_test_pass_status, non_gold_answer_id_list,
+        idempotency_key=None, idempotency_seconds=86400):
+    """
+    Append graded answers to the segment of the current process and sync it to the disk.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    answers : list
+        A list of answers provided by the front-end user.
+    gold_test_pass_status : int
+        The result of answer_operations.grade_answers.
+    non_gold_answer_id_list : list of int
+        The result of answer_operations.grade_answers.
+    idempotency_key : str
+        The key provided by the front-end for the submission (optional).
+    idempotency_seconds : int
+        The number of seconds that the key is kept.
+    """
+    ensure_answer_journal_started()
+    # Keep the submission time, since the answers are written into the database later
+    record = {"user_id": user_id, "answers": answers, "gold_test_pass_status": gold_test_pass_status,
+            "non_gold_answer_id_list": non_gold_answer_id_list, "submitted_at": time.time()}
+    if idempotency_key is not None:
+        record["idempotency_key"] = idempotency_key
+        record["idempotency_seconds"] = idempotency_seconds
+    line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+    with journal_state["lock"]:
+        segment = journal_state["segment"]
+        written = 0
+        while written < len(line):
+            written += os.write(segment["fd"], line[written:])
+        os.fsync(segment["fd"])
+        segment["size"] += len(line)
+
+
+def rotate_answer_journal():
+    """Start a new segment for appending, and queue the current segment for flushing if it is not empty."""
+    with journal_state["lock"]:
+        segment = journal_state["segment"]
+        if segment["size"] == 0:
+            return
+        journal_state["segment"] = open_journal_segment()
+        journal_state["pending_segments"].append(segment)
+
+
+def run_flush_loop(pid):
+    """
+    Flush the journal periodically, until the process changes.
+
+    Parameters
+    ----------
+    pid : int
+        ID of the process that starts the thread.
+    """
+    while journal_state["pid"] == pid:
+        journal_state["flush_event"].wait(timeout=journal_state["settings"]["flush_seconds"])
+        journal_state["flush_event"].clear()
+        if journal_state["pid"] != pid:
+            break
+        try:
+            with journal_state["app"].app_context():
+                flush_answer_journal()
+                db.session.remove()
+        except Exception as ex:
+            logger.exception("Failed to flush the answer journal: %r", ex)
+            time.sleep(1)
+
+
+def flush_answer_journal():
+    """
+    Write the segments of the current process and the segments of the stopped processes into the database.
+
+    Returns
+    -------
+    int
+        The number of submissions written into the database.
+    """
+    ensure_answer_journal_started()
+    with journal_state["flush_lock"]:
+        rotate_answer_journal()
+        write_count = 0
+
+        # The segments are removed from the queue first, since a segment that fails to be replayed is unlocked,
+        # and it is replayed again from the journal directory
+        while len(journal_state["pending_segments"]) > 0:
+            segment = journal_state["pending_segments"].pop(0)
+            write_count += replay_journal_segment(segment["name"], segment["fd"])
+
+        journal_dir = journal_state["settings"]["journal_dir"]
+        for name in sorted(os.listdir(journal_dir)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            fd = try_lock_journal_segment(os.path.join(journal_dir, name))
+            if fd is not None:
+                write_count += replay_journal_segment(name, fd)
+
+    return write_count
+
+
+def try_lock_journal_segment(path):
+    """
+    Lock a segment if it is not locked by a running process.
+
+    Parameters
+    ----------
+    path : str
+        Path to the segment.
+
+    Returns
+    -------
+    int or None
+        The file descriptor that holds the lock, or None if the segment is locked or has been removed.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # The segment may have been replayed and removed by another process before the lock is acquired
+        if os.stat(path).st_ino == os.fstat(fd).st_ino:
+            return fd
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    os.close(fd)
+    return None
+
+
+def replay_journal_segment(name, fd):
+    """
+    Write a locked segment into the database from the checkpoint, then remove the segment.
+
+    Parameters
+    ----------
+    name : str
+        The file name of the segment.
+    fd : int
+        The file descriptor that holds the lock of the segment
+        (closed after the segment is removed, or when failing to replay it).
+
+    Returns
+    -------
+    int
+        The number of submissions written into the database.
+    """
+    journal_dir = journal_state["settings"]["journal_dir"]
+    batch_size = journal_state["settings"]["batch_size"]
+
+    try:
+        checkpoint = AnswerJournalCheckpoint.query.filter_by(segment=name).first()
+        offset = 0 if checkpoint is None else checkpoint.flushed_offset
+        db.session.rollback()
+
+        with os.fdopen(os.dup(fd), "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        # Ignore the last line if it is incomplete (the process stopped while appending it, so it was never acknowledged)
+        lines = data[0:data.rfind(b"\n") + 1].split(b"\n")[0:-1]
+
+        write_count = 0
+        for start in range(0, len(lines), batch_size):
+            written_records = []
+            failed_lines = []
+            for line in lines[start:start + batch_size]:
+                offset += len(line) + 1
+                try:
+                    record = json.loads(line)
+                    with db.session.begin_nested():
+                        # Skip the retries of the submissions that have been written
+                        if "idempotency_key" in record and not claim_answer_submission(record["user_id"],
+                                record["idempotency_key"], record["gold_test_pass_status"] == 1,
+                                expire_seconds=record["idempotency_seconds"]):
+                            continue
+                        done_location_id_list = write_graded_answers(record["user_id"], record["answers"],
+                                record["gold_test_pass_status"], record["non_gold_answer_id_list"],
+                                submitted_at=record.get("submitted_at"))
+                    written_records.append((record, done_location_id_list))
+                except Exception as ex:
+                    logger.exception("Failed to write answers from the journal segment %s: %r", name, ex)
+                    failed_lines.append(line)
+
+            # Commit the answers together with the checkpoint
+            statement = insert(AnswerJournalCheckpoint.__table__).values(segment=name, flushed_offset=offset)
+            statement = statement.on_conflict_do_update(index_elements=["segment"],
+                    set_={"flushed_offset": statement.excluded.flushed_offset})
+            db.session.execute(statement)
+            db.session.commit()
+
+            # Move the failed lines only after the checkpoint is committed,
+            # otherwise they are moved again when the batch is replayed from the old checkpoint
+            if len(failed_lines) > 0:
+                failed_path = os.path.join(journal_dir, name[0:-len(SEGMENT_SUFFIX)] + FAILED_SUFFIX)
+                with open(failed_path, "ab") as f:
+                    f.write(b"".join([line + b"\n" for line in failed_lines]))
+                logger.error("Moved %d submissions that cannot be written from the journal segment %s to %s",
+                        len(failed_lines), name, failed_path)
+
+            for record, done_location_id_list in written_records:
+                apply_written_answers(record["user_id"], record["answers"], done_location_id_list)
+            write_count += len(written_records)
+    except Exception:
+        # Unlock the segment, so that it is replayed from the checkpoint by the next flush
+        db.session.rollback()
+        os.close(fd)
+        raise
+
+    # The segment is fully written
+    os.unlink(os.path.join(journal_dir, name))
+    os.close(fd)
+    AnswerJournalCheckpoint.query.filter_by(segment=name).delete(synchronize_session=False)
+    db.session.commit()
+
+    return write_count
+
+
+def close_answer_journal():
+    """Close the segment of the current process (without flushing) and disable the answer journal."""
+    if journal_state["pid"] == os.getpid():
+        segments = journal_state["pending_segments"] + [journal_state["segment"]]
+        for segment in segments:
+            os.close(segment["fd"])
+    journal_state["pid"] = None
+    journal_state["app"] = None
+    journal_state["settings"] = None
+    journal_state["lock"] = None
+    journal_state["flush_lock"] = None
+    journal_state["flush_event"] = None
+    journal_state["segment"] = None
+    journal_state["pending_segments"] = None
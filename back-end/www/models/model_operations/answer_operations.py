@@ -1,6 +1,27 @@
 """Functions to operate the location table."""
+from collections import Counter
+from sqlalchemy import func
+from sqlalchemy import insert
 from models.model import db
 from models.model import Answer
+from models.model_operations.location_lease_operations import release_location_leases
+from models.model_operations.location_pool import add_seen_locations
+from models.model_operations import gold_standard_cache
+from models.model_operations.cache_generation_operations import bump_cache_generation
+from models.model_operations.done_bitmap import is_location_done_by_bitmap
+from models.model_operations.done_bitmap import set_done_bitmap
+from models.model_operations.user_operations import record_gold_test_result
+from models.model_operations.manifest_operations import decode_location_manifest
+from models.model_operations.manifest_operations import exam_gold_standard_by_manifest
+from models.model_operations.manifest_operations import claim_location_manifest
+from models.model_operations.user_location_operations import add_user_locations
+from models.model_operations.user_location_operations import remove_user_location_if_unanswered
+from models.model_operations.location_tally_operations import update_location_tallies
+from models.model_operations.location_tally_operations import get_location_tallies
+from models.model_operations.answer_submission_operations import get_answer_submission_result
+from models.model_operations.answer_submission_operations import claim_answer_submission
+from models.model_operations.consensus_policy import consensus_policy_state
+from models.model_operations.consensus_policy import set_consensus_locations_done
 
 
 def create_answer(user_id, location_id, year_old, year_new,
@@ -83,12 +104,98 @@ def create_answer(user_id, location_id, year_old, year_new,
             bbox_bottom_right_lat=bbox_bottom_right_lat,
             bbox_bottom_right_lng=bbox_bottom_right_lng, zoom_level=zoom_level)
 
+    from models.model_operations.location_operations import increment_location_answer_count
+
     db.session.add(answer)
-    db.session.commit()
+    add_user_locations(user_id, [location_id])
+    increment_location_answer_count([location_id], commit=False)
+    if gold_standard_status == 1:
+        update_location_tallies({(location_id, land_usage, expansion): 1})
+
+    # Notify the processes that cache the gold standards if a new one is added
+    if gold_standard_status == 0:
+        generation = bump_cache_generation(gold_standard_cache.GENERATION_NAME)
+        db.session.commit()
+        gold_standard_cache.update_cached_gold_answer(answer, False, generation)
+    else:
+        db.session.commit()
 
     return answer
 
 
+def create_answers(user_id, answers, gold_standard_status, timestamp=None):
+    """
+    Create the answers submitted together by an user in one statement.
+
+    The answers are written in the current transaction without committing,
+    so that they are committed together with the other changes of the submission (see batch_process_answers).
+    Use create_answer for the gold answers, which need to notify the gold standard cache.
+
+    Parameters
+    ----------
+    user_id : int
+        Foreign key to the user table.
+    answers : list of dict
+        The answers, with the same keys as the parameters of create_answer
+        (see batch_process_answers for the structure).
+    gold_standard_status : int
+        The status of the answer quality, which is the same for all the answers.
+        (check the answer table in model.py for the meaning of the values)
+    timestamp : float
+        The UNIX time when the answers were submitted (e.g., replayed from the answer journal).
+        (optional, the time of writing the answers by default)
+
+    Returns
+    -------
+    dict of (int, int, int) to int
+        The number of good answers (including the new ones) of each (location_id, land_usage, expansion)
+        in the answers if gold_standard_status is 1 (see location_tally_operations.update_location_tallies),
+        or an empty dict otherwise.
+
+    Raises
+    ------
+    exception : Exception
+        The same type checking as create_answer.
+    exception : Exception
+        When gold_standard_status is 0 (gold standard).
+    """
+    if not isinstance(gold_standard_status, int):
+        raise Exception("The gold_standard_status shall be an integer")
+    if gold_standard_status == 0:
+        raise Exception("Gold answers shall be created by create_answer.")
+    for answer in answers:
+        if not isinstance(answer["land_usage"], int):
+            raise Exception("The land_usage shall be an integer")
+        if not isinstance(answer["expansion"], int):
+            raise Exception("The expansion shall be an integer")
+        if not isinstance(answer["year_old"], int):
+            raise Exception("The photo year shall be an integer")
+        if not isinstance(answer["year_new"], int):
+            raise Exception("The photo year shall be an integer")
+
+    if len(answers) == 0:
+        return {}
+
+    keys = ["location_id", "year_old", "year_new", "source_url_root", "land_usage", "expansion"]
+    optional_keys = ["bbox_left_top_lat", "bbox_left_top_lng", "bbox_bottom_right_lat", "bbox_bottom_right_lng", "zoom_level"]
+    values = []
+    for answer in answers:
+        value = {key: answer[key] for key in keys}
+        value.update({key: answer.get(key, 0) for key in optional_keys})
+        value["user_id"] = user_id
+        value["gold_standard_status"] = gold_standard_status
+        if timestamp is not None:
+            value["timestamp"] = func.to_timestamp(timestamp)
+        values.append(value)
+    db.session.execute(insert(Answer.__table__).values(values))
+    add_user_locations(user_id, [answer["location_id"] for answer in answers])
+
+    if gold_standard_status != 1:
+        return {}
+    tally_changes = Counter([(answer["location_id"], answer["land_usage"], answer["expansion"]) for answer in answers])
+    return update_location_tallies(tally_changes)
+
+
 def get_answer_count(user_id=None):
     """
     Get total number of answers.
@@ -104,8 +211,9 @@ def get_answer_count(user_id=None):
 def get_gold_answer_count():
     """
     Get total number of answers, excluding gold answers.
+    (from the gold standard cache)
     """
-    answer_count = Answer.query.filter_by(gold_standard_status=0).count()
+    answer_count = gold_standard_cache.get_cached_gold_answer_count()
     return answer_count
 
 
@@ -196,7 +304,12 @@ def get_gold_answer_by_location(location_id):
     answers : Answer
         The gold answer.
     """
-    answer = Answer.query.filter_by(gold_standard_status=0, location_id=location_id).first()
+    # Look up the cache first, so that locations without gold answers need no queries
+    answer_id = gold_standard_cache.get_gold_answer_id(location_id)
+    if answer_id is None:
+        return None
+
+    answer = db.session.get(Answer, answer_id)
     return answer
 
 
@@ -214,13 +327,26 @@ def remove_answer(answer_id):
     exception : Exception
         When no answer is found.
     """
+    from models.model_operations.location_operations import decrement_location_answer_count
+
     answer = get_answer_by_id(answer_id)
 
     if answer is None:
         raise Exception("Cannot find answer with id ", answer_id)
 
+    user_id = answer.user_id
+    location_id = answer.location_id
+    was_gold = answer.gold_standard_status == 0
     db.session.delete(answer)
+    decrement_location_answer_count([location_id], commit=False)
+    if answer.gold_standard_status == 1:
+        update_location_tallies({(location_id, answer.land_usage, answer.expansion): -1})
+    if was_gold:
+        bump_cache_generation(gold_standard_cache.GENERATION_NAME)
     db.session.commit()
+    remove_user_location_if_unanswered(user_id, location_id)
+    if was_gold:
+        gold_standard_cache.invalidate_gold_answers()
 
 
 def set_answer(answer_id, new_status, land_usage, expansion):
@@ -253,10 +379,27 @@ def set_answer(answer_id, new_status, land_usage, expansion):
     answer = get_answer_by_id(answer_id)
 
     if answer is not None:
+        was_gold = answer.gold_standard_status == 0
+
+        # Move the answer between the tallies of the good answers
+        tally_changes = Counter()
+        if answer.gold_standard_status == 1:
+            tally_changes[(answer.location_id, answer.land_usage, answer.expansion)] -= 1
+        if new_status == 1:
+            tally_changes[(answer.location_id, land_usage, expansion)] += 1
+        update_location_tallies({answer_key: change for answer_key, change in tally_changes.items() if change != 0})
+
         answer.gold_standard_status = new_status
         answer.land_usage = land_usage
         answer.expansion = expansion
-        db.session.commit()
+
+        # Notify the processes that cache the gold standards if a gold answer is changed
+        if was_gold or new_status == 0:
+            generation = bump_cache_generation(gold_standard_cache.GENERATION_NAME)
+            db.session.commit()
+            gold_standard_cache.update_cached_gold_answer(answer, was_gold, generation)
+        else:
+            db.session.commit()
     
     return answer
 
@@ -284,16 +427,16 @@ def exam_gold_standard(location_id, land_usage, expansion):
         1 means passing the gold standard test.
         2 means failing the gold standard test.
     """
-    # gold_standard_status 0 means that the answer is a gold standard
-    gold_answer = Answer.query.filter_by(gold_standard_status=0, location_id=location_id).first()
+    # gold_standard_status 0 means that the answer is a gold standard (cached in gold_standard_cache)
+    gold_answer_class = gold_standard_cache.get_gold_answer_class(location_id)
 
     # If the gold answer doesn't exist
-    if gold_answer is None:
+    if gold_answer_class is None:
         result = 0
         return result
 
     # If the gold answer exists, check the correctness
-    if gold_answer.land_usage == land_usage and gold_answer.expansion == expansion:
+    if gold_answer_class == (land_usage, expansion):
         result = 1
     else:
         result = 2
@@ -301,12 +444,100 @@ def exam_gold_standard(location_id, land_usage, expansion):
     return result
 
 
+def exam_gold_standards(answers, manifest_payload=None, private_key=None):
+    """
+    Check the quality of a batch of answers in comparison with the gold standards (see exam_gold_standard).
+
+    All the answers are graded in memory, either by the manifest,
+    or by one lookup of the cached gold answers, so the batch is graded against the same gold standards.
+
+    Parameters
+    ----------
+    answers : list of dict
+        The answers with "location_id", "land_usage", and "expansion" (see batch_process_answers).
+    manifest_payload : dict
+        The decoded manifest (see manifest_operations.py), or None to use the cached gold answers.
+    private_key : str
+        The private key to check the signatures in the manifest.
+
+    Return
+    ------
+    list of int
+        Result of the checking of each answer (0, 1, or 2 as in exam_gold_standard).
+
+    Raises
+    ------
+    exception : Exception
+        When the manifest is given and a location is not in the manifest.
+    """
+    if manifest_payload is not None:
+        return [exam_gold_standard_by_manifest(manifest_payload, private_key,
+            answer["location_id"], answer["land_usage"], answer["expansion"]) for answer in answers]
+
+    gold_answer_classes = gold_standard_cache.get_gold_answer_classes([answer["location_id"] for answer in answers])
+    result_list = []
+    for answer in answers:
+        gold_answer_class = gold_answer_classes.get(answer["location_id"])
+        if gold_answer_class is None:
+            result_list.append(0)
+        elif gold_answer_class == (answer["land_usage"], answer["expansion"]):
+            result_list.append(1)
+        else:
+            result_list.append(2)
+    return result_list
+
+
+def get_good_answer_count(location_id, land_usage, expansion):
+    """
+    Get the number of good answers (from users who passed the gold standard test) matching an answer.
+
+    Parameters
+    ----------
+    location_id : int
+        ID of the location.
+    land_usage : int
+        User's answer of judging if the land is a farm or has buildings.
+        (check the answer table in model.py for the meaning of the values)
+    expansion : int
+        User's answer of judging the construction is expanded.
+        (check the answer table in model.py for the meaning of the values)
+
+    Return
+    ------
+    int
+        The number of matching good answers.
+    """
+    good_answer_counts = get_location_tallies([(location_id, land_usage, expansion)])
+    return good_answer_counts[(location_id, land_usage, expansion)]
+
+
+def get_good_answer_counts(answers):
+    """
+    Get the number of good answers matching each answer of a batch with one lookup of the location tallies.
+
+    Parameters
+    ----------
+    answers : list of dict
+        The answers with "location_id", "land_usage", and "expansion" (see batch_process_answers).
+
+    Return
+    ------
+    dict of (int, int, int) to int
+        The number of matching good answers, keyed by the (location_id, land_usage, expansion) of each answer.
+    """
+    answer_key_list = [(answer["location_id"], answer["land_usage"], answer["expansion"]) for answer in answers]
+    return get_location_tallies(answer_key_list)
+
+
 def is_answer_reliable(location_id, land_usage, expansion):
     """
     Before submitting to DB, we judge if an answer reliable and set the location done if:
     1. The user passes the gold standard test
     2. Another user passes the gold standard test, and submitted the same answer as it.
 
+    This is not used when processing the answers, which mark the locations done
+    by the configured consensus policy in batch (see consensus_policy.set_consensus_locations_done).
+
     Parameters
     ----------
     location_id : int
@@ -326,50 +557,46 @@ def is_answer_reliable(location_id, land_usage, expansion):
         False : No other good answer candidates exist or match.
     """
     # If another user passed the gold standard quality test, and submitted an answer to the same location.
-    good_answer_candidates = Answer.query.filter_by(gold_standard_status=1, location_id=location_id, land_usage=land_usage, expansion=expansion).all()
+    good_answer_count = get_good_answer_count(location_id, land_usage, expansion)
 
     # If the good answer candidate doesn't exist
-    #if len(good_answer_candidates) == 0:   # 2 are considered as good, need at least 1
-    #if len(good_answer_candidates) < 2:        # 3 are considered as good, need at least 2 
-    if len(good_answer_candidates) < 3:
+    #if good_answer_count == 0:   # 2 are considered as good, need at least 1
+    #if good_answer_count < 2:        # 3 are considered as good, need at least 2 
+    if good_answer_count < consensus_policy_state["match_count"]:
         return False
     else:
         return True
 
 
-def batch_process_answers(user_id, answers):
+def grade_answers(user_id, answers, manifest=None, private_key=None, all_gold_required=False):
     """
-    Process the answers returned by the front-end and write them into the database.
+    Check the answers returned by the front-end and grade the gold standard test, without writing to the database.
 
     Parameters
     ----------
+    user_id : int
+        ID of the user.
     answers : list
-        A list of answers provided by the front-end user.
-        Each answer should be a dictionary with the following structure:
-            {"location_id": XXX,
-             "year_new": XXX,
-             "year_old": XXX,
-             "zoom_level": XXX,
-             "bbox_bottom_right_lat": XXX,
-             "bbox_bottom_right_lng": XXX,
-             "bbox_left_top_lng": XXX,
-             "bbox_left_top_lat": XXX,
-             "land_usage": XXX,
-             "source_url_root" : XXX,
-             "expansion": XXX}
-        The explanation of the parameters are in the answer table in the model.py file.
+        A list of answers provided by the front-end user (see batch_process_answers).
+    manifest : str
+        The manifest returned together with the locations (see batch_process_answers).
+    private_key : str
+        The private key to decode the manifest.
+    all_gold_required : bool
+        Fail the gold standard test if any gold standard is answered wrongly (see batch_process_answers).
+        Otherwise, the test is graded by the first answer corresponding to a gold standard.
 
     Raises
     ------
     exception : Exception
-        If "location_id" or "land_usage" or "expansion" not exist in the dictionary of an answer.
-    exception : Exception
-        When no gold standards are found.
+        The same as batch_process_answers.
 
     Returns
     ------
-    bool
-        True if passing the gold standard test.
+    gold_test_pass_status : int
+        1 if passing the gold standard test, or 2 if failing.
+    non_gold_answer_id_list : list of int
+        The indices of the answers to the locations without gold standards.
     """
     if answers is None:
         raise Exception("Please provide answers.")
@@ -378,8 +605,6 @@ def batch_process_answers(user_id, answers):
     if len(answers) < 2:
         raise Exception("Not enough answers.")
 
-    from models.model_operations.location_operations import set_location_done
-
     # The following explains the gold_test_pass_status:
     # - None means if the user's answer set doesn't include a gold standard test, which is not reasonable
     # - 1 means if the user passes the gold standard test
@@ -388,50 +613,208 @@ def batch_process_answers(user_id, answers):
     gold_test_pass_status = None
     non_gold_answer_id_list = []
 
-    # The first parse is to check the gold standard test result.
+    # Each location can only be answered once in a submission
+    # (otherwise the repeated answers are counted more than once when checking the consensus)
+    answered_location_id_list = [answer.get("location_id") for answer in answers]
+    if len(set(answered_location_id_list)) < len(answered_location_id_list):
+        raise Exception("A location is answered more than once.")
+
+    manifest_payload = None
+    if manifest is not None:
+        manifest_payload = decode_location_manifest(manifest, user_id, private_key)
+
+    for idx in range(len(answers)):
+        for key in ["location_id", "land_usage", "expansion", "source_url_root", "year_old", "year_new"]:
+            if key not in answers[idx]:
+                raise Exception("Missing {} in answer {}.".format(key, idx + 1))
+        for key in ["land_usage", "expansion", "year_old", "year_new"]:
+            if not isinstance(answers[idx][key], int):
+                raise Exception("The {} shall be an integer in answer {}.".format(key, idx + 1))
+
+    # The first parse is to check the gold standard test result (the whole batch is graded at once).
+    status_list = exam_gold_standards(answers, manifest_payload, private_key)
     for idx in range(len(answers)):
-        if "location_id" not in answers[idx]:
-            raise Exception("Missing location_id in answer {}.".format(idx + 1))
-        if "land_usage" not in answers[idx]:
-            raise Exception("Missing land_usage in answer {}.".format(idx + 1))
-        if "expansion" not in answers[idx]:
-            raise Exception("Missing expansion in answer {}.".format(idx + 1))
-        if "source_url_root" not in answers[idx]:
-            raise Exception("Missing source_url_root in answer {}.".format(idx + 1))
-
-        # Check every answer to see if gold standard exists
-        status = exam_gold_standard(answers[idx]["location_id"], answers[idx]["land_usage"], answers[idx]["expansion"])
+        status = status_list[idx]
         if status == 0:
             non_gold_answer_id_list.append(idx)
         else:
             # This condition means a gold standard exists.
-            # Assign gold_test_pass_status only once when an answer corresponding to a gold answer is found.
-            if gold_test_pass_status is None:
+            # Assign gold_test_pass_status only once when an answer corresponding to a gold answer is found,
+            # unless all the gold answers are required (then any wrong answer fails the test).
+            if gold_test_pass_status is None or (all_gold_required and gold_test_pass_status != 2):
                 gold_test_pass_status = status
 
     # If no answer corresponding to the gold standard is found, something must be wrong.
     if gold_test_pass_status is None:
         raise Exception("The answer set is not correct.")
 
+    return gold_test_pass_status, non_gold_answer_id_list
+
+
+def write_graded_answers(user_id, answers, gold_test_pass_status, non_gold_answer_id_list, submitted_at=None):
+    """
+    Write the graded answers into the database in the current transaction without committing.
+
+    The caller should commit, and then call apply_written_answers with the result.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    answers : list
+        A list of answers provided by the front-end user (see batch_process_answers).
+    gold_test_pass_status : int
+        The result of grade_answers.
+    non_gold_answer_id_list : list of int
+        The result of grade_answers.
+    submitted_at : float
+        The UNIX time when the answers were submitted (optional, see create_answers).
+
+    Returns
+    ------
+    done_location_id_list : list of int
+        IDs of the locations that are marked done by the answers.
+    """
+    from models.model_operations.location_operations import increment_location_answer_count
+
+    answered_location_id_list = [answer["location_id"] for answer in answers]
+    done_location_id_list = []
+
+    # Keep the record for deciding how many gold standards to give the user
+    record_gold_test_result(user_id, gold_test_pass_status == 1, commit=False)
+
+    # Submit all the answers (and get the tallies of the good answers including them).
+    new_good_answer_counts = create_answers(user_id, answers, gold_test_pass_status, timestamp=submitted_at)
+
     # If user passes gold standard test, check if locations from the answers need to be set done_at.
     if gold_test_pass_status == 1:
-        for idx in non_gold_answer_id_list:
-            # Check if another good answer candidate exists and matches to mark the location done.
-            result = is_answer_reliable(answers[idx]["location_id"], answers[idx]["land_usage"], answers[idx]["expansion"])
-            if result == True:
-                set_location_done(answers[idx]["location_id"], True)
+        # Skip the locations that are already done (e.g., answered after the lease expired)
+        check_answer_key_list = [(answers[idx]["location_id"], answers[idx]["land_usage"], answers[idx]["expansion"])
+                for idx in non_gold_answer_id_list if not is_location_done_by_bitmap(answers[idx]["location_id"])]
+
+        # Mark the locations that reach consensus by the configured policy done
+        # (the tallies include the answers of this submission, one per location, see grade_answers)
+        # (the consensus counts of the locations are updated together with the tallies)
+        done_location_id_list = set_consensus_locations_done(check_answer_key_list, commit=False)
+
+    # Keep track of how many answers each location has for scheduling
+    increment_location_answer_count(answered_location_id_list, commit=False)
+
+    # Return the answered locations to the pool by releasing the leases
+    release_location_leases(user_id, answered_location_id_list, commit=False)
+
+    return done_location_id_list
+
+
+def apply_written_answers(user_id, answers, done_location_id_list):
+    """
+    Update the in-process caches after the answers written by write_graded_answers are committed.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    answers : list
+        A list of answers provided by the front-end user (see batch_process_answers).
+    done_location_id_list : list of int
+        The result of write_graded_answers.
+    """
+    for location_id in done_location_id_list:
+        set_done_bitmap(location_id, True)
+    add_seen_locations(user_id, [answer["location_id"] for answer in answers])
+
+
+def batch_process_answers(user_id, answers, manifest=None, private_key=None,
+        idempotency_key=None, idempotency_seconds=86400, all_gold_required=False):
+    """
+    Process the answers returned by the front-end and write them into the database.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    answers : list
+        A list of answers provided by the front-end user.
+        Each answer should be a dictionary with the following structure:
+            {"location_id": XXX,
+             "year_new": XXX,
+             "year_old": XXX,
+             "zoom_level": XXX,
+             "bbox_bottom_right_lat": XXX,
+             "bbox_bottom_right_lng": XXX,
+             "bbox_left_top_lng": XXX,
+             "bbox_left_top_lat": XXX,
+             "land_usage": XXX,
+             "source_url_root" : XXX,
+             "expansion": XXX}
+        The explanation of the parameters are in the answer table in the model.py file.
+    manifest : str
+        The manifest returned together with the locations (see manifest_operations.py).
+        If provided, the answers are graded by the manifest without querying the gold answers,
+        and only the locations in the manifest can be answered.
+        Each manifest can only be submitted once (a retry with the same idempotency_key is not written again).
+    private_key : str
+        The private key to decode the manifest.
+    idempotency_key : str
+        The key provided by the front-end for the submission (optional, at most 64 characters).
+        If the same user has submitted with the same key, the original result is returned without writing the answers.
+    idempotency_seconds : int
+        The number of seconds that the key is kept (see answer_submission_operations.py).
+    all_gold_required : bool
+        Fail the gold standard test if any gold standard in the batch is answered wrongly,
+        for the batches with several gold standards (see user_operations.get_adaptive_gold_standard_size).
+        Otherwise, the test is graded by the first answer corresponding to a gold standard.
+
+    Raises
+    ------
+    exception : Exception
+        If "location_id" or "land_usage" or "expansion" not exist in the dictionary of an answer.
+    exception : Exception
+        When no gold standards are found.
+    exception : Exception
+        When a location is answered more than once.
+    exception : Exception
+        When the manifest is invalid, or an answered location is not in the manifest.
+    exception : Exception
+        When the manifest has been submitted.
+    exception : Exception
+        When the idempotency_key is invalid.
+
+    Returns
+    ------
+    bool
+        True if passing the gold standard test.
+    """
+    if idempotency_key is not None:
+        passed = get_answer_submission_result(user_id, idempotency_key, expire_seconds=idempotency_seconds)
+        if passed is not None:
+            return passed
+
+    gold_test_pass_status, non_gold_answer_id_list = grade_answers(user_id, answers, manifest, private_key,
+            all_gold_required=all_gold_required)
+
+    # All the changes are written in one transaction, so a failure leaves no partial writes
+    try:
+        # The key is claimed in the same transaction, so a concurrent retry waits and then writes nothing
+        if idempotency_key is not None and not claim_answer_submission(user_id, idempotency_key,
+                gold_test_pass_status == 1, expire_seconds=idempotency_seconds):
+            db.session.rollback()
+            passed = get_answer_submission_result(user_id, idempotency_key, expire_seconds=idempotency_seconds)
+            return gold_test_pass_status == 1 if passed is None else passed
+        # The manifest is claimed in the same transaction, so it cannot be submitted again
+        # (a retry of a submission that is still in the answer journal is not written again)
+        if manifest is not None and not claim_location_manifest(manifest, user_id, private_key,
+                idempotency_key=idempotency_key):
+            db.session.rollback()
+            return gold_test_pass_status == 1
+        done_location_id_list = write_graded_answers(user_id, answers, gold_test_pass_status, non_gold_answer_id_list)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    apply_written_answers(user_id, answers, done_location_id_list)
 
-    # Second parse to submit all the answers.
-    for idx in range(len(answers)):
-        try:
-            create_answer(user_id, answers[idx]["location_id"],
-                    answers[idx]["year_old"], answers[idx]["year_new"], answers[idx]["source_url_root"],
-                    answers[idx]["land_usage"], answers[idx]["expansion"], gold_test_pass_status,
-                    answers[idx]["bbox_left_top_lat"], answers[idx]["bbox_left_top_lng"],
-                    answers[idx]["bbox_bottom_right_lat"], answers[idx]["bbox_bottom_right_lng"],
-                    answers[idx]["zoom_level"])
-        except Exception as errmsg:
-            raise Exception(errmsg)
     if gold_test_pass_status == 1:
         return True
     else:
@@ -0,0 +1,116 @@
+"""Functions to operate the answer_submission table."""
+
+import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from models.model import db
+from models.model import AnswerSubmission
+
+
+def check_idempotency_key(idempotency_key):
+    """
+    Check the idempotency key provided by the front-end.
+
+    Parameters
+    ----------
+    idempotency_key : str
+        The key provided by the front-end for the submission.
+
+    Raises
+    ------
+    exception : Exception
+        When the idempotency_key is not a string of 1 to 64 characters.
+    """
+    if not isinstance(idempotency_key, str) or len(idempotency_key) == 0 or len(idempotency_key) > 64:
+        raise Exception("The idempotency_key shall be a string of 1 to 64 characters.")
+
+
+def get_answer_submission_result(user_id, idempotency_key, expire_seconds=86400):
+    """
+    Get the result of a submission that has been processed.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    idempotency_key : str
+        The key provided by the front-end for the submission.
+    expire_seconds : int
+        The number of seconds before a processed submission expires.
+
+    Returns
+    -------
+    bool or None
+        If the user passed the gold standard test, or None if the submission has not been processed (or has expired).
+
+    Raises
+    ------
+    exception : Exception
+        When the idempotency_key is not a string of 1 to 64 characters.
+    """
+    check_idempotency_key(idempotency_key)
+    submission = AnswerSubmission.query.filter(AnswerSubmission.user_id==user_id,
+            AnswerSubmission.idempotency_key==idempotency_key,
+            AnswerSubmission.created_at > func.now() - datetime.timedelta(seconds=expire_seconds)).first()
+    return None if submission is None else submission.passed
+
+
+def claim_answer_submission(user_id, idempotency_key, passed, expire_seconds=86400):
+    """
+    Record a submission before writing its answers.
+
+    The row is written in the current transaction without committing, so that it is committed together with the answers.
+    If a concurrent request with the same key has written the row, this waits until that request ends.
+    An expired row with the same key is overwritten.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    idempotency_key : str
+        The key provided by the front-end for the submission.
+    passed : bool
+        If the user passed the gold standard test.
+    expire_seconds : int
+        The number of seconds before a processed submission expires.
+
+    Returns
+    -------
+    bool
+        True if the submission is recorded, or False if it has been processed (the answers should not be written).
+
+    Raises
+    ------
+    exception : Exception
+        When the idempotency_key is not a string of 1 to 64 characters.
+    """
+    check_idempotency_key(idempotency_key)
+
+    table = AnswerSubmission.__table__
+    statement = insert(table).values(user_id=user_id, idempotency_key=idempotency_key, passed=passed)
+    statement = statement.on_conflict_do_update(index_elements=["user_id", "idempotency_key"],
+            set_={"passed": statement.excluded.passed, "created_at": func.now()},
+            where=table.c.created_at <= func.now() - datetime.timedelta(seconds=expire_seconds))
+    statement = statement.returning(table.c.user_id)
+    return db.session.execute(statement).first() is not None
+
+
+def remove_expired_answer_submissions(expire_seconds=86400):
+    """
+    Remove the submissions that have expired.
+
+    Parameters
+    ----------
+    expire_seconds : int
+        The number of seconds before a processed submission expires.
+
+    Returns
+    -------
+    int
+        The number of removed submissions.
+    """
+    count = AnswerSubmission.query.filter(
+            AnswerSubmission.created_at <= func.now() - datetime.timedelta(seconds=expire_seconds)).delete(
+            synchronize_session=False)
+    db.session.commit()
+    return count
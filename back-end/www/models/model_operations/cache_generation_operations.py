@@ -0,0 +1,47 @@
+"""Functions to operate the cache_generation table."""
+
+from sqlalchemy.dialects.postgresql import insert
+from models.model import db
+from models.model import CacheGeneration
+
+
+def get_cache_generation(name):
+    """
+    Get the generation of the cached data.
+
+    Parameters
+    ----------
+    name : str
+        The name of the cached data.
+
+    Returns
+    -------
+    int
+        The generation (0 if the data has never changed).
+    """
+    generation = db.session.query(CacheGeneration.generation).filter(CacheGeneration.name==name).scalar()
+    return generation or 0
+
+
+def bump_cache_generation(name):
+    """
+    Increase the generation of the cached data.
+
+    The generation is written in the current transaction without committing,
+    so that it is committed together with the change of the data.
+
+    Parameters
+    ----------
+    name : str
+        The name of the cached data.
+
+    Returns
+    -------
+    int
+        The new generation.
+    """
+    table = CacheGeneration.__table__
+    statement = insert(table).values(name=name, generation=1)
+    statement = statement.on_conflict_do_update(index_elements=["name"],
+            set_={"generation": table.c.generation + 1}).returning(table.c.generation)
+    return db.session.execute(statement).scalar()
@@ -0,0 +1,184 @@
+"""
+Policies for deciding when a location has reached consensus and is done.
+
+The policy is selected by the config (see init_consensus_policy), and it is evaluated in batch over the locations
+of a submission (see answer_operations.write_graded_answers) or over the whole table (see util/recompute_done_locations.py):
+    "k_matching" : A location is done when an answer of a user who passed the gold standard test
+        matches match_count existing good answers (i.e., the tally of the answer reaches match_count + 1).
+    "majority" : The leading good answer of a location needs match_count + 1 good answers,
+        and at least min_ratio of all the good answers to the location.
+    "trust_weighted" : Each good answer is weighted by the gold standard pass rate of its user
+        (smoothed as (passes + 1) / (tests + 2), so that it is below 1).
+        The leading good answer needs a total weight of at least match_count,
+        and at least min_ratio of the total weight of all the good answers to the location.
+"""
+
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import literal_column
+from models.model import db
+from models.model import Answer
+from models.model import User
+from models.model import LocationTally
+from models.model_operations.location_operations import set_locations_done
+from models.model_operations.location_operations import set_reliable_locations_done
+
+
+# The default number of existing good answers that a new good answer needs to match
+RELIABLE_GOOD_ANSWER_COUNT = 3
+
+# The names of the policies
+CONSENSUS_POLICIES = ["k_matching", "majority", "trust_weighted"]
+
+# The policy of the current process
+consensus_policy_state = {
+    "policy": "k_matching",
+    "match_count": RELIABLE_GOOD_ANSWER_COUNT,
+    "min_ratio": 0.75
+}
+
+
+def init_consensus_policy(policy="k_matching", match_count=RELIABLE_GOOD_ANSWER_COUNT, min_ratio=0.75):
+    """
+    Select the consensus policy.
+
+    Parameters
+    ----------
+    policy : str
+        "k_matching", "majority", or "trust_weighted".
+    match_count : int
+        The number of existing good answers that a new good answer needs to match (see the module docstring).
+    min_ratio : float
+        The minimum share of the leading good answer (only for "majority" and "trust_weighted").
+
+    Raises
+    ------
+    exception : Exception
+        When the policy is unknown, or match_count or min_ratio is out of range.
+    """
+    if policy not in CONSENSUS_POLICIES:
+        raise Exception("Unknown consensus policy: {}".format(policy))
+    if not isinstance(match_count, int) or match_count < 1:
+        raise Exception("match_count shall be a positive int.")
+    if min_ratio <= 0 or min_ratio > 1:
+        raise Exception("min_ratio shall be in (0, 1].")
+    consensus_policy_state["policy"] = policy
+    consensus_policy_state["match_count"] = match_count
+    consensus_policy_state["min_ratio"] = min_ratio
+
+
+def get_min_leading_support():
+    """
+    Get the support that the leading good answer of a location needs by the current policy.
+
+    Returns
+    -------
+    float
+        The number of good answers (or the total weight for "trust_weighted").
+    """
+    if consensus_policy_state["policy"] == "trust_weighted":
+        return consensus_policy_state["match_count"]
+    return consensus_policy_state["match_count"] + 1
+
+
+def is_consensus_reached(support_list):
+    """
+    Check if a location has reached consensus by the current policy, from the support of its good answers in memory.
+
+    This is the same rule as get_consensus_location_ids, for the callers without the database
+    (e.g., util/simulate_scheduler.py).
+
+    Parameters
+    ----------
+    support_list : list of float
+        The number of good answers of each distinct answer (land_usage, expansion) to the location,
+        or their total weight for "trust_weighted" (see the module docstring).
+
+    Returns
+    -------
+    bool
+        True if the location has reached consensus.
+    """
+    if len(support_list) == 0:
+        return False
+
+    leading_support = max(support_list)
+    if leading_support < get_min_leading_support():
+        return False
+    if consensus_policy_state["policy"] != "k_matching":
+        return leading_support >= consensus_policy_state["min_ratio"] * sum(support_list)
+    return True
+
+
+def get_consensus_location_ids(location_id_list=None):
+    """
+    Get the locations that have reached consensus by the current policy (no matter if they are done or not).
+
+    Parameters
+    ----------
+    location_id_list : list of int
+        IDs of the locations to evaluate.
+        None means all the locations.
+
+    Returns
+    -------
+    set of int
+        IDs of the locations that have reached consensus.
+    """
+    if location_id_list is not None and len(location_id_list) == 0:
+        return set()
+
+    policy = consensus_policy_state["policy"]
+    min_ratio = consensus_policy_state["min_ratio"]
+
+    if policy == "trust_weighted":
+        weight = (User.gold_pass_count + literal_column("1.0")) / (User.gold_test_count + 2)
+        query = select(Answer.location_id, func.sum(weight).label("support")).join(User, User.id==Answer.user_id)
+        query = query.where(Answer.gold_standard_status==1)
+        if location_id_list is not None:
+            query = query.where(Answer.location_id.in_(location_id_list))
+        answer_support = query.group_by(Answer.location_id, Answer.land_usage, Answer.expansion).subquery()
+    else:
+        query = select(LocationTally.location_id, LocationTally.good_answer_count.label("support"))
+        query = query.where(LocationTally.good_answer_count > 0)
+        if location_id_list is not None:
+            query = query.where(LocationTally.location_id.in_(location_id_list))
+        answer_support = query.subquery()
+
+    leading_support = func.max(answer_support.c.support)
+    query = select(answer_support.c.location_id).group_by(answer_support.c.location_id)
+    query = query.having(leading_support >= get_min_leading_support())
+    if policy != "k_matching":
+        query = query.having(leading_support >= min_ratio * func.sum(answer_support.c.support))
+
+    return set([row.location_id for row in db.session.execute(query)])
+
+
+def set_consensus_locations_done(answer_key_list, commit=True):
+    """
+    Mark the locations of a submission done if they have reached consensus by the current policy.
+
+    The "k_matching" policy checks the tallies of the submitted answers in one conditional update
+    (see location_operations.set_reliable_locations_done).
+    The other policies evaluate the locations, and then mark the ones that are not done yet.
+
+    Parameters
+    ----------
+    answer_key_list : list of (int, int, int)
+        The (location_id, land_usage, expansion) of the good answers in the submission,
+        which are already written (and included in the tallies).
+    commit : bool
+        Commit the change and update the done bitmap.
+        Otherwise, the caller should do both (e.g., to commit together with the answers).
+
+    Returns
+    -------
+    location_id_list : list of int
+        IDs of the locations that are newly marked done.
+    """
+    if consensus_policy_state["policy"] == "k_matching":
+        return set_reliable_locations_done(answer_key_list, get_min_leading_support(), commit=commit)
+
+    location_id_list = sorted(set([answer_key[0] for answer_key in answer_key_list]))
+    consensus_location_id_list = sorted(get_consensus_location_ids(location_id_list))
+    return sorted(set_locations_done(consensus_location_id_list, commit=commit))
@@ -0,0 +1,174 @@
+"""
+Memory-mapped set of the locations that are done.
+
+The file has one byte for each location id (1 means done), and every worker process maps the same file,
+so checking if a location is done takes O(1) time without querying the database.
+One byte (instead of one bit) per location makes each update a single-byte write,
+so that the processes can update the file at the same time without locking.
+
+The file is updated by set_location_done, and it should be rebuilt from the database
+after the scripts that change done_at directly (see util/rebuild_done_bitmap.py).
+"""
+
+import os
+import mmap
+from sqlalchemy import func
+from models.model import db
+from models.model import Location
+
+
+# The state of the mapping in the current process
+done_bitmap_state = {
+    "path": None,
+    "file": None,
+    "map": None
+}
+
+
+def init_done_bitmap(path):
+    """
+    Enable the done bitmap.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file (created if it does not exist).
+    """
+    close_done_bitmap()
+    if not os.path.exists(path):
+        with open(path, "wb"):
+            pass
+    done_bitmap_state["path"] = path
+
+
+def is_done_bitmap_enabled():
+    """
+    Check if the done bitmap is enabled.
+
+    Returns
+    -------
+    bool
+        True if init_done_bitmap has been called.
+    """
+    return done_bitmap_state["path"] is not None
+
+
+def open_done_bitmap(min_size=0):
+    """
+    Map the file (again if it has grown), and extend the file to at least min_size bytes.
+
+    Parameters
+    ----------
+    min_size : int
+        The minimum size of the file.
+    """
+    if done_bitmap_state["file"] is None:
+        done_bitmap_state["file"] = open(done_bitmap_state["path"], "r+b")
+    f = done_bitmap_state["file"]
+
+    if os.fstat(f.fileno()).st_size < min_size:
+        # Unlike truncate, fallocate never shrinks the file when processes extend it at the same time
+        # (the existing bytes are kept, and the new bytes are zeros)
+        os.posix_fallocate(f.fileno(), 0, min_size)
+
+    size = os.fstat(f.fileno()).st_size
+    current_map = done_bitmap_state["map"]
+    if size > 0 and (current_map is None or len(current_map) < size):
+        if current_map is not None:
+            current_map.close()
+        done_bitmap_state["map"] = mmap.mmap(f.fileno(), size)
+
+
+def is_location_done_by_bitmap(location_id):
+    """
+    Check if a location is done.
+
+    Parameters
+    ----------
+    location_id : int
+        ID of the location.
+
+    Returns
+    -------
+    bool or None
+        True if the location is done, False if not, or None if the done bitmap is not enabled.
+    """
+    if not is_done_bitmap_enabled():
+        return None
+
+    current_map = done_bitmap_state["map"]
+    if current_map is None or location_id >= len(current_map):
+        # The file may have been extended by another process
+        open_done_bitmap()
+        current_map = done_bitmap_state["map"]
+        if current_map is None or location_id >= len(current_map):
+            return False
+
+    return current_map[location_id] == 1
+
+
+def set_done_bitmap(location_id, is_done):
+    """
+    Mark a location done or not done in the bitmap (if the done bitmap is enabled).
+
+    Parameters
+    ----------
+    location_id : int
+        ID of the location.
+    is_done : bool
+        Set done or not done.
+    """
+    if not is_done_bitmap_enabled():
+        return
+
+    current_map = done_bitmap_state["map"]
+    if current_map is None or location_id >= len(current_map):
+        # Extend the file with some room to reduce the number of re-mappings
+        open_done_bitmap(min_size=location_id + 65536)
+        current_map = done_bitmap_state["map"]
+
+    current_map[location_id] = 1 if is_done else 0
+
+
+def rebuild_done_bitmap(path):
+    """
+    Rewrite the file from the done_at of the location table.
+
+    The bytes are written in place, so that the processes which have mapped the file see the new content.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+
+    Returns
+    -------
+    int
+        The number of done locations.
+    """
+    rows = db.session.query(Location.id).filter(Location.done_at.isnot(None)).all()
+    max_location_id = db.session.query(func.max(Location.id)).scalar() or 0
+
+    content = bytearray(max_location_id + 1)
+    for row in rows:
+        content[row.id] = 1
+
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as f:
+        size = os.fstat(f.fileno()).st_size
+        # Keep the size if it is larger (bytes of the locations that do not exist are zeros)
+        content += bytearray(max(0, size - len(content)))
+        f.write(content)
+
+    return len(rows)
+
+
+def close_done_bitmap():
+    """Unmap the file and disable the done bitmap."""
+    if done_bitmap_state["map"] is not None:
+        done_bitmap_state["map"].close()
+    if done_bitmap_state["file"] is not None:
+        done_bitmap_state["file"].close()
+    done_bitmap_state["path"] = None
+    done_bitmap_state["file"] = None
+    done_bitmap_state["map"] = None
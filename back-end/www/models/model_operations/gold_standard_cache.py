@@ -0,0 +1,249 @@
+"""
+Per-process cache of the gold standard answers, indexed by the location and the answer class.
+
+The gold standards rarely change (they are imported by the admin with util/import_gold_standards_from_csv.py),
+so each process loads them once and keeps them until the "gold_standard" generation in the cache_generation table changes.
+The answer operations increase the generation when they change a gold answer,
+and the generation is checked at most once every GENERATION_CHECK_SECONDS.
+"""
+
+import time
+import random
+from sqlalchemy import func
+from models.model import db
+from models.model import Answer
+from models.model_operations.cache_generation_operations import get_cache_generation
+
+
+# The name of the gold standards in the cache_generation table
+GENERATION_NAME = "gold_standard"
+
+# The number of seconds between the checks of the generation
+# (gold standards can be changed through other processes)
+GENERATION_CHECK_SECONDS = 5
+
+# The state of the cache in the current process
+gold_cache_state = {
+    "generation": None,
+    "checked_at": None,
+    "class_index": None,
+    "gold_answers": None,
+    "gold_answer_count": None
+}
+
+
+def load_gold_answers():
+    """
+    Load the gold standards from the database into the cache.
+
+    If a location has several gold answers, the first one is used, as in exam_gold_standard.
+    """
+    # Read the generation first, so that a change during the loading causes another reload
+    generation = get_cache_generation(GENERATION_NAME)
+    rows = db.session.query(Answer.id, Answer.location_id, Answer.land_usage, Answer.expansion).filter(
+            Answer.gold_standard_status==0).order_by(Answer.location_id, Answer.id).distinct(Answer.location_id).all()
+    gold_answer_count = db.session.query(func.count(Answer.id)).filter(Answer.gold_standard_status==0).scalar()
+
+    class_index = {}
+    gold_answers = {}
+    for row in rows:
+        answer_class = (row.land_usage, row.expansion)
+        class_index.setdefault(answer_class, []).append(row.location_id)
+        gold_answers[row.location_id] = (row.id, answer_class)
+
+    gold_cache_state["class_index"] = class_index
+    gold_cache_state["gold_answers"] = gold_answers
+    gold_cache_state["gold_answer_count"] = gold_answer_count
+    gold_cache_state["generation"] = generation
+    gold_cache_state["checked_at"] = time.time()
+
+
+def ensure_gold_answers_loaded():
+    """Load the gold standards if they are not loaded, or if the generation has changed."""
+    if gold_cache_state["generation"] is None:
+        load_gold_answers()
+    elif time.time() - gold_cache_state["checked_at"] > GENERATION_CHECK_SECONDS:
+        gold_cache_state["checked_at"] = time.time()
+        if get_cache_generation(GENERATION_NAME) != gold_cache_state["generation"]:
+            load_gold_answers()
+
+
+def get_gold_location_index():
+    """
+    Get the cached gold standard locations.
+
+    Returns
+    -------
+    dict of (int, int) to list of int
+        IDs of the gold standard locations, grouped by the (land_usage, expansion) of the gold answers.
+    """
+    ensure_gold_answers_loaded()
+    return gold_cache_state["class_index"]
+
+
+def get_gold_answer_class(location_id):
+    """
+    Get the cached gold answer of a location.
+
+    Parameters
+    ----------
+    location_id : int
+        ID of the location.
+
+    Returns
+    -------
+    (int, int) or None
+        The (land_usage, expansion) of the gold answer, or None if the location has no gold answers.
+    """
+    ensure_gold_answers_loaded()
+    gold_answer = gold_cache_state["gold_answers"].get(location_id)
+    return None if gold_answer is None else gold_answer[1]
+
+
+def get_gold_answer_classes(location_id_list):
+    """
+    Get the cached gold answers of several locations from the same version of the cache.
+
+    Parameters
+    ----------
+    location_id_list : list of int
+        IDs of the locations.
+
+    Returns
+    -------
+    dict of int to (int, int)
+        The (land_usage, expansion) of the gold answers, keyed by the IDs of the locations that have gold answers.
+    """
+    ensure_gold_answers_loaded()
+    gold_answers = gold_cache_state["gold_answers"]
+    gold_answer_classes = {}
+    for location_id in location_id_list:
+        gold_answer = gold_answers.get(location_id)
+        if gold_answer is not None:
+            gold_answer_classes[location_id] = gold_answer[1]
+    return gold_answer_classes
+
+
+def get_gold_answer_id(location_id):
+    """
+    Get the ID of the cached gold answer of a location.
+
+    Parameters
+    ----------
+    location_id : int
+        ID of the location.
+
+    Returns
+    -------
+    int or None
+        ID of the (first) gold answer, or None if the location has no gold answers.
+    """
+    ensure_gold_answers_loaded()
+    gold_answer = gold_cache_state["gold_answers"].get(location_id)
+    return None if gold_answer is None else gold_answer[0]
+
+
+def get_cached_gold_answer_count():
+    """
+    Get the cached number of gold answers.
+
+    Returns
+    -------
+    int
+        The number of answers with gold_standard_status 0.
+    """
+    ensure_gold_answers_loaded()
+    return gold_cache_state["gold_answer_count"]
+
+
+def update_cached_gold_answer(answer, was_gold, generation):
+    """
+    Apply the change of an answer made by this process to the cache without reloading.
+
+    The cache is only updated in place if no other process has changed the gold standards,
+    i.e., the new generation follows the cached one. Otherwise, or if a gold answer is removed
+    (another gold answer of the location may take its place), the cache is reloaded next time.
+
+    Parameters
+    ----------
+    answer : Answer
+        The created or updated answer (after committing).
+    was_gold : bool
+        If the answer was a gold answer before the change.
+    generation : int
+        The generation returned by bump_cache_generation when committing the change.
+    """
+    is_gold = answer.gold_standard_status == 0
+    cached_generation = gold_cache_state["generation"]
+    if cached_generation is None or generation != cached_generation + 1 or (was_gold and not is_gold):
+        invalidate_gold_answers()
+        return
+
+    if is_gold:
+        if not was_gold:
+            gold_cache_state["gold_answer_count"] += 1
+        gold_answers = gold_cache_state["gold_answers"]
+        class_index = gold_cache_state["class_index"]
+        gold_answer = gold_answers.get(answer.location_id)
+
+        # Only the first gold answer of a location is used
+        if gold_answer is None or gold_answer[0] >= answer.id:
+            if gold_answer is not None:
+                class_index[gold_answer[1]].remove(answer.location_id)
+            answer_class = (answer.land_usage, answer.expansion)
+            class_index.setdefault(answer_class, []).append(answer.location_id)
+            gold_answers[answer.location_id] = (answer.id, answer_class)
+
+    gold_cache_state["generation"] = generation
+
+
+def invalidate_gold_answers():
+    """Reload the cache next time."""
+    gold_cache_state["generation"] = None
+    gold_cache_state["checked_at"] = None
+    gold_cache_state["class_index"] = None
+    gold_cache_state["gold_answers"] = None
+    gold_cache_state["gold_answer_count"] = None
+
+
+def sample_gold_location_ids(n):
+    """
+    Randomly select gold standard locations, stratified by the answer class.
+
+    The classes are visited in a random order, and one location is drawn from each class in turn,
+    so that a batch tests as many different answers as possible.
+    This takes O(n) time (plus the number of classes) without querying the database.
+
+    Parameters
+    ----------
+    n : int
+        The number of locations to select.
+
+    Returns
+    -------
+    location_id_list : list of int
+        At most n IDs of the gold standard locations.
+    """
+    class_index = get_gold_location_index()
+    answer_classes = list(class_index.keys())
+    random.shuffle(answer_classes)
+
+    # Assign the number of locations to draw from each class in turn
+    quotas = dict.fromkeys(answer_classes, 0)
+    remaining = n
+    while remaining > 0:
+        assigned = False
+        for answer_class in answer_classes:
+            if remaining > 0 and quotas[answer_class] < len(class_index[answer_class]):
+                quotas[answer_class] += 1
+                remaining -= 1
+                assigned = True
+        if not assigned:
+            # All the gold standard locations are drawn
+            break
+
+    location_id_list = []
+    for answer_class in answer_classes:
+        location_id_list += random.sample(class_index[answer_class], quotas[answer_class])
+
+    return location_id_list
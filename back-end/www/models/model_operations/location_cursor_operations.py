@@ -0,0 +1,194 @@
+"""
+Functions to operate the location_cursor table.
+
+A cursor lets a user (e.g., the internal review team) label many locations in one session.
+The locations that are not labeled yet are sampled and leased once when the cursor is created,
+and the frozen sample is then returned page by page, so paging does not run the sampler again.
+The leases are reserved (see LocationLease), so the locations are not returned to the same user again
+by get_locations or another cursor.
+Each page has fresh gold standards, like a batch of get_locations.
+"""
+
+import datetime
+import random
+from sqlalchemy import func
+from models.model import db
+from models.model import Location
+from models.model import LocationCursor
+from models.model import UserLocation
+from models.model_operations.location_lease_operations import claim_location_leases
+from models.model_operations.location_lease_operations import release_location_leases
+from models.model_operations.gold_standard_cache import sample_gold_location_ids
+from models.model_operations.location_operations import get_wait_test_location_query
+from models.model_operations.location_operations import sample_locations_by_scheduler
+
+
+def create_location_cursor(user_id, total_size, page_size, gold_standard_size, cursor_seconds=3600, scheduler="uniform"):
+    """
+    Sample and lease the locations that are not labeled yet, and create a cursor to page through them.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    total_size : int
+        The maximum number of locations (that are not labeled yet) to sample.
+    page_size : int
+        Total number of locations in each page.
+    gold_standard_size : int
+        The number of locations that should include gold standard answers in each page.
+        There should be ("page_size" - "gold_standard_size") locations that are not labeled yet in each page.
+    cursor_seconds : int
+        The number of seconds before the cursor and the leases of the sampled locations expire.
+    scheduler : str
+        The way to select the locations that are not labeled yet (see location_operations.sample_locations_by_scheduler).
+
+    Returns
+    -------
+    cursor : LocationCursor
+        The created cursor.
+
+    Raises
+    ------
+    exception : Exception
+        When total_size, page_size, and gold_standard_size are not integers (or < 1).
+    exception : Exception
+        When gold_standard_size is not smaller than page_size.
+    exception : Exception
+        When no location that is not labeled yet can be found.
+    """
+    for name, value in [("total_size", total_size), ("page_size", page_size), ("gold_standard_size", gold_standard_size)]:
+        if not isinstance(value, int) or value < 1:
+            raise Exception("The {} must be an integer greater or equal to 1.".format(name))
+    if gold_standard_size >= page_size:
+        raise Exception("The gold standard size must be smaller than the page size.")
+
+    # Remove the expired cursors of the user
+    LocationCursor.query.filter(LocationCursor.user_id==user_id,
+            LocationCursor.expires_at <= func.now()).delete(synchronize_session=False)
+
+    # Sample and lease the locations in one transaction, as in get_locations
+    # (the leases are reserved, since get_wait_test_location_query returns the other leases of the user to the user)
+    location_query = get_wait_test_location_query(user_id).with_for_update(skip_locked=True)
+    location_list = sample_locations_by_scheduler(location_query, total_size, scheduler)
+    location_id_list = claim_location_leases(user_id, [location.id for location in location_list], cursor_seconds,
+            reserved=True)
+    if len(location_id_list) == 0:
+        db.session.rollback()
+        raise Exception("Cannot find any location that is not labeled yet.")
+
+    # Keep the order of the scheduler
+    leased_location_id_set = set(location_id_list)
+    location_id_list = [location.id for location in location_list if location.id in leased_location_id_set]
+
+    cursor = LocationCursor(user_id=user_id, location_ids=location_id_list, position=0, page_size=page_size,
+            gold_standard_size=gold_standard_size,
+            expires_at=func.now() + datetime.timedelta(seconds=cursor_seconds))
+    db.session.add(cursor)
+    db.session.commit()
+
+    return cursor
+
+
+def get_location_cursor_page(cursor_id, user_id):
+    """
+    Get the next page of a cursor.
+
+    The cursor row is locked while the page is taken, so concurrent requests get different pages.
+    The cursor is removed after its last page is returned.
+
+    Parameters
+    ----------
+    cursor_id : int
+        ID of the cursor.
+    user_id : int
+        ID of the user who created the cursor.
+
+    Returns
+    -------
+    locations : list of Locations
+        The locations in the page (shuffled), including the gold standards.
+        The locations that are labeled done or answered by the user after the cursor is created are skipped.
+    remaining : int
+        The number of locations (that are not labeled yet) left in the cursor after this page.
+
+    Raises
+    ------
+    exception : Exception
+        When the cursor cannot be found (or belongs to another user).
+    exception : Exception
+        When the cursor has expired.
+    exception : Exception
+        When we cannot find "gold_standard_size" of locations which have gold standards.
+    """
+    # Compare the expiry time in the database, as for the leases
+    row = db.session.query(LocationCursor, (LocationCursor.expires_at <= func.now()).label("is_expired")).filter(
+            LocationCursor.id==cursor_id, LocationCursor.user_id==user_id).with_for_update(of=LocationCursor).first()
+    if row is None:
+        db.session.rollback()
+        raise Exception("Cannot find the cursor.")
+    cursor = row.LocationCursor
+    if row.is_expired:
+        db.session.rollback()
+        raise Exception("The cursor has expired.")
+
+    gold_location_id_list = sample_gold_location_ids(cursor.gold_standard_size)
+    if len(gold_location_id_list) < cursor.gold_standard_size:
+        db.session.rollback()
+        err_msg = "Cannot find expected amount of locations which have gold standards :{}. {} are found.".format(
+                cursor.gold_standard_size, len(gold_location_id_list))
+        raise Exception(err_msg)
+
+    wait_test_size = cursor.page_size - cursor.gold_standard_size
+    page_location_id_list = cursor.location_ids[cursor.position:cursor.position + wait_test_size]
+    remaining = len(cursor.location_ids) - cursor.position - len(page_location_id_list)
+
+    # Load the page by the primary keys
+    location_list = Location.query.filter(Location.id.in_(page_location_id_list + gold_location_id_list)).all()
+    answered_location_id_set = set([row.location_id for row in db.session.query(UserLocation.location_id).filter(
+        UserLocation.user_id==user_id, UserLocation.location_id.in_(page_location_id_list))])
+    gold_location_id_set = set(gold_location_id_list)
+    location_list = [location for location in location_list if location.id in gold_location_id_set
+            or (location.done_at is None and location.id not in answered_location_id_set)]
+    random.shuffle(location_list)
+
+    if remaining > 0:
+        cursor.position += len(page_location_id_list)
+    else:
+        db.session.delete(cursor)
+
+    # Commit without expiring the loaded locations (otherwise they will be reloaded one by one when serialized)
+    session = db.session()
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = True
+
+    return location_list, remaining
+
+
+def close_location_cursor(cursor_id, user_id):
+    """
+    Remove a cursor and release the leases of the locations that have not been returned.
+
+    Parameters
+    ----------
+    cursor_id : int
+        ID of the cursor.
+    user_id : int
+        ID of the user who created the cursor.
+
+    Raises
+    ------
+    exception : Exception
+        When the cursor cannot be found (or belongs to another user).
+    """
+    cursor = LocationCursor.query.filter_by(id=cursor_id, user_id=user_id).with_for_update().first()
+    if cursor is None:
+        db.session.rollback()
+        raise Exception("Cannot find the cursor.")
+
+    release_location_leases(user_id, cursor.location_ids[cursor.position:], commit=False)
+    db.session.delete(cursor)
+    db.session.commit()
@@ -0,0 +1,140 @@
+"""Functions to operate the location_lease table."""
+
+import datetime
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import literal
+from sqlalchemy.dialects.postgresql import insert
+from models.model import db
+from models.model import Location
+from models.model import LocationLease
+
+
+def claim_location_leases(user_id, location_id_list, lease_seconds, reserved=False):
+    """
+    Claim leases of locations for a user.
+
+    The leases are written in the current transaction without committing,
+    so that they are committed together with the row locks of the selected locations
+    (see location_operations.get_locations).
+    Expired leases and the leases of the same user are overwritten,
+    and the locations leased to other users are skipped.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    location_id_list : list of int
+        IDs of the locations to lease.
+    lease_seconds : int
+        The number of seconds before the leases expire.
+    reserved : bool
+        If the locations are in a next batch reserved for prefetching (see LocationLease).
+
+    Returns
+    -------
+    location_id_list : list of int
+        IDs of the locations that are successfully leased.
+    """
+    if len(location_id_list) == 0:
+        return []
+
+    # The rows are written (and locked until commit) in the order of the ids,
+    # so that concurrent claims of overlapping locations (e.g., from the pools of other processes) do not deadlock
+    expires_at = func.now() + datetime.timedelta(seconds=lease_seconds)
+    statement = insert(LocationLease.__table__).values(
+            [{"location_id": location_id, "user_id": user_id, "expires_at": expires_at, "reserved": reserved}
+                for location_id in sorted(set(location_id_list))])
+    statement = statement.on_conflict_do_update(index_elements=["location_id"],
+            set_={"user_id": statement.excluded.user_id, "expires_at": statement.excluded.expires_at,
+                "reserved": statement.excluded.reserved},
+            where=or_(LocationLease.__table__.c.user_id==statement.excluded.user_id,
+                LocationLease.__table__.c.expires_at <= func.now()))
+    statement = statement.returning(LocationLease.__table__.c.location_id)
+    leased_location_id_list = [row.location_id for row in db.session.execute(statement)]
+    return leased_location_id_list
+
+
+def claim_location_leases_by_query(user_id, location_query, lease_seconds, reserved=False):
+    """
+    Claim leases of the locations selected by a query, and get the leased locations, in one statement.
+
+    The leases are inserted from the query and returned to the select of the locations in a CTE,
+    so the filtering, leasing, and loading of the locations take one round trip
+    (e.g., for the locations popped from the pool, see location_operations.get_location_batches).
+    The leases follow the same rules as claim_location_leases, and are not committed.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    location_query : flask_sqlalchemy.BaseQuery
+        The query of the locations to lease.
+        (it should select a small number of locations, e.g., by the primary key)
+    lease_seconds : int
+        The number of seconds before the leases expire.
+    reserved : bool
+        If the locations are in a next batch reserved for prefetching (see LocationLease).
+
+    Returns
+    -------
+    locations : list of Locations
+        The locations that are successfully leased.
+    """
+    table = LocationLease.__table__
+    expires_at = func.now() + datetime.timedelta(seconds=lease_seconds)
+    lease_query = location_query.with_entities(Location.id, literal(user_id), expires_at,
+            literal(reserved)).order_by(Location.id)
+    statement = insert(table).from_select(["location_id", "user_id", "expires_at", "reserved"], lease_query)
+    statement = statement.on_conflict_do_update(index_elements=["location_id"],
+            set_={"user_id": statement.excluded.user_id, "expires_at": statement.excluded.expires_at,
+                "reserved": statement.excluded.reserved},
+            where=or_(table.c.user_id==statement.excluded.user_id, table.c.expires_at <= func.now()))
+    leased = statement.returning(table.c.location_id).cte("leased")
+    location_list = Location.query.join(leased, Location.id==leased.c.location_id).all()
+    return location_list
+
+
+def get_active_location_leases(user_id=None):
+    """
+    Get the leases that are not expired.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+        (get the leases of all users if None)
+
+    Returns
+    -------
+    leases : list of LocationLease
+        The list of active leases.
+    """
+    lease_query = LocationLease.query.filter(LocationLease.expires_at > func.now())
+    if user_id is not None:
+        lease_query = lease_query.filter(LocationLease.user_id==user_id)
+    leases = lease_query.all()
+    return leases
+
+
+def release_location_leases(user_id, location_id_list, commit=True):
+    """
+    Release the leases of locations held by a user, e.g., after the user submits the answers.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    location_id_list : list of int
+        IDs of the leased locations.
+    commit : bool
+        Commit the transaction.
+        (False to release them together with other changes, see location_operations.get_location_batches)
+    """
+    if len(location_id_list) == 0:
+        return
+
+    LocationLease.query.filter(LocationLease.user_id==user_id,
+            LocationLease.location_id.in_(location_id_list)).delete(synchronize_session=False)
+    if commit:
+        db.session.commit()
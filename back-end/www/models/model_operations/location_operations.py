@@ -1,14 +1,50 @@
 """Functions to operate the location table."""
 
+import time
 import datetime
 import random
+from collections import Counter
 from sqlalchemy import func
+from sqlalchemy import and_
 from sqlalchemy import or_
+from sqlalchemy import exists
+from sqlalchemy import update
+from sqlalchemy import select
+from sqlalchemy import values
+from sqlalchemy import column
+from sqlalchemy import Integer
+from sqlalchemy import Float
+from sqlalchemy import true
+from sqlalchemy.orm import aliased
 from models.model import db
 from models.model import Location
 from models.model import Answer
+from models.model import LocationLease
+from models.model import UserLocation
+from models.model import LocationTally
 from models.model_operations.user_operations import get_user_by_id
-from models.model_operations import answer_operations
+from models.model_operations.location_lease_operations import claim_location_leases
+from models.model_operations.location_lease_operations import claim_location_leases_by_query
+from models.model_operations.location_lease_operations import release_location_leases
+from models.model_operations.location_pool import is_location_pool_enabled
+from models.model_operations.location_pool import pop_pool_locations
+from models.model_operations.gold_standard_cache import sample_gold_location_ids
+from models.model_operations.done_bitmap import set_done_bitmap
+
+
+# The number of seconds to keep the tier sizes of the weighted schedulers
+# (the sizes only set the odds of the tiers, so they can be a few seconds out of date)
+SCHEDULER_TIER_SECONDS = 5
+
+# The column that tiers the locations for each weighted scheduler
+# (each column has a partial index with the random key for seeking inside a tier, see model.py)
+SCHEDULER_TIER_COLUMNS = {
+    "consensus": Location.consensus_count,
+    "deficit": Location.answer_count
+}
+
+# The tier sizes of the weighted schedulers in the current process, keyed by the scheduler
+scheduler_tier_state = {}
 
 
 DEBUG = False
@@ -81,7 +117,9 @@ def get_location_by_factory_id(factory_id):
 
 def set_location_done(location_id, is_done):
     """
-    Set the current time to done_at to mark it is done.
+    Set the current time to done_at to mark it is done (in one statement without reading the location first).
+
+    A location that is already done keeps the time when it was first marked done.
 
     Parameters
     ----------
@@ -105,20 +143,136 @@ def set_location_done(location_id, is_done):
     if not isinstance(is_done, bool):
         raise Exception("is_done shall be bool")
 
-    location = Location.query.filter_by(id=location_id).first()
+    table = Location.__table__
+    statement = update(table).where(table.c.id==location_id)
+    if is_done:
+        statement = statement.values(done_at=func.coalesce(table.c.done_at, datetime.datetime.now()))
+    else:
+        statement = statement.values(done_at=None)
+    statement = statement.returning(*table.c)
+    statement = select(Location).from_statement(statement).execution_options(populate_existing=True)
+    location = db.session.execute(statement).scalars().first()
 
     if location is None:
+        db.session.rollback()
         raise Exception("No location found in the database to update.")
 
-    if is_done:
-       location.done_at = datetime.datetime.now()
-    else:
-       location.done_at = None
-
     db.session.commit()
+    set_done_bitmap(location_id, is_done)
     return location
 
 
+def set_locations_done(location_id_list, commit=True):
+    """
+    Mark the locations done in one statement (skipping the ones that are already done).
+
+    Parameters
+    ----------
+    location_id_list : list of int
+        IDs of the locations.
+    commit : bool
+        Commit the change and update the done bitmap.
+        Otherwise, the caller should do both (e.g., to commit together with the answers).
+
+    Returns
+    -------
+    location_id_list : list of int
+        IDs of the locations that are newly marked done.
+    """
+    if len(location_id_list) == 0:
+        return []
+
+    statement = update(Location.__table__).where(Location.__table__.c.id.in_(location_id_list),
+            Location.__table__.c.done_at.is_(None)).values(done_at=datetime.datetime.now())
+    statement = statement.returning(Location.__table__.c.id)
+    done_location_id_list = [row.id for row in db.session.execute(statement)]
+
+    if commit:
+        db.session.commit()
+        for location_id in done_location_id_list:
+            set_done_bitmap(location_id, True)
+    return done_location_id_list
+
+
+def set_reliable_locations_done(answer_key_list, min_good_answer_count, commit=True):
+    """
+    Mark the locations done if an answer to them matches enough good answers, in one conditional statement.
+
+    The tallies are checked in the same statement that sets done_at (skipping the locations that are already done),
+    so when concurrent submissions make a location reliable, only one of them marks it done.
+
+    Parameters
+    ----------
+    answer_key_list : list of (int, int, int)
+        The (location_id, land_usage, expansion) of the answers to check.
+    min_good_answer_count : int
+        The minimum number of good answers in the tally (see location_tally_operations.py) of an answer.
+    commit : bool
+        Commit the change and update the done bitmap.
+        Otherwise, the caller should do both (e.g., to commit together with the answers).
+
+    Returns
+    -------
+    location_id_list : list of int
+        IDs of the locations that are newly marked done.
+    """
+    if len(answer_key_list) == 0:
+        return []
+
+    answer_keys = values(column("location_id", Integer), column("land_usage", Integer),
+            column("expansion", Integer), name="answer_key").data(list(set(answer_key_list)))
+    table = Location.__table__
+    tally = LocationTally.__table__
+    statement = update(table).where(table.c.id==answer_keys.c.location_id,
+            tally.c.location_id==answer_keys.c.location_id,
+            tally.c.land_usage==answer_keys.c.land_usage,
+            tally.c.expansion==answer_keys.c.expansion,
+            tally.c.good_answer_count >= min_good_answer_count,
+            table.c.done_at.is_(None)).values(done_at=datetime.datetime.now())
+    statement = statement.returning(table.c.id)
+    done_location_id_list = sorted([row.id for row in db.session.execute(statement)])
+
+    if commit:
+        db.session.commit()
+        for location_id in done_location_id_list:
+            set_done_bitmap(location_id, True)
+    return done_location_id_list
+
+
+def increment_location_answer_count(location_id_list, commit=True):
+    """
+    Add one to the answer count of the locations.
+
+    Parameters
+    ----------
+    location_id_list : list of int
+        IDs of the answered locations.
+    commit : bool
+        Commit the change.
+    """
+    Location.query.filter(Location.id.in_(location_id_list)).update(
+            {Location.answer_count: Location.answer_count + 1}, synchronize_session=False)
+    if commit:
+        db.session.commit()
+
+
+def decrement_location_answer_count(location_id_list, commit=True):
+    """
+    Subtract one from the answer count of the locations.
+
+    Parameters
+    ----------
+    location_id_list : list of int
+        IDs of the locations whose answers are removed.
+    commit : bool
+        Commit the change.
+    """
+    Location.query.filter(Location.id.in_(location_id_list)).update(
+            {Location.answer_count: Location.answer_count - 1}, synchronize_session=False)
+    if commit:
+        db.session.commit()
+
+
 def remove_location(location_id):
     """
     Remove a location.
@@ -142,10 +296,14 @@ def remove_location(location_id):
     db.session.commit()
 
 
-def get_locations(user_id, size, gold_standard_size):
+def get_locations(user_id, size, gold_standard_size, lease_seconds=600, use_pool=False, scheduler="uniform"):
     """
     Get the locations that can be returned to the front-end.
 
+    The locations which are not labeled yet are leased to the user,
+    so that concurrent requests (e.g., from other uwsgi processes) do not get the same locations
+    until the user submits the answers or the leases expire.
+
     Parameters
     ----------
     user_id : int
@@ -155,6 +313,14 @@ def get_locations(user_id, size, gold_standard_size):
     gold_standard_size : int
         The number of locations that should include gold standard answers.
         There should be ("size" - "gold_standard_size") locations that are not labeled yet.
+    lease_seconds : int
+        The number of seconds before the leases of the locations expire.
+    use_pool : bool
+        Select the locations that are not labeled yet from the in-process pool (see location_pool.py).
+        The database is queried when the pool is exhausted or disabled.
+        (only for the uniform scheduler)
+    scheduler : str
+        The way to select the locations that are not labeled yet (see sample_locations_by_scheduler).
 
     Returns
     -------
@@ -165,6 +331,8 @@ def get_locations(user_id, size, gold_standard_size):
     ------
     exception : Exception
         When size and gold_standard_size are not integers (or < 1).
+    exception : Exception
+        When the user does not exist.
     exception : Exception
         When gold standard does not exist.
     exception : Exception
@@ -174,82 +342,496 @@ def get_locations(user_id, size, gold_standard_size):
     exception : Exception
         When we cannot find "size" of locations.
     """
+    location_batches = get_location_batches(user_id, size, gold_standard_size, 1,
+            lease_seconds=lease_seconds, use_pool=use_pool, scheduler=scheduler)
+    return location_batches[0]
+
+
+def get_location_batches(user_id, size, gold_standard_size, batch_count, lease_seconds=600,
+        reserve_lease_seconds=None, use_pool=False, scheduler="uniform"):
+    """
+    Get the current batch of locations and reserve the next batches for the front-end to prefetch.
+
+    All the batches are selected, leased, and committed together, so the selection work is shared by the batches.
+    Each batch has the same structure as the result of get_locations.
+    The next batches are only returned if there are enough locations to fill them,
+    and their locations are reserved, so that the next requests of the user do not return them again.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    size : int
+        Total number of locations in each batch.
+    gold_standard_size : int
+        The number of locations that should include gold standard answers in each batch.
+    batch_count : int
+        The number of batches, including the current one.
+    lease_seconds : int
+        The number of seconds before the leases of the locations in the current batch expire.
+    reserve_lease_seconds : int
+        The number of seconds before the leases of the locations in the next batches expire.
+        (the same as lease_seconds if None, and at least lease_seconds,
+        so that a next batch does not expire and go to other users while the current batch is still leased)
+    use_pool : bool
+        Select the locations that are not labeled yet from the in-process pool (see get_locations).
+    scheduler : str
+        The way to select the locations that are not labeled yet (see sample_locations_by_scheduler).
+
+    Returns
+    -------
+    location_batches : list of list of Locations
+        The current batch followed by at most (batch_count - 1) reserved batches.
+
+    Raises
+    ------
+    exception : Exception
+        The same as get_locations, for the current batch.
+    exception : Exception
+        When batch_count is not an integer (or < 1).
+    """
     if not isinstance(gold_standard_size, int):
         raise Exception("The gold_standard_size shall be an integer")
     if not isinstance(size, int):
         raise Exception("The gold_standard_size shall be an integer")
+    if not isinstance(batch_count, int) or batch_count < 1:
+        raise Exception("The batch_count must be an integer greater or equal to 1.")
     if size < 1:
         raise Exception("The size must be greater or equal to 1.")
     if gold_standard_size < 1:
         raise Exception("The gold_standard_size must be greater or equal to 1.")
     if gold_standard_size > size:
         raise Exception("The gold standard size cannot exceed size.")
+    if get_user_by_id(user_id) is None:
+        raise Exception("Cannot find the user.")
+
+    if reserve_lease_seconds is None or reserve_lease_seconds < lease_seconds:
+        reserve_lease_seconds = lease_seconds
+
+    # Randomly select the locations which have been provided gold answers for each batch
+    # (stratified by the answer class with the cached index, so only the selected rows are queried)
+    # (the locations are drawn together and dealt to the batches in turn, so that the batches do not repeat them,
+    # unless there are not enough gold standards)
+    gold_location_id_list = sample_gold_location_ids(gold_standard_size * batch_count)
+    if len(gold_location_id_list) == gold_standard_size * batch_count:
+        gold_location_id_batches = [gold_location_id_list[idx::batch_count] for idx in range(batch_count)]
+    else:
+        gold_location_id_batches = [sample_gold_location_ids(gold_standard_size) for i in range(batch_count)]
+    gold_location_id_set = set([location_id for batch in gold_location_id_batches for location_id in batch])
+    gold_locations = {}
+    if len(gold_location_id_set) > 0:
+        gold_locations = {location.id: location for location in
+                Location.query.filter(Location.id.in_(gold_location_id_set)).all()}
+    sel_gold_location_batches = [[gold_locations[location_id] for location_id in batch if location_id in gold_locations]
+            for batch in gold_location_id_batches]
+    dbprint("sel_gold_location_batches : ", sel_gold_location_batches)
+
+    if len(sel_gold_location_batches[0]) == 0:
+        raise Exception("No gold standards exist. DB not initialized?", size)
+
+    if len(sel_gold_location_batches[0]) < gold_standard_size:
+        err_msg = "Cannot find expected amount of locations which have gold standards :{}. {} are found.".format(
+                gold_standard_size, len(sel_gold_location_batches[0]))
+        raise Exception(err_msg)
+
+    # Randomly select the locations which are not either:
+    # 1. with gold answers 2. identified by the user before 3. already labeled done 4. leased to other users
+    # (the exclusions are anti-joins evaluated in the database, so only the selected rows are transferred)
+    wait_test_size = size - gold_standard_size
+    sel_wait_test_locations_list = []
+    if wait_test_size > 0:
+        total_wait_test_size = wait_test_size * batch_count
+
+        if use_pool and scheduler == "uniform" and is_location_pool_enabled():
+            # Filter the locations popped from the pool with the exclusion checks, which are primary key lookups
+            # (the pool can be stale), and lease and load the remaining ones in one statement
+            pool_location_id_list = pop_pool_locations(user_id, total_wait_test_size)
+            if len(pool_location_id_list) > 0:
+                sel_wait_test_locations_list = claim_location_leases_by_query(user_id,
+                        get_wait_test_location_query(user_id).filter(Location.id.in_(pool_location_id_list)),
+                        lease_seconds)
+            dbprint("Got {} locations from the pool.".format(len(sel_wait_test_locations_list)))
+
+        if len(sel_wait_test_locations_list) < total_wait_test_size:
+            # Lock the selected rows and skip the ones locked by concurrent requests
+            wait_test_locations_filter = get_wait_test_location_query(user_id).with_for_update(skip_locked=True)
+            if len(sel_wait_test_locations_list) > 0:
+                wait_test_locations_filter = wait_test_locations_filter.filter(
+                        Location.id.not_in([location.id for location in sel_wait_test_locations_list]))
+            db_location_list = sample_locations_by_scheduler(wait_test_locations_filter,
+                    total_wait_test_size - len(sel_wait_test_locations_list), scheduler)
+
+            # Lease the locations to the user before the row locks are released
+            claim_location_leases(user_id, [location.id for location in db_location_list], lease_seconds)
+            sel_wait_test_locations_list += db_location_list
+
+        dbprint("sel_wait_test_locations_list : ", sel_wait_test_locations_list)
+
+    # Double confirm the amount (and give up the leases)
+    if len(sel_wait_test_locations_list) < wait_test_size:
+        db.session.rollback()
+        raise Exception("Cannot find expected amount of locations", size)
+
+    # Keep the batches that can be filled, then combine and shuffle each of them
+    location_batches = []
+    for idx in range(batch_count):
+        wait_test_batch = sel_wait_test_locations_list[idx * wait_test_size:(idx + 1) * wait_test_size]
+        if len(wait_test_batch) < wait_test_size or len(sel_gold_location_batches[idx]) < gold_standard_size:
+            break
+        location_list = wait_test_batch + sel_gold_location_batches[idx]
+        random.shuffle(location_list)
+        location_batches.append(location_list)
+
+    # Give up the leases of the locations that do not fill a batch, and mark the leases of the reserved batches
+    # (with their own expiry), so that the next requests of the user do not return them again
+    used_wait_test_size = wait_test_size * len(location_batches)
+    release_location_leases(user_id, [location.id for location in sel_wait_test_locations_list[used_wait_test_size:]],
+            commit=False)
+    if len(location_batches) > 1:
+        claim_location_leases(user_id, [location.id for location in
+            sel_wait_test_locations_list[wait_test_size:used_wait_test_size]], reserve_lease_seconds, reserved=True)
+
+    # Commit the leases without expiring the selected locations
+    # (otherwise they will be reloaded one by one when serialized)
+    session = db.session()
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = True
+
+    return location_batches
+
+
+def sample_locations_by_random_key(location_query, n):
+    """
+    Randomly select locations by seeking the random_key index from one random pivot per location.
+
+    Each pivot reads the first location with random_key >= pivot, and all the pivots are sought
+    in one statement (see seek_locations_by_pivots), so locations that are next to each other
+    in the key order are not served together.
+    The pivots that hit the same location or the end of the key space are filled with
+    the locations after another random pivot, wrapping around to the beginning of the key space.
+    This reads O(N log n) rows instead of sorting the whole table with random().
+
+    Parameters
+    ----------
+    location_query : flask_sqlalchemy.BaseQuery
+        The query of the candidate locations.
+    n : int
+        The number of locations to select.
+
+    Returns
+    -------
+    locations : list of Locations
+        At most n locations selected from the query.
+    """
+    location_list = seek_locations_by_pivots(location_query, [random.random() for i in range(n)])
+    if len(location_list) == n:
+        return location_list
+
+    if len(location_list) > 0:
+        location_query = location_query.filter(Location.id.not_in([location.id for location in location_list]))
+    pivot = random.random()
+    location_list += location_query.filter(Location.random_key >= pivot).order_by(
+            Location.random_key).limit(n - len(location_list)).all()
+
+    # Wrap around to the beginning of the key space
+    if len(location_list) < n:
+        location_list += location_query.filter(Location.random_key < pivot).order_by(
+                Location.random_key).limit(n - len(location_list)).all()
+
+    return location_list
+
+
+def seek_locations_by_pivots(location_query, pivot_list, tier_column=None):
+    """
+    Get the first location with random_key >= pivot for each pivot in one statement.
 
-    if size == 0:
+    The pivots are joined laterally with the location query, so each of them is one index seek.
+    If the query locks the rows (e.g., with_for_update(skip_locked=True)), the locking is done inside each seek.
+
+    Parameters
+    ----------
+    location_query : flask_sqlalchemy.BaseQuery
+        The query of the candidate locations.
+    pivot_list : list of float, or list of (int, float)
+        The pivots in [0, 1), or the (tier, pivot) pairs if tier_column is given.
+    tier_column : sqlalchemy.Column
+        The column that the location must be equal to the tier of the pivot in.
+        (optional, see SCHEDULER_TIER_COLUMNS)
+
+    Returns
+    -------
+    locations : list of Locations
+        The distinct locations found.
+        (the pivots after the last key or hitting the same location are skipped)
+    """
+    if len(pivot_list) == 0:
         return []
 
-    # Get the user's answers
-    target_user = get_user_by_id(user_id)
-    user_answers = answer_operations.get_answers_by_user(target_user.id)
-    user_answered_location_id_list = [answer.location_id for answer in user_answers]
+    if tier_column is None:
+        pivots = values(column("pivot", Float), name="pivots").data([(pivot,) for pivot in pivot_list])
+    else:
+        pivots = values(column("tier", Integer), column("pivot", Float), name="pivots").data(pivot_list)
+        location_query = location_query.filter(tier_column==pivots.c.tier)
+    seek = location_query.filter(Location.random_key >= pivots.c.pivot).order_by(
+            Location.random_key).limit(1).subquery().lateral()
+    sought_location = aliased(Location, seek)
+    location_list = []
+    location_id_set = set()
+    for location in db.session.query(sought_location).select_from(pivots).join(sought_location, true()):
+        if location.id not in location_id_set:
+            location_id_set.add(location.id)
+            location_list.append(location)
+    return location_list
 
-    # Get the locations which have gold answers
-    # gold_standard_status 0 means that the answer is a gold standard
-    gold_answers_filter = Answer.query.filter(Answer.gold_standard_status==0)
-    gold_location_id_list = [loc.location_id for loc in gold_answers_filter.distinct(Answer.location_id).all()]
 
-    if len(gold_location_id_list) == 0:
-        raise Exception("No gold standards exist. DB not initialized?", size)
+def get_scheduler_tier_weight(scheduler, tier):
+    """
+    Get the weight of a location in a tier of a weighted scheduler.
 
-    if len(gold_location_id_list) < gold_standard_size:
-        err_msg = "Cannot find expected amount of locations which have gold standards :{}. {} are found.".format(
-                gold_standard_size, len(gold_location_id_list))
-        raise Exception(err_msg)
+    The "consensus" scheduler tiers the locations by the consensus count and multiplies the weight by 4
+    for each matching good answer, e.g., a location with two matching good answers is 16 times as likely
+    to be selected as one without good answers, which still has a chance.
+    The "deficit" scheduler tiers the locations by the number of answers and multiplies the weight by 0.7 for each answer,
+    e.g., a location without answers is about twice as likely to be selected as one with two answers.
+    (steeper ratios complete more locations for "consensus" and spread the answers more evenly for "deficit",
+    at the cost of the other, see util/simulate_scheduler.py)
 
-    # Get the locations which have been answered by the user, or already done.
-    ex_location_filter = Location.query.filter(or_(Location.id.in_(user_answered_location_id_list), Location.done_at != None))
-    ex_location_id_list = [loc.id for loc in ex_location_filter.all()]
+    Parameters
+    ----------
+    scheduler : str
+        "consensus" or "deficit".
+    tier : int
+        The tier of the location (the value of the column in SCHEDULER_TIER_COLUMNS).
 
-    # Get locations which have gold standards
-    gold_location_filter = Location.query.filter(Location.id.in_(gold_location_id_list))
+    Returns
+    -------
+    float
+        The weight of the location.
 
-    # Get to-be-excluded location ids, which are not either: 1. with gold answers 2. identified by the user before 3. Already labled done
-    if len(ex_location_id_list) > 0:
-        exclude_location_id_list = gold_location_id_list + ex_location_id_list
+    Raises
+    ------
+    exception : Exception
+        When the scheduler is not weighted.
+    """
+    if scheduler == "consensus":
+        return 4 ** tier
+    elif scheduler == "deficit":
+        return 0.7 ** tier
     else:
-        exclude_location_id_list = gold_location_id_list
+        raise Exception("Unknown weighted scheduler: {}".format(scheduler))
 
-    wait_test_locations_filter = Location.query.filter(Location.id.not_in(exclude_location_id_list))
 
-    sel_gold_location_list = []
-    sel_wait_test_locations_list = []
+def draw_scheduler_tiers(scheduler, tier_sizes, n, rng=random):
+    """
+    Draw the tiers of the locations to select with a weighted scheduler.
 
-    # Randomly sort and select the first locations which has been provideded gold answers
-    if gold_standard_size > 0:
-        rand_gold_location_list = gold_location_filter.order_by(func.random()).all()
-        dbprint("Got {} gold rand_gold_location_list.".format(len(rand_gold_location_list)))
-        sel_gold_location_list = rand_gold_location_list[0:gold_standard_size]
-        dbprint("sel_gold_location_list : ", sel_gold_location_list)
-
-    # Randomly sort and select the first locations which has exclude user answered ones plus those with gold answers
-    if size > gold_standard_size:
-        wait_test_locations_list = wait_test_locations_filter.order_by(func.random()).all()
-        sel_wait_test_locations_list = wait_test_locations_list[0:(size - gold_standard_size)]
-        dbprint("sel_wait_test_locations_list : ", sel_wait_test_locations_list)
+    Each tier is drawn with the probability proportional to its size times the weight of its locations,
+    so every location that is not done has the chance proportional to its weight to fill a slot.
 
-    # Combine and shuffle the list
-    location_list = sel_wait_test_locations_list
-    if len(sel_gold_location_list) > 0:
-        location_list += sel_gold_location_list
-        random.shuffle(location_list)
+    Parameters
+    ----------
+    scheduler : str
+        "consensus" or "deficit".
+    tier_sizes : dict of int to int
+        The number of locations in each tier.
+    n : int
+        The number of tiers to draw.
+    rng : random.Random
+        The random number generator.
+        (optional, for the simulation in util/simulate_scheduler.py)
 
-    # Double confirm the amount
-    if len(location_list) < size:
-        raise Exception("Cannot find expected amount of locations", size)
+    Returns
+    -------
+    list of int
+        The n drawn tiers (or an empty list if there are no locations).
+    """
+    tier_list = [tier for tier in sorted(tier_sizes) if tier_sizes[tier] > 0]
+    if len(tier_list) == 0:
+        return []
+    weight_list = [get_scheduler_tier_weight(scheduler, tier) * tier_sizes[tier] for tier in tier_list]
+    return rng.choices(tier_list, weights=weight_list, k=n)
+
+
+def get_scheduler_tier_sizes(scheduler):
+    """
+    Get the number of locations that are not done in each tier of a weighted scheduler.
+
+    The sizes are counted with the partial index of the tier column, and kept for SCHEDULER_TIER_SECONDS.
 
+    Parameters
+    ----------
+    scheduler : str
+        "consensus" or "deficit".
+
+    Returns
+    -------
+    dict of int to int
+        The number of locations in each tier.
+    """
+    state = scheduler_tier_state.get(scheduler)
+    if state is None or time.time() - state["loaded_at"] > SCHEDULER_TIER_SECONDS:
+        tier_column = SCHEDULER_TIER_COLUMNS[scheduler]
+        rows = db.session.query(tier_column, func.count()).filter(Location.done_at.is_(None)).group_by(tier_column).all()
+        state = {"loaded_at": time.time(), "tier_sizes": dict([(row[0], row[1]) for row in rows])}
+        scheduler_tier_state[scheduler] = state
+    return state["tier_sizes"]
+
+
+def sample_locations_by_tier(location_query, n, scheduler):
+    """
+    Randomly select locations with the odds weighted by the tiers of a scheduler.
+
+    The tier of each location is drawn by draw_scheduler_tiers,
+    and the location is sought by a random key inside the tier (see seek_locations_by_pivots).
+    The slots that pass the last key of the tier (or hit a location found before) wrap around
+    and are sought again from the beginning of the tier, and the slots that still find no location (e.g., the user has answered all the locations of the tier)
+    are filled uniformly by sample_locations_by_random_key.
+
+    Parameters
+    ----------
+    location_query : flask_sqlalchemy.BaseQuery
+        The query of the candidate locations.
+    n : int
+        The number of locations to select.
+    scheduler : str
+        "consensus" or "deficit".
+
+    Returns
+    -------
+    locations : list of Locations
+        At most n locations selected from the query.
+    """
+    tier_column = SCHEDULER_TIER_COLUMNS[scheduler]
+    tier_list = draw_scheduler_tiers(scheduler, get_scheduler_tier_sizes(scheduler), n)
+    location_list = []
+    for is_wrapped in [False, True]:
+        if len(tier_list) == 0:
+            break
+        seek_query = location_query
+        if len(location_list) > 0:
+            seek_query = seek_query.filter(Location.id.not_in([location.id for location in location_list]))
+        sought_location_list = seek_locations_by_pivots(seek_query,
+                [(tier, 0.0 if is_wrapped else random.random()) for tier in tier_list], tier_column=tier_column)
+        location_list += sought_location_list
+
+        # Keep the tiers of the slots that find no location
+        missing_tiers = Counter(tier_list)
+        missing_tiers.subtract([getattr(location, tier_column.key) for location in sought_location_list])
+        tier_list = list(missing_tiers.elements())
+
+    if len(location_list) < n:
+        if len(location_list) > 0:
+            location_query = location_query.filter(Location.id.not_in([location.id for location in location_list]))
+        location_list += sample_locations_by_random_key(location_query, n - len(location_list))
     return location_list
 
 
+def sample_locations_by_scheduler(location_query, n, scheduler="uniform"):
+    """
+    Select locations that are not labeled yet according to a scheduler.
+
+    The "consensus" scheduler favors the locations with larger consensus counts by weighted odds,
+    e.g., the ones that already have two matching good answers, so that answers are not spread thinly.
+    The "deficit" scheduler favors the locations with fewer answers by weighted odds,
+    so that the answers are spread evenly instead of piling up on some locations.
+    (see get_scheduler_tier_weight for the odds)
+
+    Parameters
+    ----------
+    location_query : flask_sqlalchemy.BaseQuery
+        The query of the candidate locations.
+    n : int
+        The number of locations to select.
+    scheduler : str
+        "uniform", "consensus", or "deficit".
+
+    Returns
+    -------
+    locations : list of Locations
+        At most n locations selected from the query.
+
+    Raises
+    ------
+    exception : Exception
+        When the scheduler is unknown.
+    """
+    if scheduler == "uniform":
+        location_list = sample_locations_by_random_key(location_query, n)
+    elif scheduler in SCHEDULER_TIER_COLUMNS:
+        location_list = sample_locations_by_tier(location_query, n, scheduler)
+    else:
+        raise Exception("Unknown scheduler: {}".format(scheduler))
+
+    return location_list
+
+
+def reroll_location_random_keys(location_id_list=None):
+    """
+    Assign new random keys to locations.
+
+    Because a location with a large gap before its key is more likely to be hit by a pivot,
+    the keys of all locations are re-rolled periodically (see util/reroll_location_random_keys.py)
+    so that every location has the same chance to be selected in the long run.
+
+    Parameters
+    ----------
+    location_id_list : list of int
+        IDs of the locations to re-roll.
+        (re-roll all locations if None)
+    """
+    statement = update(Location.__table__).values(random_key=func.random())
+    if location_id_list is not None:
+        if len(location_id_list) == 0:
+            return
+        statement = statement.where(Location.__table__.c.id.in_(location_id_list))
+
+    # Use a separate transaction so that the locations loaded in the session are not expired
+    with db.engine.begin() as connection:
+        connection.execute(statement)
+
+
+def get_wait_test_location_query(user_id):
+    """
+    Get the query of locations that are waiting to be labeled by the user.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+        (if None, no locations are excluded for having been answered, and all leased locations are excluded)
+
+    Returns
+    -------
+    query : flask_sqlalchemy.BaseQuery
+        The query of locations which are not done, have no gold answers,
+        have not been answered by the user, and are not leased to other users
+        (or reserved for the user as a prefetched batch).
+    """
+    # gold_standard_status 0 means that the answer is a gold standard
+    gold_answer_exists = exists().where(and_(Answer.location_id==Location.id,
+        Answer.gold_standard_status==0))
+    query = Location.query.filter(Location.done_at.is_(None), ~gold_answer_exists)
+
+    if user_id is None:
+        active_lease_exists = exists().where(and_(LocationLease.location_id==Location.id,
+            LocationLease.expires_at > func.now()))
+    else:
+        user_answer_exists = exists().where(and_(UserLocation.location_id==Location.id,
+            UserLocation.user_id==user_id))
+        query = query.filter(~user_answer_exists)
+
+        # The locations leased to the user are still available to the user (e.g., when reloading the page),
+        # except the reserved ones, which the front-end already has as the next batch
+        active_lease_exists = exists().where(and_(LocationLease.location_id==Location.id,
+            or_(LocationLease.user_id!=user_id, LocationLease.reserved), LocationLease.expires_at > func.now()))
+
+    query = query.filter(~active_lease_exists)
+    return query
+
+
 def get_location_is_done_count():
     """
     Get the count of locations which have been labled done.
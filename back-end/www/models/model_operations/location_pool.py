@@ -0,0 +1,306 @@
+"""
+Per-process pool of candidate locations.
+
+Each uwsgi worker keeps a shuffled pool of location ids that are waiting to be labeled,
+so that get_locations can select them in memory instead of querying the database.
+A background thread refills the pool in bulk when it drops below the low-water mark,
+and the locations that a user has answered are excluded when popping from the pool.
+(they are cached as sorted arrays of 32-bit integers, which take 4 bytes per location instead of a set of int objects)
+
+The pool removes the sampling query, but not the database work of the request:
+the popped locations are still checked, leased, and loaded in one statement, and the lease is committed
+(see location_operations.get_location_batches), so a request takes a few round trips instead of well under a millisecond.
+"""
+
+import os
+import time
+import logging
+import random
+import bisect
+import threading
+from array import array
+from collections import deque
+from collections import OrderedDict
+from models.model import db
+from models.model import Location
+from models.model_operations.user_location_operations import get_user_location_ids
+from models.model_operations.done_bitmap import is_location_done_by_bitmap
+
+
+logger = logging.getLogger(__name__)
+
+
+# The state of the pool in the current process
+# (reset after forking, since threads and locks are not shared with the child processes)
+pool_state = {
+    "pid": None,
+    "app": None,
+    "settings": None,
+    "lock": None,
+    "refill_event": None,
+    "candidates": None,
+    "candidate_id_set": None,
+    "seen_cache": None
+}
+
+
+def init_location_pool(app, pool_size=500, low_water_mark=100, seen_cache_size=1000, seen_cache_seconds=60,
+        refill_in_background=True):
+    """
+    Enable the location pool.
+
+    The background thread is started lazily by the first request of each process,
+    because uwsgi forks the workers after the application is loaded.
+
+    Parameters
+    ----------
+    app : flask.Flask
+        The application for creating the database context in the background thread.
+    pool_size : int
+        The number of location ids to load when refilling the pool.
+    low_water_mark : int
+        Refill the pool when it has fewer location ids than this number.
+    seen_cache_size : int
+        The maximum number of users whose answered locations are cached.
+    seen_cache_seconds : int
+        The number of seconds before the cached answered locations of a user are reloaded.
+        (answers can be submitted through other processes)
+    refill_in_background : bool
+        Refill the pool by a background thread.
+        If False, the pool is refilled synchronously when popping (e.g., for testing).
+    """
+    pool_state["pid"] = None
+    pool_state["app"] = app
+    pool_state["settings"] = {
+        "pool_size": pool_size,
+        "low_water_mark": low_water_mark,
+        "seen_cache_size": seen_cache_size,
+        "seen_cache_seconds": seen_cache_seconds,
+        "refill_in_background": refill_in_background
+    }
+
+
+def is_location_pool_enabled():
+    """
+    Check if the location pool is enabled.
+
+    Returns
+    -------
+    bool
+        True if init_location_pool has been called.
+    """
+    return pool_state["settings"] is not None
+
+
+def ensure_location_pool_started():
+    """Reset the pool and start the refill thread if this is a new process."""
+    if pool_state["pid"] == os.getpid():
+        return
+
+    pool_state["lock"] = threading.Lock()
+    pool_state["refill_event"] = threading.Event()
+    pool_state["candidates"] = deque()
+    pool_state["candidate_id_set"] = set()
+    pool_state["seen_cache"] = OrderedDict()
+    pool_state["pid"] = os.getpid()
+
+    if pool_state["settings"]["refill_in_background"]:
+        thread = threading.Thread(target=run_refill_loop, args=(pool_state["pid"],), daemon=True)
+        thread.start()
+        pool_state["refill_event"].set()
+
+
+def run_refill_loop(pid):
+    """
+    Refill the pool whenever it is requested (or periodically), until the process changes.
+
+    Parameters
+    ----------
+    pid : int
+        ID of the process that starts the thread.
+    """
+    while pool_state["pid"] == pid:
+        pool_state["refill_event"].wait(timeout=30)
+        pool_state["refill_event"].clear()
+        if pool_state["pid"] != pid:
+            break
+        try:
+            with pool_state["app"].app_context():
+                refill_location_pool()
+                db.session.remove()
+        except Exception as ex:
+            logger.exception("Failed to refill the location pool: %r", ex)
+            time.sleep(1)
+
+
+def refill_location_pool():
+    """
+    Load a batch of candidate locations into the pool.
+
+    The candidates are not done, have no gold answers, and are not leased.
+    The exclusion of the locations answered by a user is applied when popping.
+    """
+    from models.model_operations.location_operations import get_wait_test_location_query
+
+    candidate_query = get_wait_test_location_query(None).with_entities(Location.id)
+    pivot = random.random()
+    pool_size = pool_state["settings"]["pool_size"]
+    rows = candidate_query.filter(Location.random_key >= pivot).order_by(Location.random_key).limit(pool_size).all()
+    if len(rows) < pool_size:
+        rows += candidate_query.filter(Location.random_key < pivot).order_by(
+                Location.random_key).limit(pool_size - len(rows)).all()
+    location_id_list = [row.id for row in rows]
+    random.shuffle(location_id_list)
+
+    with pool_state["lock"]:
+        for location_id in location_id_list:
+            if location_id not in pool_state["candidate_id_set"]:
+                pool_state["candidates"].append(location_id)
+                pool_state["candidate_id_set"].add(location_id)
+
+
+def get_seen_location_ids(user_id):
+    """
+    Get the cached location ids that the user has answered.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+
+    Returns
+    -------
+    array of int
+        IDs of the locations answered by the user in the ascending order.
+        (use has_location_id to check if an ID is in the array)
+    """
+    seen_cache = pool_state["seen_cache"]
+    with pool_state["lock"]:
+        entry = seen_cache.get(user_id)
+        if entry is not None and time.time() - entry[0] < pool_state["settings"]["seen_cache_seconds"]:
+            seen_cache.move_to_end(user_id)
+            return entry[1]
+
+    seen_location_ids = array("I", get_user_location_ids(user_id))
+
+    with pool_state["lock"]:
+        seen_cache[user_id] = (time.time(), seen_location_ids)
+        seen_cache.move_to_end(user_id)
+        while len(seen_cache) > pool_state["settings"]["seen_cache_size"]:
+            seen_cache.popitem(last=False)
+
+    return seen_location_ids
+
+
+def has_location_id(sorted_location_ids, location_id):
+    """
+    Check if a location id is in a sorted array by binary search.
+
+    Parameters
+    ----------
+    sorted_location_ids : array of int
+        IDs of the locations in the ascending order.
+    location_id : int
+        ID of the location.
+
+    Returns
+    -------
+    bool
+        True if the location id is in the array.
+    """
+    idx = bisect.bisect_left(sorted_location_ids, location_id)
+    return idx < len(sorted_location_ids) and sorted_location_ids[idx] == location_id
+
+
+def add_seen_locations(user_id, location_id_list):
+    """
+    Add the locations answered by the user to the cache.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    location_id_list : list of int
+        IDs of the answered locations.
+    """
+    if not is_location_pool_enabled() or pool_state["pid"] != os.getpid():
+        return
+
+    with pool_state["lock"]:
+        entry = pool_state["seen_cache"].get(user_id)
+        if entry is not None:
+            seen_location_ids = entry[1]
+            for location_id in location_id_list:
+                idx = bisect.bisect_left(seen_location_ids, location_id)
+                if idx == len(seen_location_ids) or seen_location_ids[idx] != location_id:
+                    seen_location_ids.insert(idx, location_id)
+
+
+def pop_pool_locations(user_id, n, exclude_location_id_list=None):
+    """
+    Pop location ids from the pool for a user.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    n : int
+        The number of location ids to pop.
+    exclude_location_id_list : list of int
+        IDs of the locations that should not be popped.
+
+    Returns
+    -------
+    location_id_list : list of int
+        At most n location ids (fewer when the pool is exhausted).
+    """
+    ensure_location_pool_started()
+    if not pool_state["settings"]["refill_in_background"] and get_location_pool_size() < n:
+        refill_location_pool()
+    seen_location_ids = get_seen_location_ids(user_id)
+    exclude_location_id_set = set(exclude_location_id_list or [])
+
+    location_id_list = []
+    skipped_location_id_list = []
+    with pool_state["lock"]:
+        candidates = pool_state["candidates"]
+        while len(location_id_list) < n and len(candidates) > 0:
+            location_id = candidates.popleft()
+            if is_location_done_by_bitmap(location_id):
+                # Drop the locations that became done after the pool was refilled
+                pool_state["candidate_id_set"].discard(location_id)
+            elif has_location_id(seen_location_ids, location_id) or location_id in exclude_location_id_set:
+                # Keep the location for other users
+                skipped_location_id_list.append(location_id)
+            else:
+                location_id_list.append(location_id)
+                pool_state["candidate_id_set"].discard(location_id)
+        candidates.extend(skipped_location_id_list)
+
+        if len(candidates) < pool_state["settings"]["low_water_mark"]:
+            pool_state["refill_event"].set()
+
+    return location_id_list
+
+
+def stop_location_pool():
+    """Stop the refill thread and disable the location pool."""
+    if pool_state["pid"] == os.getpid():
+        pool_state["pid"] = None
+        pool_state["refill_event"].set()
+    pool_state["settings"] = None
+
+
+def get_location_pool_size():
+    """
+    Get the number of location ids in the pool of the current process.
+
+    Returns
+    -------
+    int
+        The number of location ids in the pool.
+    """
+    if pool_state["pid"] != os.getpid():
+        return 0
+    with pool_state["lock"]:
+        return len(pool_state["candidates"])
@@ -0,0 +1,146 @@
+"""Functions to operate the location_tally table."""
+
+from sqlalchemy import tuple_
+from sqlalchemy import text
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from models.model import db
+from models.model import Location
+from models.model import LocationTally
+
+
+def update_location_tallies(tally_changes):
+    """
+    Add to (or subtract from) the number of good answers of locations.
+
+    The rows are upserted in the current transaction without committing,
+    so that they are committed together with the answers (see answer_operations.py).
+    The upserted rows stay locked until the transaction ends, so concurrent submissions
+    to the same location and answer are counted one after another.
+    The consensus counts of the locations are updated in the same transaction (see update_location_consensus_counts).
+
+    Parameters
+    ----------
+    tally_changes : dict of (int, int, int) to int
+        The change of the number of good answers, keyed by (location_id, land_usage, expansion).
+
+    Returns
+    -------
+    dict of (int, int, int) to int
+        The number of good answers after the change, keyed by (location_id, land_usage, expansion).
+    """
+    if len(tally_changes) == 0:
+        return {}
+
+    # Upsert the rows in key order, so that concurrent submissions lock them in the same order and never deadlock
+    table = LocationTally.__table__
+    statement = insert(table).values([{"location_id": location_id, "land_usage": land_usage,
+        "expansion": expansion, "good_answer_count": change}
+        for (location_id, land_usage, expansion), change in sorted(tally_changes.items())])
+    statement = statement.on_conflict_do_update(index_elements=["location_id", "land_usage", "expansion"],
+            set_={"good_answer_count": table.c.good_answer_count + statement.excluded.good_answer_count})
+    statement = statement.returning(table.c.location_id, table.c.land_usage, table.c.expansion,
+            table.c.good_answer_count)
+
+    good_answer_counts = {}
+    for row in db.session.execute(statement):
+        good_answer_counts[(row.location_id, row.land_usage, row.expansion)] = row.good_answer_count
+
+    update_location_consensus_counts(sorted(set([answer_key[0] for answer_key in tally_changes])))
+    return good_answer_counts
+
+
+def update_location_consensus_counts(location_id_list=None):
+    """
+    Set the consensus count of locations to the largest number of good answers in their tallies.
+
+    The counts are written in the current transaction without committing (see update_location_tallies),
+    so they are raised and lowered together with the tallies.
+
+    Parameters
+    ----------
+    location_id_list : list of int
+        IDs of the locations.
+        (update all the locations if None)
+    """
+    if location_id_list is not None and len(location_id_list) == 0:
+        return
+
+    table = Location.__table__
+    tally = LocationTally.__table__
+    max_good_answer_count = select(func.coalesce(func.max(tally.c.good_answer_count), 0)).where(
+            tally.c.location_id==table.c.id).scalar_subquery()
+    statement = update(table).values(consensus_count=max_good_answer_count)
+    if location_id_list is not None:
+        statement = statement.where(table.c.id.in_(location_id_list))
+    db.session.execute(statement)
+
+
+def get_location_tallies(answer_key_list):
+    """
+    Get the number of good answers of locations.
+
+    Parameters
+    ----------
+    answer_key_list : list of (int, int, int)
+        The (location_id, land_usage, expansion) to look up.
+
+    Returns
+    -------
+    dict of (int, int, int) to int
+        The number of good answers (0 if there are no tallies), keyed by (location_id, land_usage, expansion).
+    """
+    answer_key_set = set(answer_key_list)
+    good_answer_counts = dict.fromkeys(answer_key_set, 0)
+    if len(answer_key_set) == 0:
+        return good_answer_counts
+
+    answer_key = tuple_(LocationTally.location_id, LocationTally.land_usage, LocationTally.expansion)
+    tallies = LocationTally.query.filter(answer_key.in_(list(answer_key_set))).all()
+    for tally in tallies:
+        good_answer_counts[(tally.location_id, tally.land_usage, tally.expansion)] = tally.good_answer_count
+    return good_answer_counts
+
+
+def get_tallies_by_location(location_id):
+    """
+    Get the tallies of a location, from the most good answers to the fewest.
+
+    Parameters
+    ----------
+    location_id : int
+        ID of the location.
+
+    Returns
+    -------
+    tallies : list of LocationTally
+        The tallies with good answers.
+    """
+    tallies = LocationTally.query.filter(LocationTally.location_id==location_id,
+            LocationTally.good_answer_count > 0).order_by(LocationTally.good_answer_count.desc(),
+            LocationTally.land_usage, LocationTally.expansion).all()
+    return tallies
+
+
+def rebuild_location_tallies():
+    """
+    Recompute all the tallies (and the consensus counts of the locations) from the answer table in one pass.
+
+    The table is locked while it is rebuilt, so the answers submitted at the same time wait for it.
+
+    Returns
+    -------
+    int
+        The number of tallies.
+    """
+    db.session.execute(text("LOCK TABLE location_tally IN EXCLUSIVE MODE"))
+    LocationTally.query.delete(synchronize_session=False)
+    result = db.session.execute(text("""
+        INSERT INTO location_tally (location_id, land_usage, expansion, good_answer_count)
+        SELECT location_id, land_usage, expansion, count(*) FROM answer
+        WHERE gold_standard_status = 1 GROUP BY location_id, land_usage, expansion"""))
+    update_location_consensus_counts()
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,231 @@
+"""
+Functions to create and check the manifests of the locations assigned to users.
+
+A manifest is a JWT returned together with the locations, and the front-end sends it back with the answers.
+It lists the assigned locations with a signature for each of them:
+the signature of the gold answer for the gold standard locations, or the signature of NO_GOLD_ANSWER for the others.
+The signatures are salted with a random nonce per manifest, so the front-end cannot tell which locations are gold standards,
+while the back-end can grade the answers in memory.
+The manifests are signed with the same key as the user tokens, so they have their own "typ" claim,
+and each of them can only be submitted once (recorded by its "jti" claim in the manifest_use table).
+"""
+
+import jwt
+import hmac
+import time
+import hashlib
+import secrets
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from models.model import db
+from models.model import ManifestUse
+from models.model_operations.gold_standard_cache import get_gold_answer_class
+
+
+# The value to sign for the locations without gold answers
+NO_GOLD_ANSWER = "none"
+
+# The "typ" claim of the manifests (see USER_TOKEN_TYPE in util/util.py)
+MANIFEST_TOKEN_TYPE = "location_manifest"
+
+
+def get_manifest_signature(private_key, nonce, location_id, value):
+    """
+    Sign the expected answer of a location in a manifest.
+
+    Parameters
+    ----------
+    private_key : str
+        The private key to sign the value.
+    nonce : str
+        The random nonce of the manifest.
+    location_id : int
+        ID of the location.
+    value : str
+        The gold answer in the format "land_usage-expansion", or NO_GOLD_ANSWER.
+
+    Returns
+    -------
+    str
+        The signature (truncated to 128 bits).
+    """
+    text = "{}:{}:{}".format(nonce, location_id, value)
+    return hmac.new(private_key.encode("utf-8"), text.encode("utf-8"), hashlib.sha256).hexdigest()[0:32]
+
+
+def create_location_manifest(user_id, location_list, private_key, expire_seconds=3600):
+    """
+    Create the manifest of the locations assigned to a user.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    location_list : list of Locations
+        The locations returned by get_locations.
+    private_key : str
+        The private key to sign the manifest.
+    expire_seconds : int
+        The number of seconds before the manifest expires.
+
+    Returns
+    -------
+    str
+        The encoded manifest.
+    """
+    nonce = secrets.token_hex(8)
+    signatures = {}
+    for location in location_list:
+        answer_class = get_gold_answer_class(location.id)
+        value = NO_GOLD_ANSWER if answer_class is None else "{}-{}".format(*answer_class)
+        signatures[str(location.id)] = get_manifest_signature(private_key, nonce, location.id, value)
+
+    payload = {
+        "typ": MANIFEST_TOKEN_TYPE,
+        "jti": secrets.token_hex(16),
+        "user_id": user_id,
+        "nonce": nonce,
+        "locations": signatures,
+        "exp": int(time.time()) + expire_seconds
+    }
+    return jwt.encode(payload, private_key, algorithm="HS256")
+
+
+def decode_location_manifest(manifest, user_id, private_key):
+    """
+    Decode and verify the manifest sent back by a user.
+
+    Parameters
+    ----------
+    manifest : str
+        The encoded manifest.
+    user_id : int
+        ID of the user who sends the manifest.
+    private_key : str
+        The private key to decode the manifest.
+
+    Returns
+    -------
+    dict
+        The decoded manifest.
+
+    Raises
+    ------
+    exception : Exception
+        When the manifest is invalid, expired, not a manifest (e.g., a user token), or issued to another user.
+    """
+    payload = jwt.decode(manifest, private_key, algorithms=["HS256"])
+
+    if payload.get("typ") != MANIFEST_TOKEN_TYPE:
+        raise Exception("The token is not a manifest.")
+
+    if payload.get("user_id") != user_id:
+        raise Exception("The manifest is not issued to the user.")
+
+    return payload
+
+
+def claim_location_manifest(manifest, user_id, private_key, idempotency_key=None):
+    """
+    Record the submission of a manifest, so that it cannot be submitted again.
+
+    The row is written in the current transaction without committing, so that it is committed together with the answers
+    (see answer_operations.batch_process_answers and answer_journal.journal_answers).
+    If a concurrent request with the same manifest has written the row, this waits until that request ends.
+
+    Parameters
+    ----------
+    manifest : str
+        The encoded manifest.
+    user_id : int
+        ID of the user who sends the manifest.
+    private_key : str
+        The private key to decode the manifest.
+    idempotency_key : str
+        The key provided by the front-end for the submission (optional).
+
+    Returns
+    -------
+    bool
+        True if the submission is recorded, or False if the manifest has been submitted with the same idempotency_key
+        (a retry of the submission, whose answers should not be written again).
+
+    Raises
+    ------
+    exception : Exception
+        The same as decode_location_manifest.
+    exception : Exception
+        When the manifest has been submitted by another submission.
+    """
+    payload = decode_location_manifest(manifest, user_id, private_key)
+
+    table = ManifestUse.__table__
+    statement = insert(table).values(jti=payload["jti"], user_id=user_id, idempotency_key=idempotency_key,
+            expires_at=func.to_timestamp(payload["exp"]))
+    statement = statement.on_conflict_do_nothing(index_elements=["jti"]).returning(table.c.jti)
+    if db.session.execute(statement).first() is not None:
+        return True
+
+    manifest_use = db.session.get(ManifestUse, payload["jti"])
+    if idempotency_key is not None and manifest_use is not None and manifest_use.idempotency_key == idempotency_key:
+        return False
+    raise Exception("The manifest has been submitted.")
+
+
+def remove_expired_manifest_uses():
+    """
+    Remove the records of the manifests that have expired (they cannot be submitted anyway).
+
+    Returns
+    -------
+    int
+        The number of removed records.
+    """
+    count = ManifestUse.query.filter(ManifestUse.expires_at <= func.now()).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def exam_gold_standard_by_manifest(manifest_payload, private_key, location_id, land_usage, expansion):
+    """
+    Check the quality of the answer with the signatures in the manifest (see exam_gold_standard).
+
+    Parameters
+    ----------
+    manifest_payload : dict
+        The decoded manifest.
+    private_key : str
+        The private key to sign the answer.
+    location_id : int
+        ID of the location.
+    land_usage : int
+        User's answer of judging if the land is a farm or has buildings.
+    expansion : int
+        User's answer of judging the construction is expanded.
+
+    Returns
+    -------
+    int
+        Result of the checking.
+        0 means no gold standard exists.
+        1 means passing the gold standard test.
+        2 means failing the gold standard test.
+
+    Raises
+    ------
+    exception : Exception
+        When the location is not in the manifest.
+    """
+    signature = manifest_payload["locations"].get(str(location_id))
+    if signature is None:
+        raise Exception("Location {} is not in the manifest.".format(location_id))
+
+    nonce = manifest_payload["nonce"]
+    if hmac.compare_digest(signature, get_manifest_signature(private_key, nonce, location_id, NO_GOLD_ANSWER)):
+        return 0
+
+    answer_value = "{}-{}".format(land_usage, expansion)
+    if hmac.compare_digest(signature, get_manifest_signature(private_key, nonce, location_id, answer_value)):
+        return 1
+    else:
+        return 2
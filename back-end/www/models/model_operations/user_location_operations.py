@@ -0,0 +1,81 @@
+"""Functions to operate the user_location table."""
+
+from sqlalchemy.dialects.postgresql import insert
+from models.model import db
+from models.model import Answer
+from models.model import UserLocation
+
+
+def add_user_locations(user_id, location_id_list):
+    """
+    Record the locations answered by a user.
+
+    The rows are written in the current transaction without committing,
+    so that they are committed together with the answers (see answer_operations.create_answer).
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    location_id_list : list of int
+        IDs of the answered locations.
+    """
+    if len(location_id_list) == 0:
+        return
+
+    statement = insert(UserLocation.__table__).values(
+            [{"user_id": user_id, "location_id": location_id} for location_id in set(location_id_list)])
+    statement = statement.on_conflict_do_nothing(index_elements=["user_id", "location_id"])
+    db.session.execute(statement)
+
+
+def remove_user_location_if_unanswered(user_id, location_id):
+    """
+    Remove the record of a location answered by a user if the user has no answers to it anymore.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    location_id : int
+        ID of the location.
+    """
+    if Answer.query.filter_by(user_id=user_id, location_id=location_id).first() is None:
+        UserLocation.query.filter_by(user_id=user_id, location_id=location_id).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def get_user_location_ids(user_id):
+    """
+    Get the IDs of the locations answered by a user.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+
+    Returns
+    -------
+    location_id_list : list of int
+        IDs of the answered locations in the ascending order.
+    """
+    rows = db.session.query(UserLocation.location_id).filter(
+            UserLocation.user_id==user_id).order_by(UserLocation.location_id).all()
+    return [row.location_id for row in rows]
+
+
+def get_user_location_count(user_id):
+    """
+    Get the number of locations answered by a user.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+
+    Returns
+    -------
+    int
+        The number of answered locations.
+    """
+    return UserLocation.query.filter_by(user_id=user_id).count()
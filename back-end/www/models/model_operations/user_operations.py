@@ -1,6 +1,20 @@
 """Functions to operate the user table."""
+import math
 from models.model import db
 from models.model import User
+from models.model_operations.user_location_operations import get_user_location_count
+
+
+# The policy of the adaptive gold standard size (see get_adaptive_gold_standard_size)
+# Users with fewer gold standard tests than this number are considered new
+NEW_USER_GOLD_TEST_COUNT = 5
+# Users are trusted if the lower bound of their pass rate reaches this value,
+# or considered failing if the upper bound of their pass rate is below the other value
+TRUSTED_PASS_RATE = 0.8
+FAILING_PASS_RATE = 0.6
+# The ratio of gold standards in a batch for trusted users, and for new or failing users
+TRUSTED_GOLD_RATIO = 0.1
+UNTRUSTED_GOLD_RATIO = 0.5
 
 
 def create_user(client_id):
@@ -106,6 +120,33 @@ def update_client_type_by_user_id(user_id, client_type):
     return user
 
 
+def update_client_type_by_user_ids(user_id_list, client_type):
+    """
+    Update the client type of several users in one statement (e.g., banning the users in bulk).
+
+    The admins are never changed.
+
+    Parameters
+    ----------
+    user_id_list : list of int
+        IDs of the users.
+    client_type : int
+        Type of the user (see the description in the User model).
+
+    Returns
+    -------
+    int
+        The number of updated users.
+    """
+    if len(user_id_list) == 0:
+        return 0
+
+    count = User.query.filter(User.id.in_(user_id_list), User.client_type!=0).update(
+            {User.client_type: client_type}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
 def remove_user(user_id):
     """
     Remove a user.
@@ -167,9 +208,91 @@ def get_user_done_location_count(user_id):
     if user is None:
         raise Exception("Cannot find the user.")
 
-    if user.answers is None:
-        return 0
-
-    loc_count = len(set([answer.location_id for answer in user.answers]))
+    loc_count = get_user_location_count(user_id)
 
     return loc_count
+
+
+def record_gold_test_result(user_id, passed, commit=True):
+    """
+    Count the result of a gold standard test of the user.
+
+    Parameters
+    ----------
+    user_id : int
+        ID of the user.
+    passed : bool
+        If the user passed the gold standard test.
+    commit : bool
+        Commit the change.
+    """
+    values = {User.gold_test_count: User.gold_test_count + 1}
+    if passed:
+        values[User.gold_pass_count] = User.gold_pass_count + 1
+    User.query.filter_by(id=user_id).update(values, synchronize_session=False)
+    if commit:
+        db.session.commit()
+
+
+def get_pass_rate_bounds(pass_count, test_count, z=1.96):
+    """
+    Get the Wilson score interval of the gold standard pass rate.
+
+    Parameters
+    ----------
+    pass_count : int
+        The number of passed gold standard tests.
+    test_count : int
+        The number of gold standard tests.
+    z : float
+        The z-score of the confidence level (1.96 for 95%).
+
+    Returns
+    -------
+    (float, float)
+        The lower and upper bounds of the pass rate.
+    """
+    if test_count == 0:
+        return (0.0, 1.0)
+
+    rate = pass_count / test_count
+    denominator = 1 + z * z / test_count
+    center = rate + z * z / (2 * test_count)
+    margin = z * math.sqrt(rate * (1 - rate) / test_count + z * z / (4 * test_count * test_count))
+    return ((center - margin) / denominator, (center + margin) / denominator)
+
+
+def get_adaptive_gold_standard_size(user, size, gold_standard_size):
+    """
+    Decide the number of gold standards in a batch by how much the user is trusted.
+
+    New users (with few tests) and failing users get at least UNTRUSTED_GOLD_RATIO of gold standards,
+    while trusted users get at most TRUSTED_GOLD_RATIO of gold standards (but at least one).
+    Other users get the requested number.
+
+    Parameters
+    ----------
+    user : User
+        The user who requests the locations.
+    size : int
+        Total number of locations to be returned.
+    gold_standard_size : int
+        The number of gold standards requested by the front-end.
+
+    Returns
+    -------
+    int
+        The number of gold standards, between 1 and size.
+    """
+    if user.gold_test_count < NEW_USER_GOLD_TEST_COUNT:
+        adaptive_size = max(gold_standard_size, math.ceil(size * UNTRUSTED_GOLD_RATIO))
+    else:
+        lower_bound, upper_bound = get_pass_rate_bounds(user.gold_pass_count, user.gold_test_count)
+        if lower_bound >= TRUSTED_PASS_RATE:
+            adaptive_size = min(gold_standard_size, math.ceil(size * TRUSTED_GOLD_RATIO))
+        elif upper_bound < FAILING_PASS_RATE:
+            adaptive_size = max(gold_standard_size, math.ceil(size * UNTRUSTED_GOLD_RATIO))
+        else:
+            adaptive_size = gold_standard_size
+
+    return min(size, max(1, adaptive_size))
@@ -0,0 +1,72 @@
+from basic_tests import BasicTest
+from models.model_operations import answer_aggregation
+import numpy as np
+import unittest
+
+IS_GOLD_STANDARD = 0
+PASS_GOLD_TEST = 1
+FAIL_GOLD_TEST = 2
+
+
+class AnswerAggregationTest(BasicTest):
+    """Test case for the Dawid-Skene aggregation of answers."""
+
+    def create_answer_arrays(self, answer_list):
+        """Create the answer arrays from (location_id, user_id, land_usage, expansion, gold_standard_status)."""
+        values = np.array(answer_list, dtype=np.int32)
+        columns = ["location_id", "user_id", "land_usage", "expansion", "gold_standard_status"]
+        return {column: values[:, i] for i, column in enumerate(columns)}
+
+    def test_aggregate_answers(self):
+        """
+        Loc#1 is a gold standard (1, 1). Users 1 to 3 answer Loc#1 to Loc#9 correctly with (1, 1) or (2, 2),
+        but user 4 (who failed the gold standard test) always answers the other label.
+        On Loc#10, user 4 answers (2, 2) and users 1 and 2 answer (1, 1).
+        Pass if the labels of Loc#2 to Loc#10 are correct, and user 4 is estimated to swap the labels.
+        Pass if Loc#10 is more confident than majority voting, and only confident with 2 answers or more.
+        """
+        answer_list = [(1, 0, 1, 1, IS_GOLD_STANDARD)]
+        truth = {}
+        for location_id in range(1, 10):
+            label = 1 if location_id % 2 == 1 else 2
+            truth[location_id] = label
+            for user_id in [1, 2, 3]:
+                answer_list.append((location_id, user_id, label, label, PASS_GOLD_TEST))
+            answer_list.append((location_id, 4, 3 - label, 3 - label, FAIL_GOLD_TEST))
+        answer_list += [(10, 4, 2, 2, FAIL_GOLD_TEST), (10, 1, 1, 1, PASS_GOLD_TEST), (10, 2, 1, 1, PASS_GOLD_TEST)]
+        answer_list.append((11, 1, 1, 1, PASS_GOLD_TEST))
+        truth[10] = 1
+        truth[11] = 1
+
+        aggregation = answer_aggregation.aggregate_answers(self.create_answer_arrays(answer_list))
+        assert aggregation["location_ids"].tolist() == list(range(2, 12))
+        for i, location_id in enumerate(aggregation["location_ids"].tolist()):
+            assert aggregation["land_usage"][i] == truth[location_id]
+            assert aggregation["expansion"][i] == truth[location_id]
+
+        field = aggregation["fields"]["land_usage"]
+        user_4 = field["user_ids"].tolist().index(4)
+        assert field["confusion"][user_4, 0, 1] > 0.5
+        assert field["confusion"][user_4, 1, 0] > 0.5
+        assert aggregation["confidence"][8] > 2 / 3
+
+        confident_location_ids = answer_aggregation.get_confident_location_ids(aggregation,
+                min_confidence=0.5, min_answer_count=2)
+        assert confident_location_ids.tolist() == list(range(2, 11))
+
+    def test_aggregate_no_answers(self):
+        """
+        Pass if there is no location when there are no answers, or only the answers of the gold standards.
+        """
+        empty_arrays = {column: np.zeros(0, dtype=np.int32)
+            for column in ["location_id", "user_id", "land_usage", "expansion", "gold_standard_status"]}
+        gold_arrays = self.create_answer_arrays([(1, 0, 1, 1, IS_GOLD_STANDARD)])
+        for answer_arrays in [empty_arrays, gold_arrays]:
+            aggregation = answer_aggregation.aggregate_answers(answer_arrays)
+            assert len(aggregation["location_ids"]) == 0
+            assert len(aggregation["confidence"]) == 0
+            assert len(answer_aggregation.get_confident_location_ids(aggregation)) == 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+from basic_tests import BasicTest
+from models.model_operations import answer_anomaly
+import numpy as np
+import unittest
+
+IS_GOLD_STANDARD = 0
+PASS_GOLD_TEST = 1
+FAIL_GOLD_TEST = 2
+
+
+class AnswerAnomalyTest(BasicTest):
+    """Test case for the detection of anomalous users."""
+
+    def create_arrays(self, answer_list, user_list):
+        """
+        Create the answer arrays from (location_id, user_id, land_usage, expansion, gold_standard_status, seconds),
+        and the user arrays from (id, client_type, gold_pass_count, gold_test_count).
+        """
+        values = np.array(answer_list, dtype=np.int64)
+        columns = ["location_id", "user_id", "land_usage", "expansion", "gold_standard_status"]
+        answer_arrays = {column: values[:, i] for i, column in enumerate(columns)}
+        answer_arrays["timestamp"] = values[:, 5] * 1000
+        values = np.array(user_list, dtype=np.int64)
+        columns = ["id", "client_type", "gold_pass_count", "gold_test_count"]
+        user_arrays = {column: values[:, i] for i, column in enumerate(columns)}
+        return answer_arrays, user_arrays
+
+    def test_flag_anomalous_users(self):
+        """
+        Users 1 to 3 answer 30 locations in submissions of 5 answers every 60 seconds, with varied answers.
+        User 4 answers (1, 1) to every location in submissions of 5 answers every 2 seconds, and fails most gold tests.
+        User 5 is an admin who behaves like user 4.
+        Pass if only user 4 is flagged, with the "uniform", "fast", "disagree", and "gold_fail" signals.
+        """
+        answer_list = [(100, 0, 1, 1, IS_GOLD_STANDARD, 0)]
+        for location_id in range(1, 31):
+            label = location_id % 3
+            submission = (location_id - 1) // 5
+            for user_id in [1, 2, 3]:
+                answer_list.append((location_id, user_id, label, 2 - label % 2, PASS_GOLD_TEST, 1000 + submission * 60))
+            for user_id in [4, 5]:
+                answer_list.append((location_id, user_id, 1, 1, FAIL_GOLD_TEST, 1000 + submission * 2))
+        user_list = [(1, 1, 6, 6), (2, 1, 6, 6), (3, 1, 5, 6), (4, 1, 1, 6), (5, 0, 1, 6), (6, 1, 0, 0)]
+        answer_arrays, user_arrays = self.create_arrays(answer_list, user_list)
+
+        features = answer_anomaly.compute_user_features(answer_arrays, user_arrays)
+        assert features["user_ids"].tolist() == [1, 2, 3, 4, 5, 6]
+        assert features["answer_count"].tolist() == [30, 30, 30, 30, 30, 0]
+        assert features["entropy"][3] == 0
+        assert features["entropy"][0] > 1
+        assert np.isnan(features["entropy"][5])
+        assert features["gap_count"].tolist() == [5, 5, 5, 5, 5, 0]
+        assert features["median_seconds_per_answer"][0] == 12
+        assert features["median_seconds_per_answer"][3] == 0.4
+        assert features["fast_fraction"].tolist()[0:5] == [0, 0, 0, 1, 1]
+        assert features["agreement"].tolist()[0:3] == [1, 1, 1]
+        assert features["agreement"][3] == 10 / 30
+
+        user_ids, signals = answer_anomaly.flag_anomalous_users(features, max_agreement=0.4)
+        assert user_ids.tolist() == [4]
+        for name in answer_anomaly.ANOMALY_SIGNALS:
+            assert signals[name].tolist() == [False, False, False, True, True, False]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+from basic_tests import BasicTest
+from models.model_operations import answer_arrays
+from models.model_operations import consensus_policy
+from models.model_operations import answer_operations
+from models.model_operations import location_operations
+from models.model_operations import user_operations
+from models.model import db
+import numpy as np
+import unittest
+
+PASS_GOLD_TEST = 1
+FAIL_GOLD_TEST = 2
+
+
+class AnswerArraysTest(BasicTest):
+    """Test case for the offline recomputation with answer arrays."""
+
+    def setUp(self):
+        db.create_all()
+
+    def tearDown(self):
+        consensus_policy.init_consensus_policy()
+        super().tearDown()
+
+    def create_answers(self, user, location, answer_list, status=PASS_GOLD_TEST):
+        """Create the answers of a user to a location, in the (land_usage, expansion) format."""
+        for land_usage, expansion in answer_list:
+            answer_operations.create_answer(user.id, location.id, 2000, 2010, "", land_usage, expansion,
+                    status, 0, 0, 0, 0, 0)
+
+    def test_copy_query_to_array(self):
+        """
+        Copy a query with an integer, a smallint, and a bigint column, and a query without rows.
+        Pass if the arrays have the values of the rows, and a query with a null value raises.
+        """
+        values = answer_arrays.copy_query_to_array(
+                "SELECT * FROM (VALUES (1, 2::smallint, 3000000000000::bigint), (-4, 0::smallint, -5::bigint)) AS v", 3)
+        assert values.dtype == np.int64
+        assert values.tolist() == [[1, 2, 3000000000000], [-4, 0, -5]]
+
+        values = answer_arrays.copy_query_to_array("SELECT 1, 2 WHERE false", 2, dtype=np.int32)
+        assert values.shape == (0, 2)
+        assert values.dtype == np.int32
+
+        with self.assertRaises(Exception) as context:
+            answer_arrays.copy_query_to_array("SELECT 1, NULL::int", 2)
+
+    def test_get_consensus_flags(self):
+        """
+        Create good and failed answers to 4 locations.
+        Pass if the vectorized evaluation of every policy matches the evaluation in the database.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        for i in range(6):
+            user_operations.record_gold_test_result(u2.id, True)
+        locations = [location_operations.create_location(str(i)) for i in range(4)]
+        self.create_answers(u1, locations[0], [(1, 1)] * 3)
+        self.create_answers(u2, locations[1], [(1, 1)] * 3 + [(2, 2)])
+        self.create_answers(u2, locations[2], [(0, 2)] * 2)
+        self.create_answers(u1, locations[2], [(0, 2)] * 2, status=FAIL_GOLD_TEST)
+        self.create_answers(u1, locations[3], [(2, 1)] * 2 + [(1, 2)] * 2)
+
+        arrays = answer_arrays.load_answer_arrays(include_timestamp=True)
+        assert len(arrays["location_id"]) == 15
+        assert (arrays["timestamp"] > 0).all()
+        user_weights = answer_arrays.load_user_trust_weights()
+        location_count = max([location.id for location in locations]) + 1
+        for policy in consensus_policy.CONSENSUS_POLICIES:
+            for match_count in [1, 2]:
+                consensus_policy.init_consensus_policy(policy, match_count=match_count, min_ratio=0.75)
+                flags = answer_arrays.get_consensus_flags(arrays, location_count, user_weights=user_weights)
+                assert set(flags.nonzero()[0].tolist()) == consensus_policy.get_consensus_location_ids()
+
+    def test_recompute_done_locations(self):
+        """
+        Create 3 good answers to Loc#1 and 1 good answer to Loc#2, and mark Loc#2 done.
+        Pass if the recomputation with match_count 2 marks Loc#1 done and clears Loc#2,
+        and the dry run and the recomputation without clearing (by default) keep Loc#2 done.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        self.create_answers(u1, l1, [(1, 1)] * 3)
+        self.create_answers(u1, l2, [(1, 1)])
+        location_operations.set_location_done(l2.id, True)
+        consensus_policy.init_consensus_policy("k_matching", match_count=2)
+
+        set_location_ids, clear_location_ids = answer_arrays.recompute_done_locations(clear_done=True, dry_run=True)
+        assert set_location_ids.tolist() == [l1.id]
+        assert clear_location_ids.tolist() == [l2.id]
+        assert location_operations.get_location_is_done_count() == 1
+
+        answer_arrays.recompute_done_locations()
+        db.session.expire_all()
+        assert l1.done_at is not None
+        assert l2.done_at is not None
+
+        set_location_ids, clear_location_ids = answer_arrays.recompute_done_locations(clear_done=True)
+        assert set_location_ids.tolist() == []
+        assert clear_location_ids.tolist() == [l2.id]
+        db.session.expire_all()
+        assert l2.done_at is None
+
+
+if __name__ == "__main__":
+    unittest.main()
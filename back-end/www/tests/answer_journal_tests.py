@@ -0,0 +1,190 @@
+from basic_tests import BasicTest
+from models.model_operations import answer_journal
+from models.model_operations import answer_operations
+from models.model_operations import location_operations
+from models.model_operations import user_operations
+from models.model_operations import location_lease_operations
+from models.model import db
+from models.model import AnswerJournalCheckpoint
+import unittest
+from unittest import mock
+import tempfile
+import shutil
+import json
+import time
+import os
+
+IS_GOLD_STANDARD = 0
+PASS_GOLD_TEST = 1
+
+
+class AnswerJournalTest(BasicTest):
+    """Test case for the answer journal."""
+
+    def setUp(self):
+        db.create_all()
+        self.journal_dir = tempfile.mkdtemp()
+        answer_journal.init_answer_journal(self.app, self.journal_dir, flush_in_background=False)
+
+    def tearDown(self):
+        answer_journal.close_answer_journal()
+        shutil.rmtree(self.journal_dir)
+        super().tearDown()
+
+    def get_segment_names(self, suffix=answer_journal.SEGMENT_SUFFIX):
+        """Get the names of the files in the journal directory with the suffix."""
+        return sorted([name for name in os.listdir(self.journal_dir) if name.endswith(suffix)])
+
+    def test_journal_answers(self):
+        """
+        Create a gold standard on Loc#1, and journal the answers of u1 to Loc#1 and Loc#2.
+        Pass if u1 passes, and the answers are only written into the database after flushing.
+        Pass if only the new empty segment is left after flushing.
+        """
+        u0 = user_operations.create_user("000")
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        answer_operations.create_answer(u0.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+
+        result = answer_journal.journal_answers(u1.id, self.create_frontend_answers([l1.id, l2.id]))
+        assert result == True
+        assert answer_operations.get_answer_count(u1.id) == 0
+
+        assert answer_journal.flush_answer_journal() == 1
+        assert answer_operations.get_answer_count(u1.id) == 2
+        assert answer_operations.get_good_answer_count(l2.id, 1, 1) == 1
+        assert user_operations.get_user_by_id(u1.id).gold_test_count == 1
+        assert self.get_segment_names() == [answer_journal.journal_state["segment"]["name"]]
+
+        # The answers without a gold standard are rejected before they are journaled
+        with self.assertRaises(Exception):
+            answer_journal.journal_answers(u1.id, self.create_frontend_answers([l2.id, l2.id]))
+        assert answer_journal.journal_state["segment"]["size"] == 0
+
+    def test_journal_answers_before_flush(self):
+        """
+        Create a gold standard on Loc#1 and 4 other locations, get 3 locations for u1, and journal the answers.
+        Pass if getting 3 locations for u1 again before flushing does not return the answered locations,
+        and the leases of the answered locations are released.
+        Pass if u1 has one answer to each location after flushing.
+        """
+        u0 = user_operations.create_user("000")
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        for factory_id in ["BBB", "CCC", "DDD", "EEE"]:
+            location_operations.create_location(factory_id)
+        answer_operations.create_answer(u0.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+
+        locations = location_operations.get_locations(u1.id, 3, 1)
+        answered_location_id_set = set([location.id for location in locations if location.id != l1.id])
+        answer_journal.journal_answers(u1.id, self.create_frontend_answers([location.id for location in locations]))
+        assert len(location_lease_operations.get_active_location_leases(u1.id)) == 0
+
+        locations = location_operations.get_locations(u1.id, 3, 1)
+        location_id_set = set([location.id for location in locations if location.id != l1.id])
+        assert len(location_id_set) == 2
+        assert len(location_id_set & answered_location_id_set) == 0
+
+        answer_journal.journal_answers(u1.id, self.create_frontend_answers([location.id for location in locations]))
+        assert answer_journal.flush_answer_journal() == 2
+        location_id_list = [answer.location_id for answer in answer_operations.get_answers_by_user(u1.id)
+                if answer.location_id != l1.id]
+        assert len(location_id_list) == 4
+        assert len(set(location_id_list)) == 4
+
+    def test_journal_answers_timestamp(self):
+        """
+        Journal 2 submissions of u1 to Loc#1 and Loc#2, 0.2 seconds apart, and flush them together.
+        Pass if the answers keep the time of their submissions instead of the time of the flush.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+
+        answer_journal.append_answer_journal(u1.id, self.create_frontend_answers([l1.id]), PASS_GOLD_TEST, [0])
+        time.sleep(0.2)
+        answer_journal.append_answer_journal(u1.id, self.create_frontend_answers([l2.id]), PASS_GOLD_TEST, [0])
+
+        assert answer_journal.flush_answer_journal() == 2
+        a1 = answer_operations.get_answers_by_user_and_location(u1.id, l1.id)[0]
+        a2 = answer_operations.get_answers_by_user_and_location(u1.id, l2.id)[0]
+        assert (a2.timestamp - a1.timestamp).total_seconds() >= 0.2
+
+    def test_replay_journal_segment(self):
+        """
+        Write a segment of a stopped process with 2 submissions and an incomplete line,
+        and a checkpoint after the first submission.
+        Pass if only the second submission is written, and the segment and the checkpoint are removed.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+
+        lines = []
+        for user in [u1, u2]:
+            record = {"user_id": user.id, "answers": self.create_frontend_answers([l1.id, l2.id]),
+                    "gold_test_pass_status": PASS_GOLD_TEST, "non_gold_answer_id_list": [1]}
+            lines.append((json.dumps(record) + "\n").encode("utf-8"))
+        name = "answers-stopped-1-1" + answer_journal.SEGMENT_SUFFIX
+        with open(os.path.join(self.journal_dir, name), "wb") as f:
+            f.write(lines[0] + lines[1] + b'{"user_id":')
+        db.session.add(AnswerJournalCheckpoint(segment=name, flushed_offset=len(lines[0])))
+        db.session.commit()
+
+        assert answer_journal.flush_answer_journal() == 1
+        assert answer_operations.get_answer_count(u1.id) == 0
+        assert answer_operations.get_answer_count(u2.id) == 2
+        assert name not in self.get_segment_names()
+        assert AnswerJournalCheckpoint.query.count() == 0
+
+    def test_failed_journal_answers(self):
+        """
+        Journal 2 submissions, where the second one answers a location that does not exist.
+        Pass if the first submission is written, and the second one is moved to the failed file and logged.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+
+        answer_journal.append_answer_journal(u1.id, self.create_frontend_answers([l1.id, l2.id]), PASS_GOLD_TEST, [1])
+        answer_journal.append_answer_journal(u1.id, self.create_frontend_answers([l1.id, l2.id + 100]), PASS_GOLD_TEST, [1])
+
+        with self.assertLogs(answer_journal.logger, level="ERROR") as logs:
+            assert answer_journal.flush_answer_journal() == 1
+        assert answer_operations.get_answer_count(u1.id) == 2
+        assert any("Moved 1 submissions" in message for message in logs.output)
+        failed_names = self.get_segment_names(answer_journal.FAILED_SUFFIX)
+        assert len(failed_names) == 1
+        with open(os.path.join(self.journal_dir, failed_names[0]), "rb") as f:
+            failed_lines = f.read().splitlines()
+        assert len(failed_lines) == 1
+        assert json.loads(failed_lines[0])["answers"][1]["location_id"] == l2.id + 100
+
+    def test_failed_journal_answers_commit_failure(self):
+        """
+        Journal a submission that answers a location that does not exist, and fail the commit of the first flush.
+        Pass if the submission is only moved to the failed file once, after the flush is retried.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+
+        answer_journal.append_answer_journal(u1.id, self.create_frontend_answers([l1.id, l1.id + 100]), PASS_GOLD_TEST, [1])
+
+        with mock.patch.object(db.session, "commit", side_effect=Exception("Commit failed")):
+            with self.assertRaises(Exception):
+                answer_journal.flush_answer_journal()
+        assert self.get_segment_names(answer_journal.FAILED_SUFFIX) == []
+
+        with self.assertLogs(answer_journal.logger, level="ERROR"):
+            assert answer_journal.flush_answer_journal() == 0
+        failed_names = self.get_segment_names(answer_journal.FAILED_SUFFIX)
+        assert len(failed_names) == 1
+        with open(os.path.join(self.journal_dir, failed_names[0]), "rb") as f:
+            assert len(f.read().splitlines()) == 1
+        assert self.get_segment_names() == [answer_journal.journal_state["segment"]["name"]]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+from basic_tests import BasicTest
+from models.model_operations import answer_submission_operations
+from models.model_operations import answer_operations
+from models.model_operations import answer_journal
+from models.model_operations import location_operations
+from models.model_operations import user_operations
+from models.model import db
+from models.model import AnswerSubmission
+import unittest
+import datetime
+import tempfile
+import shutil
+
+IS_GOLD_STANDARD = 0
+
+
+class AnswerSubmissionTest(BasicTest):
+    """Test case for idempotent answer submissions."""
+
+    def setUp(self):
+        db.create_all()
+
+    def test_claim_answer_submission(self):
+        """
+        Claim a key of u1 twice, and the same key of u2.
+        Pass if only the first claim of u1 and the claim of u2 succeed, and the result is kept.
+        Expire the claim of u1. Pass if it is no longer returned, can be claimed again, and is removed by the cleanup.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+
+        assert answer_submission_operations.claim_answer_submission(u1.id, "k1", True) == True
+        assert answer_submission_operations.claim_answer_submission(u1.id, "k1", False) == False
+        assert answer_submission_operations.claim_answer_submission(u2.id, "k1", False) == True
+        db.session.commit()
+        assert answer_submission_operations.get_answer_submission_result(u1.id, "k1") == True
+        assert answer_submission_operations.get_answer_submission_result(u2.id, "k1") == False
+        assert answer_submission_operations.get_answer_submission_result(u1.id, "k2") is None
+
+        submission = AnswerSubmission.query.filter_by(user_id=u1.id).first()
+        submission.created_at = submission.created_at - datetime.timedelta(seconds=100)
+        db.session.commit()
+        assert answer_submission_operations.get_answer_submission_result(u1.id, "k1", expire_seconds=50) is None
+        assert answer_submission_operations.remove_expired_answer_submissions(expire_seconds=50) == 1
+        assert answer_submission_operations.claim_answer_submission(u1.id, "k1", False, expire_seconds=50) == True
+
+        with self.assertRaises(Exception):
+            answer_submission_operations.get_answer_submission_result(u1.id, "k" * 65)
+
+    def test_batch_process_answers_with_idempotency_key(self):
+        """
+        Create a gold standard on Loc#1, and submit the answers of u1 to Loc#1 and Loc#2 twice with the same key.
+        Pass if both submissions pass, and the answers and the gold test are only recorded once.
+        Pass if the submission with another key is recorded again.
+        """
+        u0 = user_operations.create_user("000")
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        answer_operations.create_answer(u0.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        answers = self.create_frontend_answers([l1.id, l2.id])
+
+        assert answer_operations.batch_process_answers(u1.id, answers, idempotency_key="k1") == True
+        assert answer_operations.batch_process_answers(u1.id, answers, idempotency_key="k1") == True
+        assert answer_operations.get_answer_count(u1.id) == 2
+        assert answer_operations.get_good_answer_count(l2.id, 1, 1) == 1
+        assert user_operations.get_user_by_id(u1.id).gold_test_count == 1
+
+        assert answer_operations.batch_process_answers(u1.id, answers, idempotency_key="k2") == True
+        assert answer_operations.get_answer_count(u1.id) == 4
+        assert answer_operations.get_good_answer_count(l2.id, 1, 1) == 2
+
+    def test_journal_answers_with_idempotency_key(self):
+        """
+        Create a gold standard on Loc#1, and journal the answers of u1 to Loc#1 and Loc#2 twice with the same key.
+        Pass if only one submission is written after flushing, and a retry after flushing is not journaled.
+        """
+        journal_dir = tempfile.mkdtemp()
+        answer_journal.init_answer_journal(self.app, journal_dir, flush_in_background=False)
+        try:
+            u0 = user_operations.create_user("000")
+            u1 = user_operations.create_user("111")
+            l1 = location_operations.create_location("AAA")
+            l2 = location_operations.create_location("BBB")
+            answer_operations.create_answer(u0.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+            answers = self.create_frontend_answers([l1.id, l2.id])
+
+            assert answer_journal.journal_answers(u1.id, answers, idempotency_key="k1") == True
+            assert answer_journal.journal_answers(u1.id, answers, idempotency_key="k1") == True
+            assert answer_journal.flush_answer_journal() == 1
+            assert answer_operations.get_answer_count(u1.id) == 2
+
+            assert answer_journal.journal_answers(u1.id, answers, idempotency_key="k1") == True
+            assert answer_journal.journal_state["segment"]["size"] == 0
+        finally:
+            answer_journal.close_answer_journal()
+            shutil.rmtree(journal_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
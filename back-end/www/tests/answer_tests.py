@@ -2,6 +2,7 @@ from basic_tests import BasicTest
 from models.model_operations import answer_operations
 from models.model_operations import location_operations
 from models.model_operations import user_operations
+from models.model_operations import consensus_policy
 from models.model import db
 import unittest
 
@@ -11,6 +12,10 @@ class AnswerTest(BasicTest):
     def setUp(self):
         db.create_all()
 
+    def tearDown(self):
+        consensus_policy.init_consensus_policy()
+        super().tearDown()
+
     def test_create_answer(self):
         """
         Create an answer and check if returns an answer and its factory_id as expected. Pass if both.
@@ -35,11 +40,12 @@ class AnswerTest(BasicTest):
         assert answer.user_id == user1.id
         assert answer.location_id == location1.id
         assert answer.gold_standard_status == PASS_GOLD_TEST
+        assert location_operations.get_location_by_id(location1.id).answer_count == 1
 
     def test_remove_answer(self):
         """
         Create then remove an answer.
-        Check if the answer first existed in db, then removed successfully. Pass if both.
+        Check if the answer first existed in db, then removed successfully, and the answer count of the location goes back to 0. Pass if all.
         """
         FACTORY_ID = "aaa"
         CLIENT_ID = "kkk"
@@ -60,6 +66,7 @@ class AnswerTest(BasicTest):
         answer_id = answer.id
         answer_operations.remove_answer(answer_id)
         assert answer not in db.session
+        assert location_operations.get_location_by_id(location1.id).answer_count == 0
 
     def test_get_answer_by_id(self):
         """
@@ -304,13 +311,51 @@ class AnswerTest(BasicTest):
         result = answer_operations.exam_gold_standard(A3.location_id, A3.land_usage, A3.expansion)
         assert(result==0)
 
+    def test_exam_gold_standards(self):
+        """
+        User admin create 1 gold standard to location l1.
+        Grade 3 answers together: a matching answer and a wrong answer to l1, and an answer to l2.
+        Pass if the results are 1, 2, and 0.
+        """
+        IS_GOLD_STANDARD = 0
+        user_admin = user_operations.create_user("ADMIN")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        answer_operations.create_answer(user_admin.id, l1.id, 2000, 2010, "", 0, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+
+        answers = [{"location_id": l1.id, "land_usage": 0, "expansion": 1},
+                {"location_id": l1.id, "land_usage": 1, "expansion": 1},
+                {"location_id": l2.id, "land_usage": 0, "expansion": 1}]
+        result = answer_operations.exam_gold_standards(answers)
+        assert(result==[1, 2, 0])
+
+    def test_get_good_answer_count(self):
+        """
+        Create 2 matching good answers, 1 different good answer, and 1 matching answer that failed the gold test.
+        Get the good answer count. Pass if the count is 2.
+        """
+        PASS_GOLD_TEST = 1
+        FAIL_GOLD_TEST = 2
+        user1 = user_operations.create_user("123")
+        l1 = location_operations.create_location("AAA")
+
+        answer_operations.create_answer(user1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST)
+        answer_operations.create_answer(user1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST)
+        answer_operations.create_answer(user1.id, l1.id, 2000, 2010, "", 1, 0, PASS_GOLD_TEST)
+        answer_operations.create_answer(user1.id, l1.id, 2000, 2010, "", 1, 1, FAIL_GOLD_TEST)
+
+        count = answer_operations.get_good_answer_count(l1.id, 1, 1)
+        assert(count == 2)
+
     def test_is_answer_reliable(self):
         """
         u1 failed the gold standard, but still submit answer a1 to location #l1.
         u2 passes the gold standard test, and submit the same result with u1. Fail if is_answer_reliable True.
         u3 passes the gold standard test, but have different answer with u1 or u2. Fail if is_answer_reliable true.
         u4 passes the gold standard test, and have the same result with u1 and u2. Fail if is_answer_reliable false.
+        (an answer is reliable when it matches one good answer, instead of CONSENSUS_MATCH_COUNT in the config)
         """
+        consensus_policy.init_consensus_policy("k_matching", match_count=1)
         PASS_GOLD_TEST = 1
         FAIL_GOLD_TEST = 2
         user1 = user_operations.create_user("123")
@@ -378,7 +423,9 @@ class AnswerTest(BasicTest):
         User u5 submits an answer without source root.
         Pass if location done_at correct after each user's answer submit, and individual_done_count correct, 
         and u5's answer sends assertion.
+        (a location is done when a good answer matches one good answer, instead of CONSENSUS_MATCH_COUNT in the config)
         """
+        consensus_policy.init_consensus_policy("k_matching", match_count=1)
         IS_GOLD_STANDARD = 0
         user1 = user_operations.create_user("123")
         user2 = user_operations.create_user("456")
@@ -588,5 +635,135 @@ class AnswerTest(BasicTest):
         with self.assertRaises(Exception) as context:        
             result = answer_operations.batch_process_answers(user4.id, user4_answers)
 
+    def test_batch_process_answers_multiple_gold_standards(self):
+        """
+        Locations #l1 and #l2 have gold standards, and #l3 does not.
+        User u1 answers #l1 correctly but #l2 wrongly, and user u2 answers both correctly.
+        Pass if u1 fails the gold standard test and u2 passes it when all the gold answers are required.
+        Pass if u1 passes the gold standard test by the first gold answer otherwise (the default).
+        """
+        IS_GOLD_STANDARD = 0
+        user_admin = user_operations.create_user("ADMIN")
+        user1 = user_operations.create_user("123")
+        user2 = user_operations.create_user("456")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        answer_operations.create_answer(user_admin.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(user_admin.id, l2.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+
+        user1_answers = self.create_frontend_answers([l1.id, l3.id]) + self.create_frontend_answers([l2.id], 0, 0)
+        gold_test_pass_status, non_gold_answer_id_list = answer_operations.grade_answers(user1.id, user1_answers)
+        assert gold_test_pass_status == 1
+        assert non_gold_answer_id_list == [1]
+        gold_test_pass_status, non_gold_answer_id_list = answer_operations.grade_answers(user1.id, user1_answers,
+                all_gold_required=True)
+        assert gold_test_pass_status == 2
+        assert non_gold_answer_id_list == [1]
+        assert answer_operations.batch_process_answers(user1.id, user1_answers, all_gold_required=True) == False
+
+        user2_answers = self.create_frontend_answers([l1.id, l2.id, l3.id])
+        assert answer_operations.batch_process_answers(user2.id, user2_answers, all_gold_required=True) == True
+        assert user_operations.get_user_by_id(user1.id).gold_pass_count == 0
+        assert user_operations.get_user_by_id(user2.id).gold_pass_count == 1
+
+    def test_create_answers(self):
+        """
+        Create 2 answers of u1 together, and try to create gold answers together.
+        Pass if both answers are created with the status, and if creating gold answers raises an exception.
+        """
+        PASS_GOLD_TEST = 1
+        IS_GOLD_STANDARD = 0
+        user1 = user_operations.create_user("kkk")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        answers = [{"location_id": location.id, "year_old": 2000, "year_new": 2010, "source_url_root": "",
+            "land_usage": 1, "expansion": 1, "bbox_left_top_lat": 0, "bbox_left_top_lng": 0,
+            "bbox_bottom_right_lat": 0, "bbox_bottom_right_lng": 0, "zoom_level": 0} for location in [l1, l2]]
+
+        answer_operations.create_answers(user1.id, answers, PASS_GOLD_TEST)
+        db.session.commit()
+        answers_by_user = answer_operations.get_answers_by_user(user1.id)
+        assert sorted([answer.location_id for answer in answers_by_user]) == [l1.id, l2.id]
+        assert all([answer.gold_standard_status == PASS_GOLD_TEST for answer in answers_by_user])
+        assert user_operations.get_user_done_location_count(user1.id) == 2
+
+        with self.assertRaises(Exception):
+            answer_operations.create_answers(user1.id, answers, IS_GOLD_STANDARD)
+
+    def test_get_good_answer_counts(self):
+        """
+        Users u1, u2, u3 pass the gold standard test and answer (1, 1) to l1, and u1 answers (0, 0) to l2.
+        User u4 fails the gold standard test and answers (0, 0) to l2.
+        Count the good answers matching (1, 1) and (0, 1) to l1, and (0, 0) to l2.
+        Pass if the counts are 3, 0, and 1.
+        """
+        PASS_GOLD_TEST = 1
+        FAIL_GOLD_TEST = 2
+        users = [user_operations.create_user(client_id) for client_id in ["u1", "u2", "u3", "u4"]]
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        for user in users[0:3]:
+            answer_operations.create_answer(user.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(users[0].id, l2.id, 2000, 2010, "", 0, 0, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(users[3].id, l2.id, 2000, 2010, "", 0, 0, FAIL_GOLD_TEST, 0, 0, 0, 0, 0)
+
+        answers = [{"location_id": l1.id, "land_usage": 1, "expansion": 1},
+                {"location_id": l1.id, "land_usage": 0, "expansion": 1},
+                {"location_id": l2.id, "land_usage": 0, "expansion": 0}]
+        good_answer_counts = answer_operations.get_good_answer_counts(answers)
+        assert(good_answer_counts == {(l1.id, 1, 1): 3, (l1.id, 0, 1): 0, (l2.id, 0, 0): 1})
+
+    def test_batch_process_answers_rollback(self):
+        """
+        Submit a gold answer and 2 answers of u1, where the last answer misses year_old.
+        Pass if an exception is raised and nothing is written (no answers and no gold test record).
+        """
+        IS_GOLD_STANDARD = 0
+        user1 = user_operations.create_user("kkk")
+        user2 = user_operations.create_user("jjj")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        answer_operations.create_answer(user2.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        answers = [{"location_id": location.id, "year_old": 2000, "year_new": 2010, "source_url_root": "",
+            "land_usage": 1, "expansion": 1, "bbox_left_top_lat": 0, "bbox_left_top_lng": 0,
+            "bbox_bottom_right_lat": 0, "bbox_bottom_right_lng": 0, "zoom_level": 0} for location in [l1, l2, l3]]
+        del answers[2]["year_old"]
+
+        with self.assertRaises(Exception):
+            answer_operations.batch_process_answers(user1.id, answers)
+
+        assert answer_operations.get_answer_count(user1.id) == 0
+        assert user_operations.get_user_by_id(user1.id).gold_test_count == 0
+        assert location_operations.get_location_by_id(l2.id).answer_count == 0
+
+    def test_batch_process_answers_duplicate_location(self):
+        """
+        Loc#l1 has a gold standard, and users u1 and u2 passed the gold standard test and answered (1, 1) to Loc#l2.
+        User u3 passes the gold standard test and submits (1, 1) to Loc#l2 twice.
+        Pass if an exception is raised, nothing of u3 is written, and Loc#l2 is not done
+            (the repeated answer would make the tally reach the consensus).
+        """
+        IS_GOLD_STANDARD = 0
+        PASS_GOLD_TEST = 1
+        admin = user_operations.create_user("admin")
+        users = [user_operations.create_user(client_id) for client_id in ["u1", "u2", "u3"]]
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        answer_operations.create_answer(admin.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        for user in users[0:2]:
+            answer_operations.create_answer(user.id, l2.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answers = [{"location_id": location.id, "year_old": 2000, "year_new": 2010, "source_url_root": "",
+            "land_usage": 1, "expansion": 1, "bbox_left_top_lat": 0, "bbox_left_top_lng": 0,
+            "bbox_bottom_right_lat": 0, "bbox_bottom_right_lng": 0, "zoom_level": 0} for location in [l1, l2, l2]]
+
+        with self.assertRaises(Exception):
+            answer_operations.batch_process_answers(users[2].id, answers)
+
+        assert answer_operations.get_answer_count(users[2].id) == 0
+        assert answer_operations.get_good_answer_count(l2.id, 1, 1) == 2
+        assert location_operations.get_location_by_id(l2.id).done_at is None
+
 if __name__ == "__main__":
     unittest.main()
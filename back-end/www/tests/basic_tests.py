@@ -5,6 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from controllers import root
 from models.model import db
+from models.model_operations.gold_standard_cache import invalidate_gold_answers
 from flask import Flask
 from flask_testing import TestCase
 
@@ -14,13 +15,19 @@ class BasicTest(TestCase):
     def create_app(self):
         app = Flask(__name__)
         app.register_blueprint(root.bp)
-        app.config.from_object("config.config.TestingConfig")
+        app.config.from_object("config.config.config")
         db.init_app(app)
 
         # Pass in test configuration
         return app
 
+    def create_frontend_answers(self, location_id_list, land_usage=1, expansion=1):
+        """Create the answers to the locations in the format of the front-end."""
+        return [{"location_id": location_id, "year_old": 2000, "year_new": 2010, "source_url_root": "",
+            "land_usage": land_usage, "expansion": expansion} for location_id in location_id_list]
+
     def tearDown(self):
+        invalidate_gold_answers()
         db.session.remove()
         db.drop_all()
         db.session.close()
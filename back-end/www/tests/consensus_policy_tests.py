@@ -0,0 +1,112 @@
+from basic_tests import BasicTest
+from models.model_operations import consensus_policy
+from models.model_operations import answer_operations
+from models.model_operations import location_operations
+from models.model_operations import user_operations
+from models.model import db
+import unittest
+
+PASS_GOLD_TEST = 1
+FAIL_GOLD_TEST = 2
+
+
+class ConsensusPolicyTest(BasicTest):
+    """Test case for consensus policies."""
+
+    def setUp(self):
+        db.create_all()
+
+    def tearDown(self):
+        consensus_policy.init_consensus_policy()
+        super().tearDown()
+
+    def create_good_answers(self, user, location, answer_list):
+        """Create the good answers of a user to a location, in the (land_usage, expansion) format."""
+        for land_usage, expansion in answer_list:
+            answer_operations.create_answer(user.id, location.id, 2000, 2010, "", land_usage, expansion,
+                    PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+
+    def test_get_consensus_location_ids(self):
+        """
+        Create 3 good answers (1, 1) to Loc#1, 3 good answers (1, 1) and 2 good answers (2, 2) to Loc#2,
+        and 2 good answers (1, 1) to Loc#3.
+        Pass if "k_matching" with match_count 2 selects Loc#1 and Loc#2,
+        and "majority" with min_ratio 0.75 only selects Loc#1.
+        Pass if "trust_weighted" with match_count 2 selects Loc#1 only after the user passes more gold standard tests.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        self.create_good_answers(u1, l1, [(1, 1)] * 3)
+        self.create_good_answers(u1, l2, [(1, 1)] * 3 + [(2, 2)] * 2)
+        self.create_good_answers(u1, l3, [(1, 1)] * 2)
+
+        consensus_policy.init_consensus_policy("k_matching", match_count=2)
+        assert consensus_policy.get_consensus_location_ids() == set([l1.id, l2.id])
+        assert consensus_policy.get_consensus_location_ids([l2.id, l3.id]) == set([l2.id])
+
+        consensus_policy.init_consensus_policy("majority", match_count=2, min_ratio=0.75)
+        assert consensus_policy.get_consensus_location_ids() == set([l1.id])
+
+        # The weight of each answer is (0 + 1) / (0 + 2) without gold standard tests, and (8 + 1) / (8 + 2) after 8 passes
+        consensus_policy.init_consensus_policy("trust_weighted", match_count=2, min_ratio=0.75)
+        assert consensus_policy.get_consensus_location_ids() == set()
+        for i in range(8):
+            user_operations.record_gold_test_result(u1.id, True)
+        assert consensus_policy.get_consensus_location_ids() == set([l1.id])
+
+        with self.assertRaises(Exception):
+            consensus_policy.init_consensus_policy("unknown")
+
+    def test_is_consensus_reached(self):
+        """
+        Evaluate the support of the good answers to a location in memory, as in test_get_consensus_location_ids.
+        Pass if [3] and [3, 2] reach consensus by "k_matching" with match_count 2,
+        only [3] reaches consensus by "majority" with min_ratio 0.75,
+        and [1.8] reaches consensus by "trust_weighted" with match_count 2 only when the weight reaches 2.
+        """
+        consensus_policy.init_consensus_policy("k_matching", match_count=2)
+        assert consensus_policy.is_consensus_reached([3]) == True
+        assert consensus_policy.is_consensus_reached([3, 2]) == True
+        assert consensus_policy.is_consensus_reached([2]) == False
+        assert consensus_policy.is_consensus_reached([]) == False
+
+        consensus_policy.init_consensus_policy("majority", match_count=2, min_ratio=0.75)
+        assert consensus_policy.is_consensus_reached([3]) == True
+        assert consensus_policy.is_consensus_reached([3, 2]) == False
+
+        consensus_policy.init_consensus_policy("trust_weighted", match_count=2, min_ratio=0.75)
+        assert consensus_policy.is_consensus_reached([1.8]) == False
+        assert consensus_policy.is_consensus_reached([2.0]) == True
+
+    def test_batch_process_answers_by_policy(self):
+        """
+        Create 2 good answers (1, 1) and 1 good answer (2, 2) to Loc#1 and Loc#2, and a gold standard on Loc#3.
+        Submit the answers (1, 1) to Loc#1, Loc#2 and Loc#3 with "majority" and match_count 2.
+        Pass if the submission does not mark the locations done with min_ratio 0.8, but does with min_ratio 0.75.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        for location in [l1, l2]:
+            self.create_good_answers(u1, location, [(1, 1), (1, 1), (2, 2)])
+        answer_operations.create_answer(u1.id, l3.id, 2000, 2010, "", 1, 1, 0, 0, 0, 0, 0, 0)
+        answers = [{"location_id": location.id, "year_old": 2000, "year_new": 2010, "source_url_root": "",
+            "land_usage": 1, "expansion": 1} for location in [l1, l2, l3]]
+
+        consensus_policy.init_consensus_policy("majority", match_count=2, min_ratio=0.8)
+        assert answer_operations.batch_process_answers(u2.id, answers[0:1] + answers[2:3]) == True
+        assert location_operations.get_location_is_done_count() == 0
+
+        consensus_policy.init_consensus_policy("majority", match_count=2, min_ratio=0.75)
+        assert answer_operations.batch_process_answers(u2.id, answers[1:3]) == True
+        db.session.expire_all()
+        assert l1.done_at is None
+        assert l2.done_at is not None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+from basic_tests import BasicTest
+from models.model_operations import done_bitmap
+from models.model_operations import location_operations
+from models.model import db
+import unittest
+import tempfile
+import os
+
+
+class DoneBitmapTest(BasicTest):
+    """Test case for the done bitmap."""
+
+    def setUp(self):
+        db.create_all()
+        self.path = os.path.join(tempfile.mkdtemp(), "done_bitmap")
+        done_bitmap.init_done_bitmap(self.path)
+
+    def tearDown(self):
+        done_bitmap.close_done_bitmap()
+        os.remove(self.path)
+        super().tearDown()
+
+    def test_set_location_done(self):
+        """
+        Create 2 locations, set Loc#1 done, then set Loc#2 done and not done.
+        Pass if the bitmap shows only Loc#1 is done, and the file has the same content.
+        """
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        assert done_bitmap.is_location_done_by_bitmap(l1.id) == False
+
+        location_operations.set_location_done(l1.id, True)
+        location_operations.set_location_done(l2.id, True)
+        location_operations.set_location_done(l2.id, False)
+        assert done_bitmap.is_location_done_by_bitmap(l1.id) == True
+        assert done_bitmap.is_location_done_by_bitmap(l2.id) == False
+        assert done_bitmap.is_location_done_by_bitmap(100000000) == False
+
+        with open(self.path, "rb") as f:
+            content = f.read()
+        assert content[l1.id] == 1 and content[l2.id] == 0
+
+    def test_rebuild_done_bitmap(self):
+        """
+        Create 3 locations and set Loc#1 and Loc#3 done in the database only, and mark Loc#2 done in the bitmap only.
+        Rebuild the bitmap. Pass if it shows Loc#1 and Loc#3 are done, and Loc#2 is not.
+        """
+        l1, l2, l3 = [location_operations.create_location(factory_id) for factory_id in ["AAA", "BBB", "CCC"]]
+        done_bitmap.set_done_bitmap(l2.id, True)
+        for location in [l1, l3]:
+            location.done_at = db.func.now()
+        db.session.commit()
+
+        assert done_bitmap.rebuild_done_bitmap(self.path) == 2
+        assert done_bitmap.is_location_done_by_bitmap(l1.id) == True
+        assert done_bitmap.is_location_done_by_bitmap(l2.id) == False
+        assert done_bitmap.is_location_done_by_bitmap(l3.id) == True
+
+
+if __name__ == "__main__":
+    unittest.main()
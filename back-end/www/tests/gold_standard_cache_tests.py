@@ -0,0 +1,122 @@
+from basic_tests import BasicTest
+from models.model_operations import gold_standard_cache
+from models.model_operations import location_operations
+from models.model_operations import answer_operations
+from models.model_operations import user_operations
+from models.model_operations import cache_generation_operations
+from models.model import db
+import unittest
+
+
+class GoldStandardCacheTest(BasicTest):
+    """Test case for the gold standard cache."""
+
+    def setUp(self):
+        db.create_all()
+
+    def create_gold_answers(self, answer_classes):
+        """Create a gold answer for a new location for each (land_usage, expansion) in the list."""
+        u1 = user_operations.create_user("111")
+        location_id_list = []
+        for idx, (land_usage, expansion) in enumerate(answer_classes):
+            location = location_operations.create_location("LOC{}".format(idx))
+            answer_operations.create_answer(u1.id, location.id, 2000, 2010, "", land_usage, expansion, 0)
+            location_id_list.append(location.id)
+        return location_id_list
+
+    def test_get_gold_location_index(self):
+        """
+        Create gold answers for 3 locations in 2 classes, and a non-gold answer.
+        Pass if the index groups the 3 locations by class, and the gold answer of each location can be gotten.
+        Add another gold answer. Pass if the index is reloaded.
+        """
+        l1, l2, l3 = self.create_gold_answers([(0, 1), (0, 1), (1, 1)])
+        u2 = user_operations.create_user("222")
+        answer_operations.create_answer(u2.id, l1, 2000, 2010, "", 2, 2, 1)
+
+        class_index = gold_standard_cache.get_gold_location_index()
+        assert set(class_index.keys()) == set([(0, 1), (1, 1)])
+        assert sorted(class_index[(0, 1)]) == sorted([l1, l2])
+        assert class_index[(1, 1)] == [l3]
+        assert gold_standard_cache.get_gold_answer_class(l1) == (0, 1)
+        assert gold_standard_cache.get_gold_answer_class(l3) == (1, 1)
+        assert gold_standard_cache.get_gold_answer_class(l3 + 1) is None
+
+        l4 = location_operations.create_location("DDD")
+        answer_operations.create_answer(u2.id, l4.id, 2000, 2010, "", 2, 0, 0)
+        class_index = gold_standard_cache.get_gold_location_index()
+        assert class_index[(2, 0)] == [l4.id]
+
+    def test_get_gold_answer_classes(self):
+        """
+        Create gold answers for 2 locations, and a location without gold answers.
+        Pass if the classes of only the 2 gold standard locations are returned.
+        """
+        l1, l2 = self.create_gold_answers([(0, 1), (1, 1)])
+        l3 = location_operations.create_location("CCC")
+
+        gold_answer_classes = gold_standard_cache.get_gold_answer_classes([l1, l2, l3.id])
+        assert gold_answer_classes == {l1: (0, 1), l2: (1, 1)}
+
+    def test_update_cached_gold_answer(self):
+        """
+        Load the cache with 1 gold answer, then add a gold answer and change the class of the first one.
+        Pass if the cache is updated in place (without reloading) and the generation is increased each time.
+        Remove a gold answer. Pass if the cache is reloaded without it.
+        """
+        l1, l2 = self.create_gold_answers([(0, 1), (1, 2)])
+        gold_answer = answer_operations.get_gold_answer_by_location(l1)
+        class_index = gold_standard_cache.get_gold_location_index()
+        generation = gold_standard_cache.gold_cache_state["generation"]
+
+        u2 = user_operations.create_user("222")
+        l3 = location_operations.create_location("CCC")
+        answer_operations.create_answer(u2.id, l3.id, 2000, 2010, "", 0, 1, 0)
+        answer_operations.set_answer(gold_answer.id, 0, 2, 2)
+        assert gold_standard_cache.get_gold_location_index() is class_index
+        assert gold_standard_cache.gold_cache_state["generation"] == generation + 2
+        assert class_index[(0, 1)] == [l3.id]
+        assert class_index[(2, 2)] == [l1]
+        assert answer_operations.get_gold_answer_count() == 3
+
+        answer_operations.remove_answer(gold_answer.id)
+        assert gold_standard_cache.get_gold_answer_class(l1) is None
+        assert answer_operations.get_gold_answer_count() == 2
+
+    def test_reload_by_generation(self):
+        """
+        Load the cache, then change a gold answer in the database and increase the generation (like another process).
+        Pass if the cache is reloaded only after the generation is checked.
+        """
+        l1, = self.create_gold_answers([(0, 1)])
+        assert gold_standard_cache.get_gold_answer_class(l1) == (0, 1)
+
+        gold_answer = answer_operations.get_gold_answer_by_location(l1)
+        gold_answer.land_usage = 2
+        cache_generation_operations.bump_cache_generation(gold_standard_cache.GENERATION_NAME)
+        db.session.commit()
+        assert gold_standard_cache.get_gold_answer_class(l1) == (0, 1)
+
+        gold_standard_cache.gold_cache_state["checked_at"] -= gold_standard_cache.GENERATION_CHECK_SECONDS + 1
+        assert gold_standard_cache.get_gold_answer_class(l1) == (2, 1)
+
+    def test_sample_gold_location_ids(self):
+        """
+        Create gold answers for 6 locations (4 in one class, 1 in each of 2 other classes).
+        Sample 3 locations. Pass if they come from 3 different classes.
+        Sample 10 locations. Pass if all 6 locations are sampled without duplicates.
+        """
+        location_id_list = self.create_gold_answers([(0, 0), (0, 0), (0, 0), (0, 0), (1, 0), (2, 1)])
+
+        for i in range(10):
+            sampled_location_id_list = gold_standard_cache.sample_gold_location_ids(3)
+            assert len(sampled_location_id_list) == 3
+            assert location_id_list[4] in sampled_location_id_list
+            assert location_id_list[5] in sampled_location_id_list
+
+        sampled_location_id_list = gold_standard_cache.sample_gold_location_ids(10)
+        assert sorted(sampled_location_id_list) == sorted(location_id_list)
+
+
+if __name__ == "__main__":
+    unittest.main()
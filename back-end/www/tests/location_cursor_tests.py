@@ -0,0 +1,155 @@
+from basic_tests import BasicTest
+from models.model_operations import location_cursor_operations
+from models.model_operations import location_operations
+from models.model_operations import answer_operations
+from models.model_operations import user_operations
+from models.model_operations import location_lease_operations
+from models.model import db
+import unittest
+
+IS_GOLD_STANDARD = 0
+
+
+class LocationCursorTest(BasicTest):
+    """Test case for location cursors."""
+
+    def setUp(self):
+        db.create_all()
+
+    def create_locations(self, user_id, gold_count, wait_count):
+        """Create gold standard locations and locations that are not labeled yet."""
+        gold_location_id_list = []
+        for i in range(gold_count):
+            location = location_operations.create_location("G{}".format(i))
+            answer_operations.create_answer(user_id, location.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+            gold_location_id_list.append(location.id)
+        wait_location_id_list = [location_operations.create_location("W{}".format(i)).id for i in range(wait_count)]
+        return gold_location_id_list, wait_location_id_list
+
+    def test_create_location_cursor(self):
+        """
+        Create a cursor of at most 10 locations when 7 locations are not labeled yet.
+        Pass if the cursor has the 7 locations, which are leased to u1.
+        Pass if another cursor of u2 cannot be created.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        gold_location_id_list, wait_location_id_list = self.create_locations(u1.id, 2, 7)
+
+        cursor = location_cursor_operations.create_location_cursor(u1.id, 10, 4, 1)
+        assert sorted(cursor.location_ids) == wait_location_id_list
+        assert cursor.position == 0
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        assert sorted([lease.location_id for lease in leases]) == wait_location_id_list
+
+        with self.assertRaises(Exception):
+            location_cursor_operations.create_location_cursor(u2.id, 10, 4, 1)
+
+        with self.assertRaises(Exception):
+            location_cursor_operations.create_location_cursor(u1.id, 10, 4, 4)
+
+    def test_get_location_cursor_page(self):
+        """
+        Page through a cursor of 7 locations with 3 locations that are not labeled yet and 1 gold standard per page.
+        Pass if the pages have 3, 3, and 1 of the locations in order, each with a gold standard.
+        Pass if the cursor is removed after the last page.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        gold_location_id_list, wait_location_id_list = self.create_locations(u1.id, 2, 7)
+        cursor = location_cursor_operations.create_location_cursor(u1.id, 10, 4, 1)
+        cursor_id = cursor.id
+        cursor_location_id_list = list(cursor.location_ids)
+
+        with self.assertRaises(Exception):
+            location_cursor_operations.get_location_cursor_page(cursor_id, u2.id)
+
+        returned_location_id_list = []
+        for expected_size, expected_remaining in [(3, 4), (3, 1), (1, 0)]:
+            location_list, remaining = location_cursor_operations.get_location_cursor_page(cursor_id, u1.id)
+            assert remaining == expected_remaining
+            gold_list = [location for location in location_list if location.id in gold_location_id_list]
+            wait_list = [location for location in location_list if location.id not in gold_location_id_list]
+            assert len(gold_list) == 1
+            assert len(wait_list) == expected_size
+            returned_location_id_list += sorted([location.id for location in wait_list])
+
+        assert sorted(returned_location_id_list) == sorted(cursor_location_id_list)
+        with self.assertRaises(Exception):
+            location_cursor_operations.get_location_cursor_page(cursor_id, u1.id)
+
+    def test_location_cursor_overlap(self):
+        """
+        Create 2 cursors of 3 locations for u1 when 7 locations are not labeled yet, and get locations for u1.
+        Pass if the cursors do not overlap, and only the location that is not in the cursors is returned.
+        """
+        u1 = user_operations.create_user("111")
+        gold_location_id_list, wait_location_id_list = self.create_locations(u1.id, 1, 7)
+
+        c1_location_id_list = list(location_cursor_operations.create_location_cursor(u1.id, 3, 2, 1).location_ids)
+        c2_location_id_list = list(location_cursor_operations.create_location_cursor(u1.id, 3, 2, 1).location_ids)
+        assert len(c1_location_id_list) == 3
+        assert len(c2_location_id_list) == 3
+        assert len(set(c1_location_id_list) & set(c2_location_id_list)) == 0
+
+        locations = location_operations.get_locations(u1.id, 2, 1)
+        location_id_set = set([location.id for location in locations]) - set(gold_location_id_list)
+        assert location_id_set == set(wait_location_id_list) - set(c1_location_id_list) - set(c2_location_id_list)
+
+    def test_get_location_cursor_page_answered(self):
+        """
+        Create a cursor of 4 locations, and let u1 answer one of the locations in the first page before getting it.
+        Pass if the answered location is not returned in the first page.
+        """
+        u1 = user_operations.create_user("111")
+        gold_location_id_list, wait_location_id_list = self.create_locations(u1.id, 1, 4)
+        cursor = location_cursor_operations.create_location_cursor(u1.id, 4, 3, 1)
+        cursor_id = cursor.id
+        answered_location_id = cursor.location_ids[0]
+        answer_operations.create_answer(u1.id, answered_location_id, 2000, 2010, "", 1, 1, 1, 0, 0, 0, 0, 0)
+
+        location_list, remaining = location_cursor_operations.get_location_cursor_page(cursor_id, u1.id)
+        assert remaining == 2
+        location_id_list = [location.id for location in location_list]
+        assert answered_location_id not in location_id_list
+        assert len(location_id_list) == 2
+
+    def test_get_location_cursor_page_expired(self):
+        """
+        Create an expired cursor.
+        Pass if the page cannot be retrieved, and if the cursor is removed when the user creates another one.
+        """
+        u1 = user_operations.create_user("111")
+        self.create_locations(u1.id, 1, 3)
+        cursor = location_cursor_operations.create_location_cursor(u1.id, 3, 2, 1, cursor_seconds=-1)
+        cursor_id = cursor.id
+
+        with self.assertRaises(Exception):
+            location_cursor_operations.get_location_cursor_page(cursor_id, u1.id)
+
+        location_cursor_operations.create_location_cursor(u1.id, 3, 2, 1)
+        with self.assertRaises(Exception):
+            location_cursor_operations.close_location_cursor(cursor_id, u1.id)
+
+    def test_close_location_cursor(self):
+        """
+        Create a cursor of 4 locations, get the first page, and close the cursor.
+        Pass if only the leases of the 2 locations that are not returned are released.
+        """
+        u1 = user_operations.create_user("111")
+        self.create_locations(u1.id, 1, 4)
+        cursor = location_cursor_operations.create_location_cursor(u1.id, 4, 3, 1)
+        cursor_id = cursor.id
+
+        location_list, remaining = location_cursor_operations.get_location_cursor_page(cursor_id, u1.id)
+        assert remaining == 2
+        location_cursor_operations.close_location_cursor(cursor_id, u1.id)
+
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        assert len(leases) == 2
+        with self.assertRaises(Exception):
+            location_cursor_operations.get_location_cursor_page(cursor_id, u1.id)
+
+
+if __name__ == "__main__":
+    unittest.main()
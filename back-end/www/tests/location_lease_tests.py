@@ -0,0 +1,94 @@
+from basic_tests import BasicTest
+from models.model_operations import location_lease_operations
+from models.model_operations import location_operations
+from models.model_operations import user_operations
+from models.model import db
+from models.model import Location
+import unittest
+
+
+class LocationLeaseTest(BasicTest):
+    """Test case for location leases."""
+
+    def setUp(self):
+        db.create_all()
+
+    def test_claim_location_leases(self):
+        """
+        Claim 2 locations for u1 and claim 1 expired lease for u2.
+        Pass if u1 has 2 active leases and u2 has none.
+        Claim the first location (leased to u1) and the expired location for u2.
+        Pass if only the expired lease is overwritten.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+
+        location_lease_operations.claim_location_leases(u1.id, [l1.id, l2.id], 600)
+        location_lease_operations.claim_location_leases(u2.id, [l3.id], -1)
+        db.session.commit()
+
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        assert len(leases) == 2
+        assert set([lease.location_id for lease in leases]) == set([l1.id, l2.id])
+        assert len(location_lease_operations.get_active_location_leases(u2.id)) == 0
+
+        leased_location_id_list = location_lease_operations.claim_location_leases(u2.id, [l1.id, l3.id], 600)
+        db.session.commit()
+        assert leased_location_id_list == [l3.id]
+
+        leases = location_lease_operations.get_active_location_leases(u2.id)
+        assert len(leases) == 1
+        assert leases[0].location_id == l3.id
+        assert len(location_lease_operations.get_active_location_leases()) == 3
+
+    def test_claim_location_leases_by_query(self):
+        """
+        Lease Loc#1 to u1, and lease Loc#2 to u1 with an expired lease.
+        Claim the locations of a query that selects Loc#1, Loc#2, and Loc#3 for u2.
+        Pass if Loc#2 and Loc#3 are returned and leased to u2, and Loc#1 is still leased to u1.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1, l2, l3, l4 = [location_operations.create_location(factory_id)
+                for factory_id in ["AAA", "BBB", "CCC", "DDD"]]
+        location_lease_operations.claim_location_leases(u1.id, [l1.id], 600)
+        location_lease_operations.claim_location_leases(u1.id, [l2.id], -1)
+        db.session.commit()
+
+        location_query = Location.query.filter(Location.id.in_([l1.id, l2.id, l3.id]))
+        location_list = location_lease_operations.claim_location_leases_by_query(u2.id, location_query, 600)
+        db.session.commit()
+        assert len(location_list) == 2
+        assert set(location_list) == set([l2, l3])
+
+        leases = location_lease_operations.get_active_location_leases(u2.id)
+        assert set([lease.location_id for lease in leases]) == set([l2.id, l3.id])
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        assert [lease.location_id for lease in leases] == [l1.id]
+
+    def test_release_location_leases(self):
+        """
+        Claim 2 locations for u1, and release one of them by u1 and the other by u2.
+        Pass if only the lease released by u1 is removed.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+
+        location_lease_operations.claim_location_leases(u1.id, [l1.id, l2.id], 600)
+        db.session.commit()
+
+        location_lease_operations.release_location_leases(u1.id, [l1.id])
+        location_lease_operations.release_location_leases(u2.id, [l2.id])
+
+        leases = location_lease_operations.get_active_location_leases()
+        assert len(leases) == 1
+        assert leases[0].location_id == l2.id
+
+
+if __name__ == "__main__":
+    unittest.main()
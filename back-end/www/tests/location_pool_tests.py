@@ -0,0 +1,116 @@
+from basic_tests import BasicTest
+from models.model_operations import location_pool
+from models.model_operations import location_operations
+from models.model_operations import answer_operations
+from models.model_operations import user_operations
+from models.model_operations import location_lease_operations
+from models.model import db
+from sqlalchemy import text
+import unittest
+
+
+class LocationPoolTest(BasicTest):
+    """Test case for the location pool."""
+
+    def setUp(self):
+        db.create_all()
+        location_pool.init_location_pool(self.app, pool_size=10, low_water_mark=0, refill_in_background=False)
+
+    def tearDown(self):
+        location_pool.stop_location_pool()
+        super().tearDown()
+
+    def test_pop_pool_locations(self):
+        """
+        Create 6 locations. Loc#1 is answered by u1, Loc#2 has a gold answer, Loc#3 is done.
+        Pop 10 locations for u1. Pass if Loc#4, Loc#5, and Loc#6 are popped, and Loc#1 stays in the pool.
+        Pop 1 location for u2. Pass if Loc#1 is popped.
+        """
+        IS_GOLD_STANDARD = 0
+        PASS_GOLD_TEST = 1
+
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1, l2, l3, l4, l5, l6 = [location_operations.create_location(factory_id)
+                for factory_id in ["AAA", "BBB", "CCC", "DDD", "EEE", "FFF"]]
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(u1.id, l2.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        location_operations.set_location_done(l3.id, True)
+
+        location_id_list = location_pool.pop_pool_locations(u1.id, 10)
+        assert sorted(location_id_list) == sorted([l4.id, l5.id, l6.id])
+        assert location_pool.get_location_pool_size() == 1
+
+        location_id_list = location_pool.pop_pool_locations(u2.id, 1)
+        assert location_id_list == [l1.id]
+        assert location_pool.get_location_pool_size() == 0
+
+    def test_add_seen_locations(self):
+        """
+        Create 3 locations and an answer to Loc#2 by u1, and load the cached locations answered by u1.
+        Add Loc#3, Loc#1, and Loc#2 again. Pass if the cache has the 3 locations in order without duplicates.
+        """
+        u1 = user_operations.create_user("111")
+        l1, l2, l3 = [location_operations.create_location(factory_id) for factory_id in ["AAA", "BBB", "CCC"]]
+        answer_operations.create_answer(u1.id, l2.id, 2000, 2010, "", 1, 1, 1, 0, 0, 0, 0, 0)
+        location_pool.ensure_location_pool_started()
+
+        seen_location_ids = location_pool.get_seen_location_ids(u1.id)
+        assert list(seen_location_ids) == [l2.id]
+        assert location_pool.has_location_id(seen_location_ids, l2.id)
+        assert not location_pool.has_location_id(seen_location_ids, l1.id)
+
+        location_pool.add_seen_locations(u1.id, [l3.id, l1.id, l2.id])
+        seen_location_ids = location_pool.get_seen_location_ids(u1.id)
+        assert list(seen_location_ids) == [l1.id, l2.id, l3.id]
+        assert location_pool.has_location_id(seen_location_ids, l3.id)
+
+    def test_get_locations_with_pool(self):
+        """
+        Create 1 gold location and 3 locations waiting to be labeled.
+        Get 3 locations with the pool for u1. Pass if they are leased, and the pool has 1 location left.
+        Get 3 locations with the pool for u2. Pass if an exception raises (only 1 location is not leased).
+        """
+        IS_GOLD_STANDARD = 0
+
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        for factory_id in ["BBB", "CCC", "DDD"]:
+            location_operations.create_location(factory_id)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+
+        locations = location_operations.get_locations(u1.id, 3, 1, use_pool=True)
+        assert len(locations) == 3
+        assert l1 in locations
+        assert location_pool.get_location_pool_size() == 1
+
+        with self.assertRaises(Exception) as context:
+            locations = location_operations.get_locations(u2.id, 3, 1, use_pool=True)
+
+    def test_get_locations_with_stale_pool(self):
+        """
+        Create 1 gold location and 3 locations waiting to be labeled, load them into the pool,
+        and then mark Loc#2 done without updating the pool.
+        Get 3 batches of 2 locations with the pool for u1, which pops all the locations in the pool.
+        Pass if 2 batches are returned, and only Loc#3 and Loc#4 are leased to u1 (the stale Loc#2 is not).
+        """
+        IS_GOLD_STANDARD = 0
+
+        u1 = user_operations.create_user("111")
+        l1, l2, l3, l4 = [location_operations.create_location(factory_id) for factory_id in ["AAA", "BBB", "CCC", "DDD"]]
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        location_pool.ensure_location_pool_started()
+        location_pool.refill_location_pool()
+        assert location_pool.get_location_pool_size() == 3
+        db.session.execute(text("UPDATE location SET done_at = now() WHERE id = :id"), {"id": l2.id})
+        db.session.commit()
+
+        location_batches = location_operations.get_location_batches(u1.id, 2, 1, 3, use_pool=True)
+        assert len(location_batches) == 2
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        assert sorted([lease.location_id for lease in leases]) == sorted([l3.id, l4.id])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+from basic_tests import BasicTest
+from models.model_operations import location_tally_operations
+from models.model_operations import location_operations
+from models.model_operations import answer_operations
+from models.model_operations import user_operations
+from models.model import db
+from models.model import LocationTally
+import unittest
+
+IS_GOLD_STANDARD = 0
+PASS_GOLD_TEST = 1
+FAIL_GOLD_TEST = 2
+
+
+class LocationTallyTest(BasicTest):
+    """Test case for location tallies."""
+
+    def setUp(self):
+        db.create_all()
+
+    def test_update_location_tallies(self):
+        """
+        Add 2 good answers (1, 1) and 1 good answer (0, 1) to Loc#1, then add 1 more (1, 1) and remove the (0, 1).
+        Pass if the returned counts are 2 and 1, then 3 and 0, and they can be looked up.
+        """
+        l1 = location_operations.create_location("AAA")
+
+        counts = location_tally_operations.update_location_tallies({(l1.id, 1, 1): 2, (l1.id, 0, 1): 1})
+        assert counts == {(l1.id, 1, 1): 2, (l1.id, 0, 1): 1}
+        counts = location_tally_operations.update_location_tallies({(l1.id, 1, 1): 1, (l1.id, 0, 1): -1})
+        assert counts == {(l1.id, 1, 1): 3, (l1.id, 0, 1): 0}
+        db.session.commit()
+
+        counts = location_tally_operations.get_location_tallies([(l1.id, 1, 1), (l1.id, 0, 1), (l1.id, 2, 2)])
+        assert counts == {(l1.id, 1, 1): 3, (l1.id, 0, 1): 0, (l1.id, 2, 2): 0}
+        tallies = location_tally_operations.get_tallies_by_location(l1.id)
+        assert [(tally.land_usage, tally.expansion) for tally in tallies] == [(1, 1)]
+
+    def test_answer_operations_update_tallies(self):
+        """
+        Create a gold answer, 2 good answers, and a failed answer to Loc#1.
+        Pass if only the 2 good answers are counted.
+        Change a good answer to (0, 0), then remove it. Pass if it is moved to the (0, 0) tally and then removed.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        A1 = answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, FAIL_GOLD_TEST, 0, 0, 0, 0, 0)
+        assert answer_operations.get_good_answer_count(l1.id, 1, 1) == 2
+
+        answer_operations.set_answer(A1.id, PASS_GOLD_TEST, 0, 0)
+        assert answer_operations.get_good_answer_count(l1.id, 1, 1) == 1
+        assert answer_operations.get_good_answer_count(l1.id, 0, 0) == 1
+
+        answer_operations.remove_answer(A1.id)
+        assert answer_operations.get_good_answer_count(l1.id, 0, 0) == 0
+
+    def test_rebuild_location_tallies(self):
+        """
+        Create 2 good answers to Loc#1 and 1 to Loc#2, then break the tallies.
+        Pass if rebuilding restores the 2 tallies.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(u1.id, l2.id, 2000, 2010, "", 2, 0, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        location_tally_operations.update_location_tallies({(l1.id, 1, 1): 5, (l2.id, 0, 0): 1})
+        db.session.commit()
+
+        assert location_tally_operations.rebuild_location_tallies() == 2
+        assert LocationTally.query.count() == 2
+        counts = location_tally_operations.get_location_tallies([(l1.id, 1, 1), (l2.id, 2, 0), (l2.id, 0, 0)])
+        assert counts == {(l1.id, 1, 1): 2, (l2.id, 2, 0): 1, (l2.id, 0, 0): 0}
+        db.session.expire_all()
+        assert l1.consensus_count == 2
+        assert l2.consensus_count == 1
+
+    def test_update_location_consensus_counts(self):
+        """
+        Add 2 good answers (1, 1) and 1 good answer (0, 1) to Loc#1, then remove one (1, 1).
+        Pass if the consensus count of Loc#1 follows the largest tally (2, then 1), and Loc#2 stays 0.
+        """
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        assert l1.consensus_count == 0
+
+        location_tally_operations.update_location_tallies({(l1.id, 1, 1): 2, (l1.id, 0, 1): 1})
+        db.session.commit()
+        assert l1.consensus_count == 2
+        assert l2.consensus_count == 0
+
+        location_tally_operations.update_location_tallies({(l1.id, 1, 1): -1})
+        db.session.commit()
+        assert l1.consensus_count == 1
+
+    def test_answer_operations_update_consensus_counts(self):
+        """
+        Create 2 good answers (1, 1) to Loc#1, change one to (0, 0), then remove both.
+        Pass if the consensus count of Loc#1 is 2, then 1, then 0.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        A1 = answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        A2 = answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        db.session.expire_all()
+        assert l1.consensus_count == 2
+
+        answer_operations.set_answer(A1.id, PASS_GOLD_TEST, 0, 0)
+        db.session.expire_all()
+        assert l1.consensus_count == 1
+
+        answer_operations.remove_answer(A1.id)
+        answer_operations.remove_answer(A2.id)
+        db.session.expire_all()
+        assert l1.consensus_count == 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,8 +2,12 @@ from basic_tests import BasicTest
 from models.model_operations import location_operations
 from models.model_operations import answer_operations
 from models.model_operations import user_operations
+from models.model_operations import location_lease_operations
+from models.model_operations import location_tally_operations
 from models.model import db
+from models.model import Location
 import unittest
+import random
 
 
 class LocationTest(BasicTest):
@@ -36,6 +40,24 @@ class LocationTest(BasicTest):
         location_operations.remove_location(location_id)
         assert location not in db.session
 
+    def test_remove_location_after_get_locations(self):
+        """
+        Create 1 gold location and 1 location waiting to be labeled, and get 2 locations for u1 (which leases Loc#2).
+        Remove Loc#2. Pass if it is removed together with its lease.
+        """
+        IS_GOLD_STANDARD = 0
+
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        location_operations.get_locations(u1.id, 2, 1)
+        assert len(location_lease_operations.get_active_location_leases(u1.id)) == 1
+
+        location_operations.remove_location(l2.id)
+        assert location_operations.get_location_by_id(l2.id) is None
+        assert len(location_lease_operations.get_active_location_leases(u1.id)) == 0
+
     def test_get_location_by_id(self):
         """
         Create a location, get its returned id.
@@ -86,6 +108,7 @@ class LocationTest(BasicTest):
             And only 1 of the 2 locations which have gold answers are gotten.
         Test not enough gold standards. Pass if assert raises.
         Test not enough location. Pass if assert raises.
+        Test a user that does not exist. Pass if assert raises.
         """
         IS_GOLD_STANDARD = 0
         PASS_GOLD_TEST = 1
@@ -148,6 +171,382 @@ class LocationTest(BasicTest):
         with self.assertRaises(Exception) as context:
           locations = location_operations.get_locations(u2.id, 7, 3)
 
+        # Check if exception raises : the user does not exist.
+        with self.assertRaises(Exception) as context:
+          locations = location_operations.get_locations(u2.id + 100, 5, 1)
+
+    def test_get_location_batches(self):
+        """
+        Create 2 gold locations and 7 locations waiting to be labeled.
+        Get 2 batches of 3 locations for u1. Pass if the batches have different locations,
+            each has 1 gold standard, and the 4 waiting locations in them are leased to u1.
+        Get 2 batches of 3 locations for u2. Pass if only 1 batch is returned (only 3 waiting locations are left),
+            and the waiting location that does not fill the second batch is not leased.
+        """
+        IS_GOLD_STANDARD = 0
+
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        gold_locations = [location_operations.create_location(factory_id) for factory_id in ["G1", "G2"]]
+        for location in gold_locations:
+            answer_operations.create_answer(u1.id, location.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        for factory_id in ["AAA", "BBB", "CCC", "DDD", "EEE", "FFF", "GGG"]:
+            location_operations.create_location(factory_id)
+        gold_location_id_set = set([location.id for location in gold_locations])
+
+        location_batches = location_operations.get_location_batches(u1.id, 3, 1, 2, reserve_lease_seconds=60)
+        assert len(location_batches) == 2
+        batch_id_sets = [set([location.id for location in batch]) for batch in location_batches]
+        assert len(batch_id_sets[0] & batch_id_sets[1]) == 0
+        assert all(len(batch_id_set & gold_location_id_set) == 1 for batch_id_set in batch_id_sets)
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        assert set([lease.location_id for lease in leases]) == (batch_id_sets[0] | batch_id_sets[1]) - gold_location_id_set
+
+        location_batches = location_operations.get_location_batches(u2.id, 3, 1, 2)
+        assert len(location_batches) == 1
+        leases = location_lease_operations.get_active_location_leases(u2.id)
+        assert set([lease.location_id for lease in leases]) == set([location.id for location in location_batches[0]]) - gold_location_id_set
+
+    def test_get_location_batches_lease_expiry(self):
+        """
+        Create 1 gold location and 4 locations waiting to be labeled.
+        Get 2 batches of 3 locations for u1 with a reserve lease shorter than the lease of the current batch.
+        Pass if the leases of the reserved batch do not expire before the leases of the current batch,
+            and if the configured reserve lease is not shorter than the configured lease.
+        """
+        IS_GOLD_STANDARD = 0
+
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        for factory_id in ["BBB", "CCC", "DDD", "EEE"]:
+            location_operations.create_location(factory_id)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+
+        location_batches = location_operations.get_location_batches(u1.id, 3, 1, 2,
+                lease_seconds=600, reserve_lease_seconds=300)
+        assert len(location_batches) == 2
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        current_leases = [lease for lease in leases if not lease.reserved]
+        reserved_leases = [lease for lease in leases if lease.reserved]
+        assert len(current_leases) == 2 and len(reserved_leases) == 2
+        assert min([lease.expires_at for lease in reserved_leases]) >= max([lease.expires_at for lease in current_leases])
+
+        assert self.app.config["LOCATION_RESERVE_LEASE_SECONDS"] >= self.app.config["LOCATION_LEASE_SECONDS"]
+
+    def test_get_location_batches_twice(self):
+        """
+        Create 2 gold locations and 24 locations waiting to be labeled.
+        For each scheduler, get 2 batches of 3 locations for a new user twice (without submitting the answers).
+        Pass if the batches of the second request do not overlap with each other,
+            and do not include the waiting locations of the batch reserved by the first request.
+        """
+        IS_GOLD_STANDARD = 0
+
+        u1 = user_operations.create_user("111")
+        gold_locations = [location_operations.create_location(factory_id) for factory_id in ["G1", "G2"]]
+        for location in gold_locations:
+            answer_operations.create_answer(u1.id, location.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        for i in range(24):
+            location_operations.create_location("L%d" % i)
+        gold_location_id_set = set([location.id for location in gold_locations])
+
+        for i, scheduler in enumerate(["uniform", "consensus", "deficit"]):
+            user = user_operations.create_user("user_%d" % i)
+            first_batches = location_operations.get_location_batches(user.id, 3, 1, 2, scheduler=scheduler)
+            second_batches = location_operations.get_location_batches(user.id, 3, 1, 2, scheduler=scheduler)
+            assert len(first_batches) == 2 and len(second_batches) == 2
+            reserved_id_set = set([location.id for location in first_batches[1]]) - gold_location_id_set
+            second_id_sets = [set([location.id for location in batch]) - gold_location_id_set for batch in second_batches]
+            assert len(second_id_sets[0] & second_id_sets[1]) == 0
+            assert len((second_id_sets[0] | second_id_sets[1]) & reserved_id_set) == 0
+
+    def test_get_locations_with_leases(self):
+        """
+        Create 1 gold location and 4 locations waiting to be labeled.
+        Get 3 locations for u1, and then get 3 locations for u2.
+            Pass if u2 cannot get enough locations because 2 of them are leased to u1.
+        Get 5 locations for u1. Pass if u1 still gets the 2 leased locations.
+        Expire the leases and get 3 locations for u2. Pass if u2 gets them.
+        Submit the answers of u2. Pass if the leases of u2 are released.
+        """
+        IS_GOLD_STANDARD = 0
+
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        for factory_id in ["BBB", "CCC", "DDD", "EEE"]:
+            location_operations.create_location(factory_id)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+
+        locations = location_operations.get_locations(u1.id, 3, 1)
+        leased_id_set = set([location.id for location in locations if location.id != l1.id])
+        assert len(leased_id_set) == 2
+
+        with self.assertRaises(Exception) as context:
+            locations = location_operations.get_locations(u2.id, 4, 1)
+
+        locations = location_operations.get_locations(u1.id, 5, 1)
+        assert len(locations) == 5
+
+        assert leased_id_set.issubset(set([location.id for location in locations]))
+
+        leases = location_lease_operations.get_active_location_leases(u1.id)
+        location_lease_operations.claim_location_leases(u1.id, [lease.location_id for lease in leases], -1)
+        db.session.commit()
+        locations = location_operations.get_locations(u2.id, 5, 1)
+        assert len(locations) == 5
+        assert len(location_lease_operations.get_active_location_leases(u2.id)) == 4
+
+        answers = [{"location_id": location.id, "year_new": 2010, "year_old": 2000, "zoom_level": 0,
+            "bbox_left_top_lat": 0, "bbox_left_top_lng": 0, "bbox_bottom_right_lat": 0, "bbox_bottom_right_lng": 0,
+            "land_usage": 1, "expansion": 1, "source_url_root": ""} for location in locations]
+        answer_operations.batch_process_answers(u2.id, answers)
+        assert len(location_lease_operations.get_active_location_leases(u2.id)) == 0
+
+    def test_set_locations_done(self):
+        """
+        Create 3 locations, mark Loc#1 done, then mark Loc#1 and Loc#2 done together.
+        Pass if only Loc#2 is newly marked done, and Loc#3 is not done.
+        """
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        location_operations.set_location_done(l1.id, True)
+
+        done_location_id_list = location_operations.set_locations_done([l1.id, l2.id])
+        assert done_location_id_list == [l2.id]
+        db.session.expire_all()
+        assert l1.done_at is not None
+        assert l2.done_at is not None
+        assert l3.done_at is None
+
+    def test_set_reliable_locations_done(self):
+        """
+        Create 3 locations with 3 good answers (1, 1) each, and mark Loc#3 done.
+        Pass if only Loc#1 is marked done by the answers (1, 1) to Loc#1 and Loc#3 and (2, 2) to Loc#2,
+        and Loc#1 is not marked done again.
+        """
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        location_tally_operations.update_location_tallies({(l.id, 1, 1): 3 for l in [l1, l2, l3]})
+        location_operations.set_location_done(l3.id, True)
+
+        answer_key_list = [(l1.id, 1, 1), (l2.id, 2, 2), (l3.id, 1, 1)]
+        assert location_operations.set_reliable_locations_done(answer_key_list, 3) == [l1.id]
+        assert location_operations.set_reliable_locations_done(answer_key_list, 3) == []
+        db.session.expire_all()
+        assert l1.done_at is not None
+        assert l2.done_at is None
+
+    def test_increment_location_answer_count(self):
+        """
+        Create 2 locations, increment the answer count of both, then increment Loc#1 again.
+        Pass if the counts are 2 and 1.
+        """
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        assert l1.answer_count == 0
+
+        location_operations.increment_location_answer_count([l1.id, l2.id])
+        location_operations.increment_location_answer_count([l1.id])
+        db.session.expire_all()
+        assert l1.answer_count == 2
+        assert l2.answer_count == 1
+
+    def test_sample_locations_by_scheduler(self):
+        """
+        Create 4 locations with consensus counts 0, 2, 1, 2, and answer counts 3, 0, 1, 2.
+        Sample 4 locations with the consensus scheduler. Pass if all locations are gotten.
+        Sample 4 locations with the deficit scheduler. Pass if all locations are gotten.
+        Sample 4 locations with the uniform scheduler. Pass if all locations are gotten.
+        Sample with an unknown scheduler. Pass if assert raises.
+        """
+        locations = [location_operations.create_location(factory_id) for factory_id in ["AAA", "BBB", "CCC", "DDD"]]
+        for location, consensus_count in zip(locations, [0, 2, 1, 2]):
+            location_tally_operations.update_location_tallies({(location.id, 1, 1): consensus_count})
+        db.session.commit()
+        for location, answer_count in zip(locations, [3, 0, 1, 2]):
+            for i in range(answer_count):
+                location_operations.increment_location_answer_count([location.id])
+
+        sampled_locations = location_operations.sample_locations_by_scheduler(Location.query, 4, "consensus")
+        assert len(sampled_locations) == 4
+        assert set(sampled_locations) == set(locations)
+
+        sampled_locations = location_operations.sample_locations_by_scheduler(Location.query, 4, "deficit")
+        assert len(sampled_locations) == 4
+        assert set(sampled_locations) == set(locations)
+
+        sampled_locations = location_operations.sample_locations_by_scheduler(Location.query, 4, "uniform")
+        assert set(sampled_locations) == set(locations)
+
+        with self.assertRaises(Exception) as context:
+            location_operations.sample_locations_by_scheduler(Location.query, 4, "xxx")
+
+    def test_draw_scheduler_tiers(self):
+        """
+        Draw 10000 tiers with the deficit scheduler from 10 locations with 0 answers and 10 locations with 3 answers.
+        Pass if the share of tier 0 is close to 1 / (1 + 0.7 ** 3), and nothing is drawn without locations.
+        Draw 10000 tiers with the consensus scheduler from 90 locations with consensus count 0 and 10 with 2.
+        Pass if the share of tier 2 is close to 160 / (90 + 160).
+        """
+        rng = random.Random(0)
+        tier_list = location_operations.draw_scheduler_tiers("deficit", {0: 10, 3: 10, 5: 0}, 10000, rng=rng)
+        assert len(tier_list) == 10000
+        assert set(tier_list) == set([0, 3])
+        assert abs(tier_list.count(0) / 10000 - 1 / (1 + 0.7 ** 3)) < 0.02
+        assert location_operations.draw_scheduler_tiers("deficit", {}, 5) == []
+
+        tier_list = location_operations.draw_scheduler_tiers("consensus", {0: 90, 2: 10}, 10000, rng=rng)
+        assert abs(tier_list.count(2) / 10000 - 160 / 250) < 0.02
+
+        with self.assertRaises(Exception) as context:
+            location_operations.draw_scheduler_tiers("uniform", {0: 1}, 1)
+
+    def test_sample_locations_by_deficit_distribution(self):
+        """
+        Create 10 locations with 0 answers and 10 locations with 3 answers.
+        Sample 1 location with the deficit scheduler for 300 times.
+        Pass if the share of the locations without answers is close to 1 / (1 + 0.7 ** 3) (not always 1),
+            and the locations with 3 answers are still sampled.
+        """
+        locations = [location_operations.create_location(str(i)) for i in range(20)]
+        for location in locations[10:]:
+            location.answer_count = 3
+        db.session.commit()
+        location_operations.scheduler_tier_state.clear()
+
+        answer_count_list = []
+        for i in range(300):
+            sampled_locations = location_operations.sample_locations_by_scheduler(Location.query, 1, "deficit")
+            assert len(sampled_locations) == 1
+            answer_count_list.append(sampled_locations[0].answer_count)
+        share = answer_count_list.count(0) / 300
+        assert share > 0.65 and share < 0.85
+        assert answer_count_list.count(3) > 0
+
+    def test_sample_locations_by_consensus_distribution(self):
+        """
+        Create 12 locations without good answers and 4 locations with 2 matching good answers.
+        Sample 1 location with the consensus scheduler for 300 times.
+        Pass if the share of the locations with 2 good answers is close to 64 / (12 + 64) (not always 1),
+            and the locations without good answers are still sampled.
+        """
+        locations = [location_operations.create_location(str(i)) for i in range(16)]
+        for location in locations[12:]:
+            location_tally_operations.update_location_tallies({(location.id, 1, 1): 2})
+        db.session.commit()
+        location_operations.scheduler_tier_state.clear()
+
+        consensus_count_list = []
+        for i in range(300):
+            sampled_locations = location_operations.sample_locations_by_scheduler(Location.query, 1, "consensus")
+            assert len(sampled_locations) == 1
+            consensus_count_list.append(sampled_locations[0].consensus_count)
+        share = consensus_count_list.count(2) / 300
+        assert share > 0.74 and share < 0.94
+        assert consensus_count_list.count(0) > 0
+
+    def test_get_wait_test_location_query(self):
+        """
+        Create 4 locations. Loc#1 has a gold answer, Loc#2 is answered by u1, Loc#3 is done.
+        Get the waiting locations for u1 and u2. Pass if u1 only gets Loc#4, and u2 gets Loc#2 and Loc#4.
+        """
+        IS_GOLD_STANDARD = 0
+        PASS_GOLD_TEST = 1
+
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        l4 = location_operations.create_location("DDD")
+
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        answer_operations.create_answer(u1.id, l2.id, 2000, 2010, "", 1, 1, PASS_GOLD_TEST, 0, 0, 0, 0, 0)
+        location_operations.set_location_done(l3.id, True)
+
+        locations = location_operations.get_wait_test_location_query(u1.id).all()
+        assert locations == [l4]
+
+        locations = location_operations.get_wait_test_location_query(u2.id).all()
+        assert len(locations) == 2
+        assert l2 in locations and l4 in locations
+
+    def test_sample_locations_by_random_key(self):
+        """
+        Create 4 locations.
+        Sample 4 locations for 10 times. Pass if all locations are gotten every time (the pivot wraps around).
+        Sample 1 location and re-roll it for 200 times. Pass if every location is gotten at least once.
+        """
+        locations = [location_operations.create_location(factory_id) for factory_id in ["AAA", "BBB", "CCC", "DDD"]]
+        location_query = Location.query
+
+        for i in range(10):
+            sampled_locations = location_operations.sample_locations_by_random_key(location_query, 4)
+            assert len(sampled_locations) == 4
+            assert set(sampled_locations) == set(locations)
+
+        sampled_id_set = set()
+        for i in range(200):
+            sampled_locations = location_operations.sample_locations_by_random_key(location_query, 1)
+            assert len(sampled_locations) == 1
+            sampled_id_set.add(sampled_locations[0].id)
+            location_operations.reroll_location_random_keys([sampled_locations[0].id])
+        assert sampled_id_set == set([location.id for location in locations])
+
+    def test_sample_locations_by_random_key_spread(self):
+        """
+        Create 20 locations with evenly spaced random keys.
+        Sample 2 locations for 50 times. Pass if the 2 locations are not next to each other in the key order
+        at least once, and no location is sampled twice in one sample.
+        """
+        locations = [location_operations.create_location(str(i)) for i in range(20)]
+        for i, location in enumerate(locations):
+            location.random_key = i / 20
+        db.session.commit()
+
+        is_spread = False
+        for i in range(50):
+            sampled_locations = location_operations.sample_locations_by_random_key(Location.query, 2)
+            assert len(set(sampled_locations)) == 2
+            key_gap = abs(sampled_locations[0].random_key - sampled_locations[1].random_key)
+            if key_gap > 0.06 and key_gap < 0.94:
+                is_spread = True
+        assert is_spread
+
+    def test_seek_locations_by_pivots(self):
+        """
+        Create 4 locations with random keys 0.1, 0.3, 0.5, and 0.7.
+        Seek with pivots 0.6, 0.2, 0.25, and 0.9. Pass if only Loc#4 and Loc#2 are gotten.
+        """
+        locations = [location_operations.create_location(factory_id) for factory_id in ["AAA", "BBB", "CCC", "DDD"]]
+        for location, random_key in zip(locations, [0.1, 0.3, 0.5, 0.7]):
+            location.random_key = random_key
+        db.session.commit()
+
+        sought_locations = location_operations.seek_locations_by_pivots(Location.query, [0.6, 0.2, 0.25, 0.9])
+        assert len(sought_locations) == 2
+        assert set(sought_locations) == set([locations[3], locations[1]])
+        assert location_operations.seek_locations_by_pivots(Location.query, []) == []
+
+    def test_reroll_location_random_keys(self):
+        """
+        Create 2 locations and re-roll the random key of the first one.
+        Pass if only the key of the first location changes.
+        """
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        key1 = l1.random_key
+        key2 = l2.random_key
+
+        location_operations.reroll_location_random_keys([l1.id])
+        db.session.expire_all()
+
+        assert l1.random_key != key1
+        assert l2.random_key == key2
+
     def test_get_location_is_done_count(self):
         """
         Create 4 locations, mark 3 to be done.
@@ -0,0 +1,124 @@
+from basic_tests import BasicTest
+from models.model_operations import manifest_operations
+from models.model_operations import location_operations
+from models.model_operations import answer_operations
+from models.model_operations import user_operations
+from models.model import db
+from models.model import ManifestUse
+from util.util import encode_jwt
+from util.util import decode_jwt
+import time
+import datetime
+import unittest
+
+
+PRIVATE_KEY = "test_private_key"
+
+
+class ManifestTest(BasicTest):
+    """Test case for the manifests of the assigned locations."""
+
+    def setUp(self):
+        db.create_all()
+
+    def create_locations(self):
+        """Create an admin, a user, a gold standard location (answer 1, 2), and 2 locations without gold answers."""
+        admin = user_operations.create_user("admin")
+        user = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+        answer_operations.create_answer(admin.id, l1.id, 2000, 2010, "", 1, 2, 0)
+        return user, [l1, l2, l3]
+
+    def create_answer_json(self, location_id, land_usage, expansion):
+        return {"location_id": location_id, "year_new": 2017, "year_old": 2010, "source_url_root": "",
+                "bbox_left_top_lat": 0, "bbox_left_top_lng": 0, "bbox_bottom_right_lat": 0,
+                "bbox_bottom_right_lng": 0, "land_usage": land_usage, "expansion": expansion, "zoom_level": 0}
+
+    def test_exam_gold_standard_by_manifest(self):
+        """
+        Create a manifest for 2 of the 3 locations (including the gold standard).
+        Pass if the manifest grades the answers like exam_gold_standard,
+        and raises for the location that is not in the manifest or for another user.
+        """
+        user, (l1, l2, l3) = self.create_locations()
+        manifest = manifest_operations.create_location_manifest(user.id, [l1, l2], PRIVATE_KEY)
+        payload = manifest_operations.decode_location_manifest(manifest, user.id, PRIVATE_KEY)
+
+        assert manifest_operations.exam_gold_standard_by_manifest(payload, PRIVATE_KEY, l1.id, 1, 2) == 1
+        assert manifest_operations.exam_gold_standard_by_manifest(payload, PRIVATE_KEY, l1.id, 1, 1) == 2
+        assert manifest_operations.exam_gold_standard_by_manifest(payload, PRIVATE_KEY, l2.id, 1, 1) == 0
+
+        with self.assertRaises(Exception) as context:
+            manifest_operations.exam_gold_standard_by_manifest(payload, PRIVATE_KEY, l3.id, 1, 1)
+
+        with self.assertRaises(Exception) as context:
+            manifest_operations.decode_location_manifest(manifest, user.id + 1, PRIVATE_KEY)
+
+        with self.assertRaises(Exception) as context:
+            manifest_operations.decode_location_manifest(manifest, user.id, "another_key")
+
+    def test_batch_process_answers_with_manifest(self):
+        """
+        Submit answers with a manifest for the gold standard and Loc#2.
+        Pass if the user passes the test and the answers are created.
+        Submit an answer to Loc#3, which is not in the manifest. Pass if assert raises.
+        """
+        user, (l1, l2, l3) = self.create_locations()
+        manifest = manifest_operations.create_location_manifest(user.id, [l1, l2], PRIVATE_KEY)
+
+        answers = [self.create_answer_json(l1.id, 1, 2), self.create_answer_json(l2.id, 0, 1)]
+        assert answer_operations.batch_process_answers(user.id, answers, manifest=manifest, private_key=PRIVATE_KEY)
+        assert len(answer_operations.get_answers_by_user(user.id)) == 2
+
+        answers = [self.create_answer_json(l1.id, 1, 2), self.create_answer_json(l3.id, 0, 1)]
+        with self.assertRaises(Exception) as context:
+            answer_operations.batch_process_answers(user.id, answers, manifest=manifest, private_key=PRIVATE_KEY)
+
+    def test_manifest_token_type(self):
+        """
+        Create a manifest and a user token signed with the same key.
+        Pass if the manifest cannot be decoded as a user token, and the user token cannot be decoded as a manifest.
+        """
+        user, (l1, l2, l3) = self.create_locations()
+        manifest = manifest_operations.create_location_manifest(user.id, [l1, l2], PRIVATE_KEY)
+        user_token = encode_jwt({"user_id": user.id, "typ": "user", "exp": int(time.time()) + 60}, PRIVATE_KEY)
+        assert decode_jwt(user_token, PRIVATE_KEY)["user_id"] == user.id
+
+        with self.assertRaises(Exception) as context:
+            decode_jwt(manifest, PRIVATE_KEY)
+
+        with self.assertRaises(Exception) as context:
+            manifest_operations.decode_location_manifest(user_token, user.id, PRIVATE_KEY)
+
+    def test_batch_process_answers_with_used_manifest(self):
+        """
+        Submit answers with a manifest and an idempotency key, then submit them again with another key.
+        Pass if the second submission raises, and the answers are created once.
+        Claim the manifest again with the first key (a retry of a journaled submission). Pass if it returns False.
+        Expire the record. Pass if it is removed.
+        """
+        user, (l1, l2, l3) = self.create_locations()
+        manifest = manifest_operations.create_location_manifest(user.id, [l1, l2], PRIVATE_KEY)
+
+        answers = [self.create_answer_json(l1.id, 1, 2), self.create_answer_json(l2.id, 0, 1)]
+        assert answer_operations.batch_process_answers(user.id, answers, manifest=manifest, private_key=PRIVATE_KEY,
+                idempotency_key="key1")
+        with self.assertRaises(Exception) as context:
+            answer_operations.batch_process_answers(user.id, answers, manifest=manifest, private_key=PRIVATE_KEY,
+                    idempotency_key="key2")
+        assert len(answer_operations.get_answers_by_user(user.id)) == 2
+
+        assert not manifest_operations.claim_location_manifest(manifest, user.id, PRIVATE_KEY, idempotency_key="key1")
+        db.session.rollback()
+
+        assert manifest_operations.remove_expired_manifest_uses() == 0
+        manifest_use = ManifestUse.query.first()
+        manifest_use.expires_at = datetime.datetime(2000, 1, 1)
+        db.session.commit()
+        assert manifest_operations.remove_expired_manifest_uses() == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
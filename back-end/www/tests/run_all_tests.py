@@ -2,6 +2,20 @@ import unittest
 from user_tests import UserTest
 from location_tests import LocationTest
 from answer_tests import AnswerTest
+from location_lease_tests import LocationLeaseTest
+from location_pool_tests import LocationPoolTest
+from gold_standard_cache_tests import GoldStandardCacheTest
+from manifest_tests import ManifestTest
+from user_location_tests import UserLocationTest
+from done_bitmap_tests import DoneBitmapTest
+from location_cursor_tests import LocationCursorTest
+from location_tally_tests import LocationTallyTest
+from answer_journal_tests import AnswerJournalTest
+from answer_submission_tests import AnswerSubmissionTest
+from consensus_policy_tests import ConsensusPolicyTest
+from answer_arrays_tests import AnswerArraysTest
+from answer_aggregation_tests import AnswerAggregationTest
+from answer_anomaly_tests import AnswerAnomalyTest
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+from basic_tests import BasicTest
+from models.model_operations import user_location_operations
+from models.model_operations import location_operations
+from models.model_operations import answer_operations
+from models.model_operations import user_operations
+from models.model import db
+import unittest
+
+
+class UserLocationTest(BasicTest):
+    """Test case for the locations answered by users."""
+
+    def setUp(self):
+        db.create_all()
+
+    def test_add_user_locations(self):
+        """
+        Create 2 answers to Loc#1 and 1 answer to Loc#2 by u1, and 1 answer to Loc#3 by u2.
+        Pass if u1 has answered Loc#1 and Loc#2, and u2 has answered Loc#3.
+        """
+        u1 = user_operations.create_user("111")
+        u2 = user_operations.create_user("222")
+        l1 = location_operations.create_location("AAA")
+        l2 = location_operations.create_location("BBB")
+        l3 = location_operations.create_location("CCC")
+
+        answer_operations.create_answer(u1.id, l2.id, 2000, 2010, "", 1, 1, 1)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, 1)
+        answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 2, 1, 1)
+        answer_operations.create_answer(u2.id, l3.id, 2000, 2010, "", 1, 1, 1)
+
+        assert user_location_operations.get_user_location_ids(u1.id) == [l1.id, l2.id]
+        assert user_location_operations.get_user_location_ids(u2.id) == [l3.id]
+        assert user_location_operations.get_user_location_count(u1.id) == 2
+
+    def test_remove_user_location_if_unanswered(self):
+        """
+        Create 2 answers to Loc#1 by u1, and remove them one by one.
+        Pass if Loc#1 is still answered by u1 after removing the first one, and not after removing both.
+        """
+        u1 = user_operations.create_user("111")
+        l1 = location_operations.create_location("AAA")
+        a1 = answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 1, 1, 1)
+        a2 = answer_operations.create_answer(u1.id, l1.id, 2000, 2010, "", 2, 1, 1)
+
+        answer_operations.remove_answer(a1.id)
+        assert user_location_operations.get_user_location_ids(u1.id) == [l1.id]
+
+        answer_operations.remove_answer(a2.id)
+        assert user_location_operations.get_user_location_ids(u1.id) == []
+
+
+if __name__ == "__main__":
+    unittest.main()
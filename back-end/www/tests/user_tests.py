@@ -36,6 +36,36 @@ class UserTest(BasicTest):
         user_operations.remove_user(user.id)
         assert user not in db.session
 
+    def test_remove_user_after_get_locations(self):
+        """
+        Create 1 gold location and 1 location waiting to be labeled, and get 2 locations for u2 (which leases Loc#2).
+        Remove u2, who has no answers. Pass if the user is removed.
+        """
+        IS_GOLD_STANDARD = 0
+        user1 = user_operations.create_user("123")
+        user2 = user_operations.create_user("456")
+        l1 = location_operations.create_location("AAA")
+        location_operations.create_location("BBB")
+        answer_operations.create_answer(user1.id, l1.id, 2000, 2010, "", 1, 1, IS_GOLD_STANDARD, 0, 0, 0, 0, 0)
+        location_operations.get_locations(user2.id, 2, 1)
+
+        user_operations.remove_user(user2.id)
+        assert user_operations.get_user_by_id(user2.id) is None
+
+    def test_update_client_type_by_user_ids(self):
+        """
+        Create 2 normal users and an admin, then ban all of them in bulk.
+        Pass if only the 2 normal users are banned.
+        """
+        user1 = user_operations.create_user("123")
+        user2 = user_operations.create_user("456")
+        admin = user_operations.create_user("789")
+        user_operations.update_client_type_by_user_id(admin.id, 0)
+        count = user_operations.update_client_type_by_user_ids([user1.id, user2.id, admin.id], -1)
+        assert count == 2
+        db.session.expire_all()
+        assert [user.client_type for user in [user1, user2, admin]] == [-1, -1, 0]
+
     def test_get_all_users(self):
         client_id = "123"
         user1 = user_operations.create_user(client_id)
@@ -111,6 +141,45 @@ class UserTest(BasicTest):
         done_loc_count = user_operations.get_user_done_location_count(user1.id)
         assert(done_loc_count == 2)
 
+    def test_record_gold_test_result(self):
+        """
+        Record 2 passed and 1 failed gold standard tests for a user.
+        Pass if the user has 3 tests and 2 passes.
+        """
+        user = user_operations.create_user("123")
+        assert user.gold_test_count == 0
+
+        user_operations.record_gold_test_result(user.id, True)
+        user_operations.record_gold_test_result(user.id, False)
+        user_operations.record_gold_test_result(user.id, True)
+        db.session.expire_all()
+        assert user.gold_test_count == 3
+        assert user.gold_pass_count == 2
+
+    def test_get_adaptive_gold_standard_size(self):
+        """
+        Request 10 locations with 2 gold standards for a new user, a trusted user, a failing user, and a normal user.
+        Pass if the sizes are 5, 1, 5, and 2.
+        """
+        new_user = user_operations.create_user("111")
+        trusted_user = user_operations.create_user("222")
+        failing_user = user_operations.create_user("333")
+        normal_user = user_operations.create_user("444")
+        for user, test_count, pass_count in [(new_user, 2, 2), (trusted_user, 50, 50),
+                (failing_user, 20, 5), (normal_user, 20, 16)]:
+            user.gold_test_count = test_count
+            user.gold_pass_count = pass_count
+        db.session.commit()
+
+        assert user_operations.get_adaptive_gold_standard_size(new_user, 10, 2) == 5
+        assert user_operations.get_adaptive_gold_standard_size(trusted_user, 10, 2) == 1
+        assert user_operations.get_adaptive_gold_standard_size(failing_user, 10, 2) == 5
+        assert user_operations.get_adaptive_gold_standard_size(normal_user, 10, 2) == 2
+
+        # The gold standard size is at least 1 and at most the size
+        assert user_operations.get_adaptive_gold_standard_size(trusted_user, 10, 0) == 1
+        assert user_operations.get_adaptive_gold_standard_size(new_user, 2, 3) == 2
+
 
 if __name__ == "__main__":
     unittest.main()
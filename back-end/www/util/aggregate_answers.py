@@ -0,0 +1,78 @@
+"""
+The script aggregates all the answers with the Dawid-Skene EM method (see answer_aggregation.py),
+exports the estimated labels and confidence of each location to a CSV file,
+and optionally marks the confident locations done.
+
+$ FLASK_ENV=production python util/aggregate_answers.py
+
+It requires NumPy (see install_packages.sh).
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+MIN_CONFIDENCE : The minimum posterior probability of both labels to consider a location confident
+MIN_ANSWER_COUNT : The minimum number of answers to consider a location confident
+MARK_DONE : Mark the confident locations done (and rebuild the done bitmap if it is enabled)
+
+Output
+------
+The number of answered and confident locations, and the CSV file (aggregation_YYYY_MM_DD_HH_mm_ss.csv)
+with the location_id, land_usage, expansion, confidence, and answer_count of each answered location.
+
+"""
+CFG_NAME = "config.config.config"
+MIN_CONFIDENCE = 0.95
+MIN_ANSWER_COUNT = 2
+MARK_DONE = False
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import csv
+import time
+import datetime
+from models.model import db
+from models.model_operations.answer_arrays import load_answer_arrays
+from models.model_operations.answer_arrays import set_done_locations_in_bulk
+from models.model_operations.answer_aggregation import aggregate_answers
+from models.model_operations.answer_aggregation import get_confident_location_ids
+from models.model_operations.done_bitmap import rebuild_done_bitmap
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+start = time.perf_counter()
+aggregation = aggregate_answers(load_answer_arrays())
+elapsed = time.perf_counter() - start
+confident_location_ids = get_confident_location_ids(aggregation, min_confidence=MIN_CONFIDENCE,
+        min_answer_count=MIN_ANSWER_COUNT)
+print("Aggregated {} locations in {:.2f} seconds ({} and {} iterations)".format(len(aggregation["location_ids"]),
+    elapsed, aggregation["fields"]["land_usage"]["iterations"], aggregation["fields"]["expansion"]["iterations"]))
+print("{} locations have confidence >= {} with >= {} answers".format(len(confident_location_ids),
+    MIN_CONFIDENCE, MIN_ANSWER_COUNT))
+
+csv_file_name = "aggregation_" + datetime.datetime.today().strftime("%Y_%m_%d_%H_%M_%S") + ".csv"
+with open(csv_file_name, "w", newline="") as f:
+    writer = csv.writer(f)
+    writer.writerow(["location_id", "land_usage", "expansion", "confidence", "answer_count"])
+    for row in zip(aggregation["location_ids"].tolist(), aggregation["land_usage"].tolist(),
+            aggregation["expansion"].tolist(), aggregation["confidence"].round(6).tolist(),
+            aggregation["answer_counts"].tolist()):
+        writer.writerow(row)
+print("Exported the labels to " + csv_file_name)
+
+if MARK_DONE:
+    set_done_locations_in_bulk(confident_location_ids)
+    print("Marked the confident locations done")
+    # Update the done locations shared by the server processes
+    if app.config.get("DONE_BITMAP_PATH") is not None:
+        rebuild_done_bitmap(app.config["DONE_BITMAP_PATH"])
+
+db.session.remove()
+db.session.close()
@@ -0,0 +1,158 @@
+"""
+The script benchmarks the submission of answers with the batch_process_answers function.
+
+It fills the database with synthetic locations, gold standards, and good answers,
+so that some of the submitted answers mark their locations done,
+then submits batches of answers (with one gold standard each) from different users.
+
+WARNING: the script drops and re-creates all tables, so only run it against the testing database:
+$ FLASK_ENV=testing python util/benchmark_batch_process_answers.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+LOCATION_COUNT : The number of locations waiting to be labeled
+GOLD_COUNT : The number of gold standard locations
+REQUEST_COUNT : The number of submissions to average
+SIZE : The number of answers (including the gold standard) in each submission
+MODES : "direct" writes the answers before responding, and "journal" appends them to the answer journal
+    (in a temporary directory) and writes them with one flush at the end (see answer_journal.py)
+
+Output
+------
+The per-submission time (until the response), number of commits, and number of queries (including the flush)
+for each mode, and the time of the flush for the journal mode.
+
+"""
+CFG_NAME = "config.config.config"
+LOCATION_COUNT = 10000
+GOLD_COUNT = 50
+REQUEST_COUNT = 200
+SIZE = 10
+MODES = ["direct", "journal"]
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+import random
+import shutil
+import tempfile
+from sqlalchemy import event
+from sqlalchemy import text
+from models.model import db
+from models.model_operations import answer_operations
+from models.model_operations import answer_journal
+from models.model_operations.gold_standard_cache import invalidate_gold_answers
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+if not app.config["TESTING"]:
+    raise Exception("The benchmark drops all tables. Please run it with FLASK_ENV=testing.")
+
+# Count the commits and the queries
+stats = {"commits": 0, "queries": 0}
+
+
+@event.listens_for(db.engine, "commit")
+def count_commits(conn):
+    stats["commits"] += 1
+
+
+@event.listens_for(db.engine, "after_cursor_execute")
+def count_queries(conn, cursor, statement, parameters, context, executemany):
+    stats["queries"] += 1
+
+
+def fill_database():
+    """Re-create the tables, and give every waiting location 3 matching good answers (1, 1)."""
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    params = {"location_count": LOCATION_COUNT, "gold_count": GOLD_COUNT, "user_count": REQUEST_COUNT + 3}
+    db.session.execute(text("""
+        INSERT INTO "user" (client_id, client_type)
+        SELECT 'bench_' || g, 1 FROM generate_series(1, :user_count) g"""), params)
+    db.session.execute(text("""
+        INSERT INTO location (factory_id)
+        SELECT md5(g::text) FROM generate_series(1, :location_count + :gold_count) g"""), params)
+    db.session.execute(text("""
+        INSERT INTO answer (year_old, year_new, source_url_root, land_usage, expansion, gold_standard_status, user_id, location_id)
+        SELECT 2010, 2017, '', 1, 1, 0, 1, g FROM generate_series(1, :gold_count) g"""), params)
+    db.session.execute(text("""
+        INSERT INTO answer (year_old, year_new, source_url_root, land_usage, expansion, gold_standard_status, user_id, location_id)
+        SELECT 2010, 2017, '', 1, 1, 1, u, g
+        FROM generate_series(:gold_count + 1, :gold_count + :location_count) g, generate_series(1, 3) u"""), params)
+    db.session.execute(text("""
+        INSERT INTO location_tally (location_id, land_usage, expansion, good_answer_count)
+        SELECT location_id, land_usage, expansion, count(*) FROM answer
+        WHERE gold_standard_status = 1 GROUP BY location_id, land_usage, expansion"""))
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+    invalidate_gold_answers()
+
+
+def create_answers(location_id_list):
+    """Create the answers of a submission, where the first location is the gold standard."""
+    answers = []
+    for location_id in location_id_list:
+        # Half of the answers match the good answers and mark the locations done
+        land_usage = 1 if len(answers) == 0 or random.random() < 0.5 else 2
+        answers.append({"location_id": location_id, "year_old": 2010, "year_new": 2017,
+            "source_url_root": "", "land_usage": land_usage, "expansion": 1,
+            "bbox_left_top_lat": 0, "bbox_left_top_lng": 0, "bbox_bottom_right_lat": 0,
+            "bbox_bottom_right_lng": 0, "zoom_level": 0})
+    return answers
+
+
+def run_benchmark(mode):
+    """Submit the answers and return the time per submission (and the time of the flush for the journal mode)."""
+    fill_database()
+    wait_location_id_list = list(range(GOLD_COUNT + 1, GOLD_COUNT + LOCATION_COUNT + 1))
+    random.shuffle(wait_location_id_list)
+    if mode == "journal":
+        journal_dir = tempfile.mkdtemp()
+        answer_journal.init_answer_journal(app, journal_dir, flush_in_background=False)
+    stats["commits"] = 0
+    stats["queries"] = 0
+
+    elapsed = 0
+    for i in range(REQUEST_COUNT):
+        location_id_list = [random.randint(1, GOLD_COUNT)] + wait_location_id_list[i * (SIZE - 1):(i + 1) * (SIZE - 1)]
+        answers = create_answers(location_id_list)
+        user_id = i + 4
+        start = time.perf_counter()
+        if mode == "journal":
+            answer_journal.journal_answers(user_id, answers)
+        else:
+            answer_operations.batch_process_answers(user_id, answers)
+        elapsed += time.perf_counter() - start
+        db.session.remove()
+
+    flush_elapsed = 0
+    if mode == "journal":
+        start = time.perf_counter()
+        assert answer_journal.flush_answer_journal() == REQUEST_COUNT
+        flush_elapsed = time.perf_counter() - start
+        answer_journal.close_answer_journal()
+        shutil.rmtree(journal_dir)
+    return elapsed / REQUEST_COUNT * 1000, flush_elapsed * 1000
+
+
+print("{:>8} {:>8} {:>14} {:>14} {:>14} {:>10}".format("mode", "size", "ms/submission", "commits", "queries", "flush ms"))
+for mode in MODES:
+    ms, flush_ms = run_benchmark(mode)
+    print("{:>8} {:>8} {:>14.2f} {:>14.1f} {:>14.1f} {:>10.1f}".format(mode, SIZE, ms,
+        stats["commits"] / REQUEST_COUNT, stats["queries"] / REQUEST_COUNT, flush_ms))
+
+db.session.remove()
+db.drop_all()
+db.session.close()
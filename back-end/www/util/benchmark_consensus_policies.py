@@ -0,0 +1,165 @@
+"""
+The script replays historical answers through each consensus policy (see consensus_policy.py),
+and compares how many locations are marked done and how long the submissions take.
+
+The answers are read from a CSV file exported by util/export_answers.py, or synthesized if no file is given
+(each location has a true answer, and each user answers correctly and passes the gold standard test
+with a probability drawn for the user).
+The answers are grouped into submissions by the user, the timestamp, and the gold standard status,
+and the submissions are written in the order of the answer ids (see answer_operations.write_graded_answers).
+
+WARNING: the script drops and re-creates all tables, so only run it against the testing database:
+$ FLASK_ENV=testing python util/benchmark_consensus_policies.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+CSV_FILE : Path to the answers exported by util/export_answers.py (None means synthesizing the answers)
+LOCATION_COUNT : The number of locations for the synthesized answers
+USER_COUNT : The number of users for the synthesized answers
+SUBMISSION_COUNT : The number of submissions for the synthesized answers
+SIZE : The number of answers in each synthesized submission
+POLICIES : The (policy, match_count, min_ratio) to compare
+
+Output
+------
+For each policy, the number of locations marked done, the number of answers per done location,
+and the time to write 10k answers.
+
+"""
+CFG_NAME = "config.config.config"
+CSV_FILE = None
+LOCATION_COUNT = 2000
+USER_COUNT = 200
+SUBMISSION_COUNT = 2000
+SIZE = 5
+POLICIES = [("k_matching", 3, 0.75), ("k_matching", 2, 0.75), ("majority", 2, 0.75), ("trust_weighted", 2, 0.75)]
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import csv
+import time
+import random
+from sqlalchemy import text
+from models.model import db
+from models.model_operations.answer_operations import write_graded_answers
+from models.model_operations.consensus_policy import init_consensus_policy
+from models.model_operations.location_operations import get_location_is_done_count
+from models.model_operations.gold_standard_cache import invalidate_gold_answers
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+if not app.config["TESTING"]:
+    raise Exception("The benchmark drops all tables. Please run it with FLASK_ENV=testing.")
+
+
+def read_history(path):
+    """Read the gold answers and the submissions from a CSV file exported by util/export_answers.py."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f, delimiter=",", quotechar="|")
+        next(reader)
+        rows = sorted(reader, key=lambda row: int(row[4]))
+
+    gold_answers = []
+    submissions = []
+    last_key = None
+    for row in rows:
+        user_id, location_id = int(row[0]), int(row[2])
+        answer_key = (location_id, int(row[5]), int(row[6]))
+        status = int(row[7])
+        if status == 0:
+            gold_answers.append(answer_key)
+            continue
+        submission_key = (user_id, row[15], status)
+        if submission_key != last_key:
+            submissions.append((user_id, status, []))
+            last_key = submission_key
+        # Each location is answered once in a submission
+        if location_id not in [key[0] for key in submissions[-1][2]]:
+            submissions[-1][2].append(answer_key)
+    return gold_answers, submissions
+
+
+def synthesize_history():
+    """Synthesize the gold answers and the submissions."""
+    answer_classes = [(1, 1), (1, 2), (2, 1), (2, 2)]
+    true_answers = [random.choice(answer_classes) for i in range(LOCATION_COUNT + 1)]
+    accuracies = [random.uniform(0.5, 0.95) for i in range(USER_COUNT + 1)]
+    gold_answers = [(1, 1, 1)]
+
+    submissions = []
+    for i in range(SUBMISSION_COUNT):
+        user_id = random.randint(1, USER_COUNT)
+        accuracy = accuracies[user_id]
+        status = 1 if random.random() < accuracy else 2
+        answer_key_list = []
+        for location_id in random.sample(range(2, LOCATION_COUNT + 1), SIZE):
+            answer = true_answers[location_id] if random.random() < accuracy else random.choice(answer_classes)
+            answer_key_list.append((location_id, answer[0], answer[1]))
+        submissions.append((user_id, status, answer_key_list))
+    return gold_answers, submissions
+
+
+def fill_database(gold_answers, submissions):
+    """Re-create the tables with the users, the locations, and the gold answers."""
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    user_count = max([submission[0] for submission in submissions])
+    location_count = max([key[0] for key in gold_answers] + [key[0] for s in submissions for key in s[2]])
+    db.session.execute(text("""
+        INSERT INTO "user" (id, client_id, client_type)
+        SELECT g, 'bench_' || g, 1 FROM generate_series(1, :user_count) g"""), {"user_count": user_count})
+    db.session.execute(text("""
+        INSERT INTO location (id, factory_id)
+        SELECT g, md5(g::text) FROM generate_series(1, :location_count) g"""), {"location_count": location_count})
+    for location_id, land_usage, expansion in gold_answers:
+        db.session.execute(text("""
+            INSERT INTO answer (year_old, year_new, source_url_root, land_usage, expansion, gold_standard_status, user_id, location_id)
+            VALUES (2010, 2017, '', :land_usage, :expansion, 0, 1, :location_id)"""),
+            {"location_id": location_id, "land_usage": land_usage, "expansion": expansion})
+    db.session.commit()
+    invalidate_gold_answers()
+
+
+def replay(submissions):
+    """Write the submissions in order, and return the number of answers and the seconds."""
+    answer_count = 0
+    elapsed = 0
+    for user_id, status, answer_key_list in submissions:
+        answers = [{"location_id": location_id, "year_old": 2010, "year_new": 2017, "source_url_root": "",
+            "land_usage": land_usage, "expansion": expansion}
+            for location_id, land_usage, expansion in answer_key_list]
+        start = time.perf_counter()
+        write_graded_answers(user_id, answers, status, list(range(len(answers))))
+        db.session.commit()
+        elapsed += time.perf_counter() - start
+        answer_count += len(answers)
+    return answer_count, elapsed
+
+
+if CSV_FILE is None:
+    gold_answers, submissions = synthesize_history()
+else:
+    gold_answers, submissions = read_history(CSV_FILE)
+
+print("{:>16} {:>6} {:>6} {:>10} {:>14} {:>12}".format("policy", "k", "ratio", "done", "answers/done", "ms/10k"))
+for policy, match_count, min_ratio in POLICIES:
+    fill_database(gold_answers, submissions)
+    init_consensus_policy(policy, match_count=match_count, min_ratio=min_ratio)
+    answer_count, elapsed = replay(submissions)
+    done_count = get_location_is_done_count()
+    print("{:>16} {:>6} {:>6.2f} {:>10} {:>14.1f} {:>12.1f}".format(policy, match_count, min_ratio, done_count,
+        answer_count / max(done_count, 1), elapsed / answer_count * 10000 * 1000))
+
+db.session.remove()
+db.drop_all()
+db.session.close()
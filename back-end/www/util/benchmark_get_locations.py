@@ -0,0 +1,148 @@
+"""
+The script benchmarks the location selection of the get_locations function.
+
+It fills the database with synthetic users, locations, and answers at several scales,
+then compares the legacy selection (which loads id lists into Python and sorts the whole table randomly)
+with the current selection in location_operations.get_locations.
+One power user owns 10% of the answers, which is the worst case for the exclusion step.
+
+WARNING: the script drops and re-creates all tables, so only run it against the testing database:
+$ FLASK_ENV=testing python util/benchmark_get_locations.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+ANSWER_SCALES : The amount of answers to benchmark
+REQUEST_COUNT : The number of requests to average for each scale
+SIZE : The total number of locations requested in each call
+GOLD_STANDARD_SIZE : The number of gold standard locations requested in each call
+
+Output
+------
+The per-request time, number of queries, and rows transferred for each implementation and scale.
+
+"""
+CFG_NAME = "config.config.config"
+ANSWER_SCALES = [10000, 100000, 1000000]
+REQUEST_COUNT = 20
+SIZE = 5
+GOLD_STANDARD_SIZE = 1
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+import random
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import text
+from models.model import db
+from models.model import Location
+from models.model import Answer
+from models.model_operations import location_operations
+from models.model_operations import answer_operations
+from models.model_operations import user_operations
+from models.model_operations.gold_standard_cache import invalidate_gold_answers
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+if not app.config["TESTING"]:
+    raise Exception("The benchmark drops all tables. Please run it with FLASK_ENV=testing.")
+
+# Count the queries and the rows returned by the database
+stats = {"queries": 0, "rows": 0}
+
+
+@event.listens_for(db.engine, "after_cursor_execute")
+def count_rows(conn, cursor, statement, parameters, context, executemany):
+    stats["queries"] += 1
+    if statement.lstrip().upper().startswith("SELECT") and cursor.rowcount > 0:
+        stats["rows"] += cursor.rowcount
+
+
+def legacy_get_locations(user_id, size, gold_standard_size):
+    """The get_locations function before the set-based rewrite, kept for comparison."""
+    target_user = user_operations.get_user_by_id(user_id)
+    user_answers = answer_operations.get_answers_by_user(target_user.id)
+    user_answered_location_id_list = [answer.location_id for answer in user_answers]
+    gold_answers_filter = Answer.query.filter(Answer.gold_standard_status==0)
+    gold_location_id_list = [loc.location_id for loc in gold_answers_filter.distinct(Answer.location_id).all()]
+    ex_location_filter = Location.query.filter(or_(Location.id.in_(user_answered_location_id_list), Location.done_at != None))
+    ex_location_id_list = [loc.id for loc in ex_location_filter.all()]
+    gold_location_filter = Location.query.filter(Location.id.in_(gold_location_id_list))
+    exclude_location_id_list = gold_location_id_list + ex_location_id_list
+    wait_test_locations_filter = Location.query.filter(Location.id.not_in(exclude_location_id_list))
+    sel_gold_location_list = gold_location_filter.order_by(func.random()).all()[0:gold_standard_size]
+    sel_wait_test_locations_list = wait_test_locations_filter.order_by(func.random()).all()[0:(size - gold_standard_size)]
+    location_list = sel_wait_test_locations_list + sel_gold_location_list
+    random.shuffle(location_list)
+    return location_list
+
+
+def fill_database(answer_count):
+    """Re-create the tables and fill them with synthetic data by using generate_series."""
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    location_count = max(1000, answer_count // 10)
+    user_count = max(100, answer_count // 100)
+    gold_count = 50
+    params = {"answer_count": answer_count, "location_count": location_count,
+            "user_count": user_count, "gold_count": gold_count}
+    db.session.execute(text("""
+        INSERT INTO "user" (client_id, client_type)
+        SELECT 'bench_' || g, 1 FROM generate_series(1, :user_count) g"""), params)
+    # Mark 20% of the locations done
+    db.session.execute(text("""
+        INSERT INTO location (factory_id, done_at)
+        SELECT md5(g::text), CASE WHEN random() < 0.2 THEN now() END FROM generate_series(1, :location_count) g"""), params)
+    db.session.execute(text("""
+        INSERT INTO answer (year_old, year_new, source_url_root, land_usage, expansion, gold_standard_status, user_id, location_id)
+        SELECT 2010, 2017, '', 1, 1, 0, 1, g FROM generate_series(1, :gold_count) g"""), params)
+    # User 2 is the power user who owns 10% of the answers
+    db.session.execute(text("""
+        INSERT INTO answer (year_old, year_new, source_url_root, land_usage, expansion, gold_standard_status, user_id, location_id)
+        SELECT 2010, 2017, '', floor(random() * 3)::int, floor(random() * 3)::int, 1 + floor(random() * 2)::int,
+            CASE WHEN g % 10 = 0 THEN 2 ELSE 1 + (g % :user_count) END,
+            1 + floor(random() * :location_count)::int
+        FROM generate_series(1, :answer_count - :gold_count) g"""), params)
+    db.session.execute(text("""
+        INSERT INTO user_location (user_id, location_id) SELECT DISTINCT user_id, location_id FROM answer"""))
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+    invalidate_gold_answers()
+    return location_count
+
+
+def run_benchmark(get_locations_function, user_id):
+    """Call the function several times and return the average time, queries, and rows per request."""
+    stats["queries"] = 0
+    stats["rows"] = 0
+    start = time.perf_counter()
+    for i in range(REQUEST_COUNT):
+        locations = get_locations_function(user_id, SIZE, GOLD_STANDARD_SIZE)
+        assert len(locations) == SIZE
+        db.session.remove()
+    elapsed = time.perf_counter() - start
+    return (elapsed / REQUEST_COUNT * 1000, stats["queries"] / REQUEST_COUNT, stats["rows"] / REQUEST_COUNT)
+
+
+print("{:>10} {:>10} {:>12} {:>12} {:>10} {:>14}".format("answers", "locations", "version", "ms/request", "queries", "rows/request"))
+for answer_count in ANSWER_SCALES:
+    location_count = fill_database(answer_count)
+    for name, function in [("legacy", legacy_get_locations), ("current", location_operations.get_locations)]:
+        ms, queries, rows = run_benchmark(function, 2)
+        print("{:>10} {:>10} {:>12} {:>12.2f} {:>10.1f} {:>14.1f}".format(answer_count, location_count, name, ms, queries, rows))
+
+db.session.remove()
+db.drop_all()
+db.session.close()
@@ -0,0 +1,93 @@
+"""
+The script benchmarks the recomputation of the done locations from the whole answer table (see answer_arrays.py).
+
+It fills the database with synthetic locations and good answers (with random answers to each location),
+then recomputes the done locations with each consensus policy.
+
+WARNING: the script drops and re-creates all tables, so only run it against the testing database:
+$ FLASK_ENV=testing python util/benchmark_recompute_done_locations.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+LOCATION_COUNT : The number of locations
+ANSWERS_PER_LOCATION : The number of good answers to each location
+POLICIES : The (policy, match_count, min_ratio) to recompute with
+
+Output
+------
+The number of answers, and the time of loading the arrays, computing the consensus,
+and recomputing the done locations (including the bulk updates) for each policy.
+
+"""
+CFG_NAME = "config.config.config"
+LOCATION_COUNT = 250000
+ANSWERS_PER_LOCATION = 4
+POLICIES = [("k_matching", 3, 0.75), ("k_matching", 2, 0.75), ("majority", 2, 0.75), ("trust_weighted", 2, 0.75)]
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+from sqlalchemy import text
+from models.model import db
+from models.model_operations import answer_arrays
+from models.model_operations.consensus_policy import init_consensus_policy
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+if not app.config["TESTING"]:
+    raise Exception("The benchmark drops all tables. Please run it with FLASK_ENV=testing.")
+
+
+def fill_database():
+    """Re-create the tables with the locations and their good answers from 100 users."""
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    params = {"location_count": LOCATION_COUNT, "answer_count": ANSWERS_PER_LOCATION}
+    db.session.execute(text("""
+        INSERT INTO "user" (client_id, client_type, gold_test_count, gold_pass_count)
+        SELECT 'bench_' || g, 1, 10, g % 11 FROM generate_series(1, 100) g"""))
+    db.session.execute(text("""
+        INSERT INTO location (factory_id)
+        SELECT md5(g::text) FROM generate_series(1, :location_count) g"""), params)
+    db.session.execute(text("""
+        INSERT INTO answer (year_old, year_new, source_url_root, land_usage, expansion, gold_standard_status, user_id, location_id)
+        SELECT 2010, 2017, '', 1 + (random() < 0.2)::int, 1 + (random() < 0.1)::int, 1, 1 + (random() * 99)::int, g
+        FROM generate_series(1, :location_count) g, generate_series(1, :answer_count) a"""), params)
+    db.session.commit()
+
+
+fill_database()
+print("{:>16} {:>6} {:>6} {:>10} {:>10} {:>10} {:>12} {:>10}".format("policy", "k", "ratio", "answers",
+    "load s", "compute s", "recompute s", "done"))
+for policy, match_count, min_ratio in POLICIES:
+    init_consensus_policy(policy, match_count=match_count, min_ratio=min_ratio)
+    db.session.execute(text("UPDATE location SET done_at = NULL"))
+    db.session.commit()
+
+    start = time.perf_counter()
+    arrays = answer_arrays.load_answer_arrays()
+    user_weights = answer_arrays.load_user_trust_weights()
+    load_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    answer_arrays.get_consensus_flags(arrays, LOCATION_COUNT + 1, user_weights=user_weights)
+    compute_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    set_location_ids, clear_location_ids = answer_arrays.recompute_done_locations()
+    recompute_elapsed = time.perf_counter() - start
+    print("{:>16} {:>6} {:>6.2f} {:>10} {:>10.2f} {:>10.2f} {:>12.2f} {:>10}".format(policy, match_count, min_ratio,
+        len(arrays["location_id"]), load_elapsed, compute_elapsed, recompute_elapsed, len(set_location_ids)))
+
+db.session.remove()
+db.drop_all()
+db.session.close()
@@ -0,0 +1,42 @@
+"""
+The script removes the idempotency keys of the answer submissions that have expired,
+and the records of the submitted manifests that have expired.
+
+Run it periodically (e.g., daily by cron) to keep the answer_submission and manifest_use tables small:
+$ FLASK_ENV=production python util/clear_expired_answer_submissions.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+
+Output
+------
+The number of removed submissions and manifests.
+
+"""
+CFG_NAME = "config.config.config"
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from models.model import db
+from models.model_operations.answer_submission_operations import remove_expired_answer_submissions
+from models.model_operations.manifest_operations import remove_expired_manifest_uses
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+submission_count = remove_expired_answer_submissions(expire_seconds=app.config["ANSWER_IDEMPOTENCY_KEY_SECONDS"])
+print("Removed {} expired submissions from the answer_submission table".format(submission_count))
+
+manifest_count = remove_expired_manifest_uses()
+print("Removed {} expired manifests from the manifest_use table".format(manifest_count))
+
+db.session.remove()
+db.session.close()
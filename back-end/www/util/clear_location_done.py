@@ -21,6 +21,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import csv
 from models.model import db
 from models.model_operations import location_operations
+from models.model_operations.done_bitmap import rebuild_done_bitmap
 from config.config import Config
 from flask import Flask
 from controllers import root
@@ -61,6 +62,10 @@ with open(CSV_FILE_NAME) as csvDataFile:
         
 
 print("reset locations done numbers:", loc_count)
+
+# Update the done locations shared by the server processes
+if app.config.get("DONE_BITMAP_PATH") is not None:
+    rebuild_done_bitmap(app.config["DONE_BITMAP_PATH"])
 #count = location_operations.get_location_count()
 #print("Location count is ", count)
 
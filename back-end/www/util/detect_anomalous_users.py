@@ -0,0 +1,74 @@
+"""
+The script computes the features of all the users from the whole answer table (see answer_anomaly.py),
+exports the flagged users to a CSV file, and optionally bans them in bulk (like set_client_type.py with -1).
+
+$ FLASK_ENV=production python util/detect_anomalous_users.py
+
+It requires NumPy (see install_packages.sh).
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+MIN_SIGNAL_COUNT : The minimum number of signals to flag a user (see answer_anomaly.flag_anomalous_users)
+BAN : Set the client type of the flagged users to -1 (banned)
+
+Output
+------
+The number of users, the number of flagged users for each signal, and the CSV file
+(anomalous_users_YYYY_MM_DD_HH_mm_ss.csv) with the features and the signals of each flagged user.
+
+"""
+CFG_NAME = "config.config.config"
+MIN_SIGNAL_COUNT = 2
+BAN = False
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import csv
+import time
+import datetime
+import numpy as np
+from models.model import db
+from models.model_operations.answer_arrays import load_answer_arrays
+from models.model_operations.answer_arrays import load_user_arrays
+from models.model_operations.answer_anomaly import ANOMALY_SIGNALS
+from models.model_operations.answer_anomaly import compute_user_features
+from models.model_operations.answer_anomaly import flag_anomalous_users
+from models.model_operations.user_operations import update_client_type_by_user_ids
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+start = time.perf_counter()
+features = compute_user_features(load_answer_arrays(include_timestamp=True), load_user_arrays())
+user_ids, signals = flag_anomalous_users(features, min_signal_count=MIN_SIGNAL_COUNT)
+elapsed = time.perf_counter() - start
+print("Analyzed {} users in {:.2f} seconds".format(len(features["user_ids"]), elapsed))
+for name in ANOMALY_SIGNALS:
+    print("{:>10}: {} users".format(name, int(signals[name].sum())))
+print("Flagged {} users with at least {} signals".format(len(user_ids), MIN_SIGNAL_COUNT))
+
+columns = ["answer_count", "entropy", "gap_count", "median_seconds_per_answer", "fast_fraction",
+        "comparable_count", "agreement", "gold_test_count", "gold_pass_rate"]
+csv_file_name = "anomalous_users_" + datetime.datetime.today().strftime("%Y_%m_%d_%H_%M_%S") + ".csv"
+with open(csv_file_name, "w", newline="") as f:
+    writer = csv.writer(f)
+    writer.writerow(["user_id"] + columns + ANOMALY_SIGNALS)
+    for i in np.nonzero(np.isin(features["user_ids"], user_ids))[0]:
+        writer.writerow([int(features["user_ids"][i])] + [round(float(features[column][i]), 4) for column in columns]
+            + [bool(signals[name][i]) for name in ANOMALY_SIGNALS])
+print("Exported the flagged users to " + csv_file_name)
+
+if BAN:
+    count = update_client_type_by_user_ids(user_ids.tolist(), -1)
+    print("Banned {} users".format(count))
+
+db.session.remove()
+db.session.close()
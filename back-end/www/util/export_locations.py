@@ -19,6 +19,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import csv
 from models.model import db
 from models.model import Location
+from models.model import LocationTally
 from models.model_operations import location_operations
 from models.model_operations import user_operations
 from config.config import Config
@@ -40,13 +41,24 @@ print("Exporting answers to " + cvs_file_name + "...")
 location_query = Location.query.order_by(Location.factory_id)
 locations = location_query.all()
 
+# Get the answer with the most good answers of each location from the tallies
+top_tallies = {}
+for tally in LocationTally.query.filter(LocationTally.good_answer_count > 0).order_by(
+        LocationTally.location_id, LocationTally.good_answer_count.desc()).distinct(LocationTally.location_id).all():
+    top_tallies[tally.location_id] = tally
+
 with open(cvs_file_name, "w", newline="") as csvDataFile:
     # Write header
     csvWriter = csv.writer(csvDataFile, delimiter=",", quotechar='|', quoting=csv.QUOTE_MINIMAL)
-    csvWriter.writerow(["factory_id", "id", "done_at", "answer_count"])
+    csvWriter.writerow(["factory_id", "id", "done_at", "answer_count", "land_usage", "expansion", "good_answer_count"])
     for location in locations:
         # Write each record in answer table
-        csvWriter.writerow([location.factory_id, location.id, location.done_at, len(location.answers)])
+        tally = top_tallies.get(location.id)
+        if tally is None:
+            consensus = ["", "", 0]
+        else:
+            consensus = [tally.land_usage, tally.expansion, tally.good_answer_count]
+        csvWriter.writerow([location.factory_id, location.id, location.done_at, location.answer_count] + consensus)
 
 print("{} records reported.".format(len(locations)))
 db.session.remove()
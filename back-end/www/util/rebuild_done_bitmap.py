@@ -0,0 +1,42 @@
+"""
+The script rebuilds the memory-mapped file of the done locations from the done_at of the location table.
+
+Run it when enabling DONE_BITMAP_PATH, and after the scripts that change done_at without the running server
+(e.g., util/clear_location_done.py):
+$ FLASK_ENV=production python util/rebuild_done_bitmap.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+
+Output
+------
+The number of done locations written into the file.
+
+"""
+CFG_NAME = "config.config.config"
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from models.model import db
+from models.model_operations.done_bitmap import rebuild_done_bitmap
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+path = app.config["DONE_BITMAP_PATH"]
+if path is None:
+    raise Exception("Please set DONE_BITMAP_PATH in the config.")
+
+done_count = rebuild_done_bitmap(path)
+print("Wrote {} done locations into {}".format(done_count, path))
+
+db.session.remove()
+db.session.close()
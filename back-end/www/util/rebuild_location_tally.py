@@ -0,0 +1,39 @@
+"""
+The script recomputes the location_tally table (the number of good answers of each location and answer)
+from the answer table in one pass.
+
+Run it after the scripts or manual queries that change the answers without the answer operations
+(e.g., bulk imports with SQL):
+$ FLASK_ENV=production python util/rebuild_location_tally.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+
+Output
+------
+The number of tallies written into the table.
+
+"""
+CFG_NAME = "config.config.config"
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from models.model import db
+from models.model_operations.location_tally_operations import rebuild_location_tallies
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+tally_count = rebuild_location_tallies()
+print("Wrote {} tallies into the location_tally table".format(tally_count))
+
+db.session.remove()
+db.session.close()
@@ -0,0 +1,73 @@
+"""
+The script recomputes which locations are done from the whole answer table by the consensus policy in the config (or --policy),
+and applies the difference to the location table in bulk updates (see answer_arrays.py).
+
+Run it after changing the consensus policy or thresholds, or re-grading the gold standards,
+since the submissions only evaluate the locations that they answer:
+$ FLASK_ENV=production python util/recompute_done_locations.py
+
+It requires NumPy (see install_packages.sh).
+
+Arguments
+---------
+--policy : The consensus policy to evaluate ("k_matching", "majority", or "trust_weighted", see consensus_policy.py)
+           (the CONSENSUS_POLICY in the config by default, with the thresholds in the config;
+           run with DRY_RUN to check another policy before selecting it in the config)
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+CLEAR_DONE : Also clear done_at of the done locations that have not reached consensus
+             (off by default, since it undoes the locations marked done by earlier or other consensus rules;
+             run with DRY_RUN first to check how many would be cleared)
+DRY_RUN : Only count the locations without updating them
+
+Output
+------
+The number of locations newly marked done and cleared, and the time of the recomputation.
+
+"""
+CFG_NAME = "config.config.config"
+CLEAR_DONE = False
+DRY_RUN = False
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+import argparse
+from models.model import db
+from models.model_operations.answer_arrays import recompute_done_locations
+from models.model_operations.consensus_policy import CONSENSUS_POLICIES
+from models.model_operations.consensus_policy import init_consensus_policy
+from models.model_operations.done_bitmap import rebuild_done_bitmap
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+parser = argparse.ArgumentParser(description="Recompute the done locations by a consensus policy.")
+parser.add_argument("--policy", choices=CONSENSUS_POLICIES, default=app.config["CONSENSUS_POLICY"])
+args = parser.parse_args()
+
+init_consensus_policy(args.policy, match_count=app.config["CONSENSUS_MATCH_COUNT"],
+        min_ratio=app.config["CONSENSUS_MIN_RATIO"])
+
+start = time.perf_counter()
+set_location_ids, clear_location_ids = recompute_done_locations(clear_done=CLEAR_DONE, dry_run=DRY_RUN)
+elapsed = time.perf_counter() - start
+print("{} {} locations done and {} cleared by the {} policy in {:.2f} seconds".format(
+    "Would mark" if DRY_RUN else "Marked", len(set_location_ids), len(clear_location_ids),
+    args.policy, elapsed))
+
+# Update the done locations shared by the server processes
+if not DRY_RUN and app.config.get("DONE_BITMAP_PATH") is not None:
+    rebuild_done_bitmap(app.config["DONE_BITMAP_PATH"])
+
+db.session.remove()
+db.session.close()
@@ -0,0 +1,40 @@
+"""
+The script re-rolls the random keys of all locations.
+
+The random keys are used for sampling locations in location_operations.get_locations.
+They are not re-rolled when locations are assigned (to keep the work off the request path),
+so this script should be run periodically (e.g., hourly by cron) and after importing locations.
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+
+Output
+------
+The total location numbers that are re-rolled.
+
+"""
+CFG_NAME = "config.config.config"
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from models.model import db
+from models.model_operations import location_operations
+from flask import Flask
+from controllers import root
+
+# init db
+app = Flask(__name__)
+app.register_blueprint(root.bp)
+app.config.from_object(CFG_NAME)
+db.init_app(app)
+app.app_context().push()
+
+location_operations.reroll_location_random_keys()
+
+count = location_operations.get_location_count()
+print("Re-rolled random keys of {} locations.".format(count))
+
+db.session.remove()
+db.session.close()
@@ -0,0 +1,185 @@
+"""
+The script simulates the volunteers labeling locations to compare the schedulers of get_locations.
+
+The simulation runs in memory (no database is needed) and follows the rules in batch_process_answers:
+each batch has gold standards, the answers count as good only if the user passes the gold standard test,
+and a location is done when it reaches consensus by the consensus policy in the config
+(CONSENSUS_POLICY, CONSENSUS_MATCH_COUNT, and CONSENSUS_MIN_RATIO, see consensus_policy.py).
+$ FLASK_ENV=production python util/simulate_scheduler.py
+
+Config
+------
+CFG_NAME : The config name, which is selected by the FLASK_ENV environment variable (see config.py)
+SCHEDULERS : The schedulers to compare (see location_operations.sample_locations_by_scheduler)
+LOCATION_COUNT : The number of locations waiting to be labeled
+USER_COUNT : The number of volunteers
+ANSWER_COUNT : The number of answers (including gold standards) submitted in each run
+SIZE : The total number of locations in each batch
+GOLD_STANDARD_SIZE : The number of gold standard locations in each batch
+USER_ACCURACY_RANGE : The range of the probability that a volunteer gives the correct answer
+RUN_COUNT : The number of runs (with different random seeds) to average
+
+Output
+------
+The number of locations completed per 1,000 submitted answers for each scheduler,
+and the coverage (the percentage of locations without answers and the maximum answers of a location).
+
+"""
+CFG_NAME = "config.config.config"
+SCHEDULERS = ["uniform", "consensus", "deficit"]
+LOCATION_COUNT = 5000
+USER_COUNT = 300
+ANSWER_COUNT = 20000
+SIZE = 5
+GOLD_STANDARD_SIZE = 1
+USER_ACCURACY_RANGE = (0.6, 0.95)
+RUN_COUNT = 5
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+from werkzeug.utils import import_string
+from models.model_operations.consensus_policy import consensus_policy_state
+from models.model_operations.consensus_policy import init_consensus_policy
+from models.model_operations.consensus_policy import is_consensus_reached
+from models.model_operations.location_operations import draw_scheduler_tiers
+
+# Select the consensus policy as the server does
+config = import_string(CFG_NAME)
+init_consensus_policy(config.CONSENSUS_POLICY, match_count=config.CONSENSUS_MATCH_COUNT,
+        min_ratio=config.CONSENSUS_MIN_RATIO)
+
+# The possible answers (land_usage, expansion)
+ANSWER_CLASSES = [(land_usage, expansion) for land_usage in range(3) for expansion in range(3)]
+
+# The count in the state that tiers the locations for each weighted scheduler
+# (see location_operations.SCHEDULER_TIER_COLUMNS)
+SCHEDULER_TIER_COUNTS = {
+    "consensus": "consensus_count",
+    "deficit": "answer_count"
+}
+
+
+def give_answer(truth, accuracy, rng):
+    """Return the correct answer with the probability of accuracy, or a random wrong answer."""
+    if rng.random() < accuracy:
+        return truth
+    return rng.choice([answer for answer in ANSWER_CLASSES if answer != truth])
+
+
+def select_locations(scheduler, state, user_id, n, rng):
+    """Select n locations that are not done and not answered by the user."""
+    answered = state["answered"][user_id]
+    candidates = [location_id for location_id in state["waiting"] if location_id not in answered]
+    if scheduler == "uniform":
+        return rng.sample(candidates, min(n, len(candidates)))
+    elif scheduler in SCHEDULER_TIER_COUNTS:
+        return select_locations_by_tier(scheduler, state, candidates, n, rng)
+    else:
+        raise Exception("Unknown scheduler: {}".format(scheduler))
+
+
+def select_locations_by_tier(scheduler, state, candidates, n, rng):
+    """Select n locations by drawing their tiers as location_operations.sample_locations_by_tier does."""
+    counts = state[SCHEDULER_TIER_COUNTS[scheduler]]
+
+    # The tier sizes are counted over all the locations that are not done, as in get_scheduler_tier_sizes
+    tier_sizes = {}
+    for location_id in state["waiting"]:
+        tier_sizes[counts[location_id]] = tier_sizes.get(counts[location_id], 0) + 1
+    candidates_by_tier = {}
+    for location_id in candidates:
+        candidates_by_tier.setdefault(counts[location_id], []).append(location_id)
+
+    selected = set()
+    for tier in draw_scheduler_tiers(scheduler, tier_sizes, n, rng=rng):
+        tier_candidates = candidates_by_tier.get(tier, [])
+        if len(tier_candidates) > 0:
+            selected.add(tier_candidates.pop(rng.randrange(len(tier_candidates))))
+
+    # Fill the slots that find no location uniformly
+    rest = [location_id for location_id in candidates if location_id not in selected]
+    return list(selected) + rng.sample(rest, min(n - len(selected), len(rest)))
+
+
+def get_support_list(state, location_id):
+    """Return the support of each distinct good answer to the location (see consensus_policy.is_consensus_reached)."""
+    support = {}
+    for user_id, answer in state["good_answers"][location_id]:
+        if consensus_policy_state["policy"] == "trust_weighted":
+            weight = (state["gold_pass_count"][user_id] + 1) / (state["gold_test_count"][user_id] + 2)
+        else:
+            weight = 1
+        support[answer] = support.get(answer, 0) + weight
+    return list(support.values())
+
+
+def simulate(scheduler, seed):
+    """Run one simulation and return the number of done locations, the answers, and the answers of each location."""
+    rng = random.Random(seed)
+    truths = [rng.choice(ANSWER_CLASSES) for i in range(LOCATION_COUNT)]
+    accuracies = [rng.uniform(*USER_ACCURACY_RANGE) for i in range(USER_COUNT)]
+    state = {
+        "waiting": set(range(LOCATION_COUNT)),
+        "answered": [set() for i in range(USER_COUNT)],
+        "consensus_count": [0] * LOCATION_COUNT,
+        "answer_count": [0] * LOCATION_COUNT,
+        "good_answer_count": {},
+        "good_answers": [[] for i in range(LOCATION_COUNT)],
+        "gold_pass_count": [0] * USER_COUNT,
+        "gold_test_count": [0] * USER_COUNT
+    }
+
+    answer_count = 0
+    while answer_count < ANSWER_COUNT and len(state["waiting"]) > 0:
+        user_id = rng.randrange(USER_COUNT)
+        location_id_list = select_locations(scheduler, state, user_id, SIZE - GOLD_STANDARD_SIZE, rng)
+        if len(location_id_list) == 0:
+            continue
+
+        # The gold standard test
+        gold_truth = rng.choice(ANSWER_CLASSES)
+        passed = all(give_answer(gold_truth, accuracies[user_id], rng) == gold_truth for i in range(GOLD_STANDARD_SIZE))
+        answer_count += GOLD_STANDARD_SIZE + len(location_id_list)
+
+        # The gold test result is recorded before the answers are evaluated (see write_graded_answers)
+        state["gold_test_count"][user_id] += 1
+        if passed:
+            state["gold_pass_count"][user_id] += 1
+
+        for location_id in location_id_list:
+            answer = give_answer(truths[location_id], accuracies[user_id], rng)
+            state["answered"][user_id].add(location_id)
+            state["answer_count"][location_id] += 1
+            if not passed:
+                continue
+            key = (location_id, answer)
+            good_answer_count = state["good_answer_count"].get(key, 0) + 1
+            state["good_answer_count"][key] = good_answer_count
+            state["good_answers"][location_id].append((user_id, answer))
+            state["consensus_count"][location_id] = max(state["consensus_count"][location_id], good_answer_count)
+            if is_consensus_reached(get_support_list(state, location_id)):
+                state["waiting"].discard(location_id)
+
+    return LOCATION_COUNT - len(state["waiting"]), answer_count, state["answer_count"]
+
+
+print("Consensus policy: {} (match_count {}, min_ratio {})".format(consensus_policy_state["policy"],
+    consensus_policy_state["match_count"], consensus_policy_state["min_ratio"]))
+print("{:>10} {:>10} {:>10} {:>24} {:>16} {:>12}".format("scheduler", "done", "answers",
+    "done per 1,000 answers", "% no answers", "max answers"))
+for scheduler in SCHEDULERS:
+    done_total = 0
+    answer_total = 0
+    no_answer_total = 0
+    max_answer_count = 0
+    for seed in range(RUN_COUNT):
+        done_count, answer_count, location_answer_counts = simulate(scheduler, seed)
+        done_total += done_count
+        answer_total += answer_count
+        no_answer_total += location_answer_counts.count(0)
+        max_answer_count = max(max_answer_count, max(location_answer_counts))
+    print("{:>10} {:>10.1f} {:>10.1f} {:>24.2f} {:>16.2f} {:>12}".format(scheduler, done_total / RUN_COUNT,
+        answer_total / RUN_COUNT, done_total / answer_total * 1000,
+        no_answer_total / (LOCATION_COUNT * RUN_COUNT) * 100, max_answer_count))
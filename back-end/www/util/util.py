@@ -5,6 +5,11 @@ import jwt
 import traceback
 
 
+# The "typ" claim of the user tokens
+# (other JWTs signed with the same key, such as the manifests in manifest_operations.py, cannot be used as user tokens)
+USER_TOKEN_TYPE = "user"
+
+
 class InvalidUsage(Exception):
     """Handle errors, such as a bad request."""
     def __init__(self, message, status_code=400, payload=None):
@@ -61,7 +66,7 @@ def encode_jwt(payload, private_key):
     return jwt.encode(payload, private_key, algorithm="HS256")
 
 
-def decode_jwt(token, private_key):
+def decode_jwt(token, private_key, token_type=USER_TOKEN_TYPE):
     """
     Decode JWT.
 
@@ -71,13 +76,23 @@ def decode_jwt(token, private_key):
         JSON Web Token.
     private_key : str
         The private key to decode the JWT.
+    token_type : str
+        The expected "typ" claim of the JWT.
 
     Returns
     -------
     dict
         Decoded JSON Web Token.
+
+    Raises
+    ------
+    exception : jwt.InvalidTokenError
+        When the JWT is invalid, expired, or issued for another purpose.
     """
-    return jwt.decode(token, private_key, algorithms=["HS256"])
+    payload = jwt.decode(token, private_key, algorithms=["HS256"])
+    if payload.get("typ") != token_type:
+        raise jwt.InvalidTokenError("The token is not a {} token.".format(token_type))
+    return payload
 
 
 def decode_user_token(request_json, private_key, check_if_admin=True):